@@ -797,6 +797,10 @@ try:
         NODE_CLASS_MAPPINGS as EXTRACT_VIDEO_FRAMES_MAPPINGS
     from .nodes.tools.load_video_frames import \
         NODE_DISPLAY_NAME_MAPPINGS as EXTRACT_VIDEO_FRAMES_DISPLAY
+    from .nodes.tools.load_image_sequence import \
+        NODE_CLASS_MAPPINGS as LOAD_IMAGE_SEQUENCE_MAPPINGS
+    from .nodes.tools.load_image_sequence import \
+        NODE_DISPLAY_NAME_MAPPINGS as LOAD_IMAGE_SEQUENCE_DISPLAY
     from .nodes.tools.show_any import \
         NODE_CLASS_MAPPINGS as SHOW_ANY_MAPPINGS
     from .nodes.tools.show_any import \
@@ -817,12 +821,26 @@ try:
         NODE_CLASS_MAPPINGS as IMAGE_BATCH_EXTEND_MAPPINGS
     from .nodes.image.image_batch_extend_with_overlap import \
         NODE_DISPLAY_NAME_MAPPINGS as IMAGE_BATCH_EXTEND_DISPLAY
+    from .nodes.tools.batch_map_node import \
+        NODE_CLASS_MAPPINGS as BATCH_MAP_MAPPINGS
+    from .nodes.tools.batch_map_node import \
+        NODE_DISPLAY_NAME_MAPPINGS as BATCH_MAP_DISPLAY
+    from .nodes.tools.save_video_stream import \
+        NODE_CLASS_MAPPINGS as SAVE_VIDEO_STREAM_MAPPINGS
+    from .nodes.tools.save_video_stream import \
+        NODE_DISPLAY_NAME_MAPPINGS as SAVE_VIDEO_STREAM_DISPLAY
+    from .nodes.tools.image_u8_to_image import \
+        NODE_CLASS_MAPPINGS as IMAGE_U8_TO_IMAGE_MAPPINGS
+    from .nodes.tools.image_u8_to_image import \
+        NODE_DISPLAY_NAME_MAPPINGS as IMAGE_U8_TO_IMAGE_DISPLAY
 except ImportError as e:
     print(f"[UniversalToolkit] 导入错误: {e}")
     GET_IMAGE_RANGE_MAPPINGS = {}
     GET_IMAGE_RANGE_DISPLAY = {}
     EXTRACT_VIDEO_FRAMES_MAPPINGS = {}
     EXTRACT_VIDEO_FRAMES_DISPLAY = {}
+    LOAD_IMAGE_SEQUENCE_MAPPINGS = {}
+    LOAD_IMAGE_SEQUENCE_DISPLAY = {}
     SHOW_ANY_MAPPINGS = {}
     SHOW_ANY_DISPLAY = {}
     BEST_CONTEXT_WINDOW_MAPPINGS = {}
@@ -833,6 +851,12 @@ except ImportError as e:
     RESIZE_VER_KJ_DISPLAY = {}
     IMAGE_BATCH_EXTEND_MAPPINGS = {}
     IMAGE_BATCH_EXTEND_DISPLAY = {}
+    BATCH_MAP_MAPPINGS = {}
+    BATCH_MAP_DISPLAY = {}
+    SAVE_VIDEO_STREAM_MAPPINGS = {}
+    SAVE_VIDEO_STREAM_DISPLAY = {}
+    IMAGE_U8_TO_IMAGE_MAPPINGS = {}
+    IMAGE_U8_TO_IMAGE_DISPLAY = {}
 
 
 # 合并所有节点映射
@@ -875,11 +899,15 @@ NODE_CLASS_MAPPINGS.update(LAZY_SWITCH_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(TEXT_TRANSLATOR_API_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(GET_IMAGE_RANGE_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(EXTRACT_VIDEO_FRAMES_MAPPINGS)
+NODE_CLASS_MAPPINGS.update(LOAD_IMAGE_SEQUENCE_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(SHOW_ANY_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(BEST_CONTEXT_WINDOW_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(BLOCKIFY_MASK_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(RESIZE_VER_KJ_MAPPINGS)
 NODE_CLASS_MAPPINGS.update(IMAGE_BATCH_EXTEND_MAPPINGS)
+NODE_CLASS_MAPPINGS.update(BATCH_MAP_MAPPINGS)
+NODE_CLASS_MAPPINGS.update(SAVE_VIDEO_STREAM_MAPPINGS)
+NODE_CLASS_MAPPINGS.update(IMAGE_U8_TO_IMAGE_MAPPINGS)
 
 # 合并显示名称映射
 NODE_DISPLAY_NAME_MAPPINGS = {}
@@ -921,11 +949,41 @@ NODE_DISPLAY_NAME_MAPPINGS.update(LAZY_SWITCH_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(TEXT_TRANSLATOR_API_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(GET_IMAGE_RANGE_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(EXTRACT_VIDEO_FRAMES_DISPLAY)
+NODE_DISPLAY_NAME_MAPPINGS.update(LOAD_IMAGE_SEQUENCE_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(SHOW_ANY_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(BEST_CONTEXT_WINDOW_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(BLOCKIFY_MASK_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(RESIZE_VER_KJ_DISPLAY)
 NODE_DISPLAY_NAME_MAPPINGS.update(IMAGE_BATCH_EXTEND_DISPLAY)
+NODE_DISPLAY_NAME_MAPPINGS.update(BATCH_MAP_DISPLAY)
+NODE_DISPLAY_NAME_MAPPINGS.update(SAVE_VIDEO_STREAM_DISPLAY)
+NODE_DISPLAY_NAME_MAPPINGS.update(IMAGE_U8_TO_IMAGE_DISPLAY)
+
+# 分块批处理节点可以调用的目标节点
+if BATCH_MAP_MAPPINGS:
+    from .nodes.tools.batch_map_node import register_targets as register_batch_map_targets
+
+    register_batch_map_targets(NODE_CLASS_MAPPINGS)
+
+# 可选的节点结果缓存（设置 UTK_CACHE=1 启用），需在分析包装之前安装
+try:
+    from .nodes.tools.result_cache import install_result_cache
+    from .nodes.tools.result_cache import is_enabled as result_cache_enabled
+
+    if result_cache_enabled():
+        install_result_cache(NODE_CLASS_MAPPINGS)
+except ImportError as e:
+    print(f"[UniversalToolkit] 结果缓存模块导入失败: {e}")
+
+# 可选的节点执行分析（设置 UTK_PROFILE=1 启用）
+try:
+    from .nodes.tools.profiling import install_profiling
+    from .nodes.tools.profiling import is_enabled as profiling_enabled
+
+    if profiling_enabled():
+        install_profiling(NODE_CLASS_MAPPINGS)
+except ImportError as e:
+    print(f"[UniversalToolkit] 节点分析模块导入失败: {e}")
 
 NODE_CATEGORIES = {
     "UniversalToolkit": [
@@ -968,11 +1026,15 @@ NODE_CATEGORIES = {
         "TextTranslatorAPI_UTK",
         "GetImageRangeFromBatch_UTK",
         "Extract_Video_Frames_UTK",
+        "LoadImageSequence_UTK",
         "ShowAny_UTK",
         "BestContextWindow_UTK",
         "BlockifyMask_UTK",
         "ResizeImageVerKJ_UTK",
         "ImageBatchExtendWithOverlap_UTK",
+        "BatchMap_UTK",
+        "SaveVideoStream_UTK",
+        "ImageU8ToImage_UTK",
     ]
 }
 
@@ -980,6 +1042,34 @@ NODE_CATEGORIES = {
 import os
 WEB_DIRECTORY = os.path.join(os.path.dirname(__file__), "web")
 
+# 节点模块只包含轻量的类定义，cv2/scipy/librosa 等重型依赖在首次执行节点时才导入。
+# 设置 UTK_PREWARM=1 可在启动后由后台线程提前导入，避免首次执行时的等待。
+_PREWARM_MODULES = (
+    "cv2",
+    "scipy.ndimage",
+    "librosa",
+    "color_matcher",
+    "requests",
+)
+
+
+def _prewarm_heavy_imports():
+    import importlib
+
+    for name in _PREWARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"[UniversalToolkit] 预热导入 {name} 失败: {e}")
+
+
+if os.environ.get("UTK_PREWARM", "0") == "1":
+    import threading
+
+    threading.Thread(
+        target=_prewarm_heavy_imports, name="utk-prewarm", daemon=True
+    ).start()
+
 __all__ = [
     "NODE_CLASS_MAPPINGS",
     "NODE_DISPLAY_NAME_MAPPINGS",
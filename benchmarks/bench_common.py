@@ -0,0 +1,587 @@
+"""
+Benchmark Common Helpers
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Shared helpers for the UniversalToolkit benchmark scripts: minimal stand-ins
+for the ComfyUI modules the nodes import (comfy.utils, comfy.model_management,
+folder_paths, nodes, server), loading the toolkit outside ComfyUI, synthetic
+node inputs, RSS readings and JSON result files.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+TOOLKIT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "universaltoolkit"
+RESULT_MARKER = "@@UTK_BENCH@@"
+
+# ComfyUI 启动时已经导入的模块，测量工具包自身开销时预先导入
+COMFY_PRELOADED_MODULES = ("torch", "numpy", "PIL.Image", "aiohttp")
+
+# 需要网络或本地模型文件的节点，合成输入无法运行
+SKIP_NODES = {
+    "APIImageGenerator_UTK": "requires network access",
+    "TextTranslatorAPI_UTK": "requires network access",
+    "LoraInfo_UTK": "requires LoRA model files",
+}
+
+
+def log(message, message_type="info"):
+    """简单的日志函数（输出到 stderr，stdout 留给结果）"""
+    if message_type == "error":
+        print(f"❌ Error: {message}", file=sys.stderr)
+    elif message_type == "warning":
+        print(f"⚠️ Warning: {message}", file=sys.stderr)
+    elif message_type == "finish":
+        print(f"✅ {message}", file=sys.stderr)
+    else:
+        print(f"ℹ️ {message}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# ComfyUI stand-ins
+# ---------------------------------------------------------------------------
+
+
+def _make_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def _common_upscale(samples, width, height, upscale_method, crop):
+    """comfy.utils.common_upscale 的 CPU 版本（lanczos 与 ComfyUI 一样逐张走 PIL）"""
+    import numpy as np
+    import torch
+    import torch.nn.functional as F
+    from PIL import Image
+
+    if upscale_method == "lanczos":
+        out = []
+        for sample in samples:
+            array = (sample.movedim(0, -1).clamp(0, 1) * 255).round().to(torch.uint8)
+            array = array.numpy()
+            if array.shape[-1] == 1:
+                array = array[..., 0]
+            resized = Image.fromarray(array).resize((width, height), Image.LANCZOS)
+            tensor = torch.from_numpy(np.array(resized)).float() / 255.0
+            if tensor.dim() == 2:
+                tensor = tensor.unsqueeze(-1)
+            out.append(tensor.movedim(-1, 0))
+        return torch.stack(out)
+    if upscale_method in ("nearest-exact", "area"):
+        return F.interpolate(samples, size=(height, width), mode=upscale_method)
+    return F.interpolate(
+        samples, size=(height, width), mode=upscale_method, align_corners=False
+    )
+
+
+class _ProgressBar:
+    def __init__(self, total):
+        self.total = total
+        self.current = 0
+
+    def update(self, value):
+        self.current += value
+
+    def update_absolute(self, value, total=None, preview=None):
+        self.current = value
+
+
+class _SaveImage:
+    """nodes.SaveImage 替身：编码 PNG 到内存，保留编码开销但不写盘"""
+
+    def __init__(self):
+        self.output_dir = tempfile.gettempdir()
+        self.type = "output"
+        self.prefix_append = ""
+        self.compress_level = 4
+
+    def save_images(self, images, filename_prefix="ComfyUI", prompt=None, extra_pnginfo=None):
+        import io
+
+        import numpy as np
+        from PIL import Image
+
+        results = []
+        for index, image in enumerate(images):
+            array = np.clip(255.0 * image.cpu().numpy(), 0, 255).astype(np.uint8)
+            buffer = io.BytesIO()
+            Image.fromarray(array).save(buffer, format="PNG", compress_level=self.compress_level)
+            results.append(
+                {"filename": f"{filename_prefix}_{index:05}.png", "subfolder": "", "type": self.type}
+            )
+        return {"ui": {"images": results}}
+
+
+class _Routes:
+    def __init__(self):
+        self.handlers = []
+
+    def _register(self, method, path):
+        def decorator(handler):
+            self.handlers.append((method, path, handler))
+            return handler
+
+        return decorator
+
+    def get(self, path):
+        return self._register("GET", path)
+
+    def post(self, path):
+        return self._register("POST", path)
+
+
+class _PromptServer:
+    instance = None
+
+    def __init__(self):
+        self.routes = _Routes()
+
+    def send_sync(self, event, data, sid=None):
+        pass
+
+
+def install_comfy_stubs(temp_dir=None):
+    """注册 ComfyUI 模块的最小替身，使节点可以在普通 Python 环境中以 CPU 运行"""
+    if "comfy.utils" in sys.modules and getattr(sys.modules["comfy"], "_utk_stub", False):
+        return
+    temp_dir = temp_dir or tempfile.mkdtemp(prefix="utk_bench_")
+
+    import torch
+
+    comfy = _make_module("comfy", _utk_stub=True, __path__=[])
+    comfy.utils = _make_module(
+        "comfy.utils", ProgressBar=_ProgressBar, common_upscale=_common_upscale
+    )
+    comfy.model_management = _make_module(
+        "comfy.model_management",
+        get_torch_device=lambda: torch.device("cpu"),
+        intermediate_device=lambda: torch.device("cpu"),
+        unload_all_models=lambda: None,
+        soft_empty_cache=lambda *args, **kwargs: None,
+    )
+    _make_module(
+        "folder_paths",
+        models_dir=os.path.join(temp_dir, "models"),
+        get_filename_list=lambda folder_name: [],
+        get_full_path=lambda folder_name, filename: None,
+        get_temp_directory=lambda: temp_dir,
+        get_output_directory=lambda: temp_dir,
+        get_input_directory=lambda: temp_dir,
+    )
+    _make_module("nodes", MAX_RESOLUTION=16384, SaveImage=_SaveImage)
+    _PromptServer.instance = _PromptServer()
+    _make_module("server", PromptServer=_PromptServer)
+
+
+# ---------------------------------------------------------------------------
+# Toolkit loading
+# ---------------------------------------------------------------------------
+
+
+def register_package_shell():
+    """注册顶层包但不执行 __init__.py，用于单独导入 nodes 下的某个模块"""
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [TOOLKIT_ROOT]
+    package.__file__ = os.path.join(TOOLKIT_ROOT, "__init__.py")
+    sys.modules[PACKAGE_NAME] = package
+    return package
+
+
+def load_toolkit():
+    """像 ComfyUI 一样以包的形式导入工具包，返回顶层模块"""
+    if PACKAGE_NAME in sys.modules and hasattr(sys.modules[PACKAGE_NAME], "NODE_CLASS_MAPPINGS"):
+        return sys.modules[PACKAGE_NAME]
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME,
+        os.path.join(TOOLKIT_ROOT, "__init__.py"),
+        submodule_search_locations=[TOOLKIT_ROOT],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def iter_node_modules():
+    """列出 nodes/ 下所有 Python 模块的点分路径（如 nodes.image.check_mask）"""
+    nodes_dir = os.path.join(TOOLKIT_ROOT, "nodes")
+    modules = []
+    for dirpath, dirnames, filenames in os.walk(nodes_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(("_", ".")))
+        for filename in sorted(filenames):
+            if not filename.endswith(".py"):
+                continue
+            relative = os.path.relpath(os.path.join(dirpath, filename), TOOLKIT_ROOT)
+            name = relative[:-3].replace(os.sep, ".")
+            if name.endswith(".__init__"):
+                name = name[: -len(".__init__")]
+            modules.append(name)
+    return modules
+
+
+def toolkit_version():
+    try:
+        with open(os.path.join(TOOLKIT_ROOT, "pyproject.toml"), "r", encoding="utf-8") as f:
+            match = re.search(r'^version\s*=\s*"([^"]+)"', f.read(), re.M)
+        return match.group(1) if match else None
+    except OSError:
+        return None
+
+
+def toolkit_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=TOOLKIT_ROOT,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment_info():
+    info = {
+        "toolkit_version": toolkit_version(),
+        "toolkit_commit": toolkit_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    for name in ("torch", "numpy", "PIL", "cv2"):
+        try:
+            info[name] = importlib.import_module(name).__version__
+        except Exception:
+            info[name] = None
+    return info
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+
+def rss_mb():
+    """当前进程常驻内存（MB）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """进程生命周期内的峰值常驻内存（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def top_level_modules():
+    return {name.split(".")[0] for name in sys.modules}
+
+
+def tensor_bytes(value):
+    """统计任意嵌套结构中张量/数组占用的字节数"""
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return value.element_size() * value.nelement()
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(tensor_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_bytes(v) for v in value)
+    return 0
+
+
+def median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+
+def make_wav(path, seconds=5.0, sample_rate=44100, channels=2):
+    """生成合成 PCM WAV 文件"""
+    import numpy as np
+    import soundfile as sf
+
+    frames = int(seconds * sample_rate)
+    t = np.arange(frames, dtype=np.float32) / sample_rate
+    data = np.stack(
+        [0.5 * np.sin(2 * np.pi * (220 + 110 * c) * t) for c in range(channels)], axis=-1
+    )
+    sf.write(path, data, sample_rate, subtype="PCM_16")
+    return path
+
+
+def _video_frame(i, frames, xs, ys):
+    """合成视频的第 i 帧（BGR），相邻帧的内容都不相同"""
+    import numpy as np
+
+    frame = np.empty(xs.shape + (3,), dtype=np.uint8)
+    frame[..., 0] = (xs + i * 3) % 256
+    frame[..., 1] = (ys + i * 5) % 256
+    frame[..., 2] = (i * 255 // max(frames - 1, 1))
+    return frame
+
+
+def make_video(path, frames=48, width=256, height=256, fps=24.0, fourcc="MJPG"):
+    """用 cv2.VideoWriter 生成带逐帧变化内容的合成视频"""
+    import cv2
+    import numpy as np
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"无法创建合成视频: {path}")
+    ys, xs = np.mgrid[0:height, 0:width]
+    for i in range(frames):
+        writer.write(_video_frame(i, frames, xs, ys))
+    writer.release()
+    return path
+
+
+def make_vfr_video(path, ffmpeg, frames=600, width=256, height=256, fps=30.0, gop=48):
+    """
+    用 ffmpeg（libx264）生成可变帧率的合成视频：前一半帧间隔 1/fps，后一半 2/fps，
+    内容与 make_video 相同。
+    """
+    import numpy as np
+
+    half = frames // 2
+    command = [
+        ffmpeg, "-y", "-nostdin", "-v", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        "-vf", f"setpts='if(lt(N,{half}),N,{half}+(N-{half})*2)/{fps}/TB',format=yuv420p",
+        "-fps_mode", "passthrough", "-c:v", "libx264", "-g", str(gop), path,
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    ys, xs = np.mgrid[0:height, 0:width]
+    try:
+        for i in range(frames):
+            process.stdin.write(_video_frame(i, frames, xs, ys).tobytes())
+    finally:
+        process.stdin.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"无法创建可变帧率合成视频: {stderr.decode('utf-8', 'replace').strip()}")
+    return path
+
+
+class InputContext:
+    """合成输入的尺寸参数"""
+
+    def __init__(self, height=64, width=64, batch=1, audio_seconds=5.0, work_dir=None, seed=0):
+        self.height = height
+        self.width = width
+        self.batch = batch
+        self.audio_seconds = audio_seconds
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="utk_bench_inputs_")
+        self.seed = seed
+
+    def path(self, name):
+        return os.path.join(self.work_dir, name)
+
+
+def _synthetic_image(ctx, channels=3):
+    import torch
+
+    generator = torch.Generator().manual_seed(ctx.seed)
+    return torch.rand((ctx.batch, ctx.height, ctx.width, channels), generator=generator)
+
+
+def _synthetic_mask(ctx):
+    import torch
+
+    mask = torch.zeros((ctx.batch, ctx.height, ctx.width))
+    mask[:, ctx.height // 4 : ctx.height * 3 // 4, ctx.width // 4 : ctx.width * 3 // 4] = 1.0
+    return mask
+
+
+def _synthetic_audio(ctx, sample_rate=44100):
+    import torch
+
+    generator = torch.Generator().manual_seed(ctx.seed)
+    samples = int(ctx.audio_seconds * sample_rate)
+    waveform = torch.rand((1, 2, samples), generator=generator) * 2 - 1
+    return {"waveform": waveform, "sample_rate": sample_rate}
+
+
+def _default_value(spec):
+    type_name = spec[0]
+    options = spec[1] if len(spec) > 1 and isinstance(spec[1], dict) else {}
+    if isinstance(type_name, (list, tuple)):
+        default = options.get("default")
+        return default if default in type_name else (type_name[0] if type_name else None)
+    if "default" in options:
+        return options["default"]
+    if type_name in ("INT", "FLOAT"):
+        return options.get("min", 0)
+    if type_name == "BOOLEAN":
+        return False
+    if type_name == "STRING":
+        return ""
+    return None
+
+
+def _crop_box_inputs(ctx):
+    import torch
+
+    half = InputContext(ctx.height // 2, ctx.width // 2, ctx.batch, seed=ctx.seed + 1)
+    return {
+        "croped_image": _synthetic_image(half),
+        "croped_mask": torch.ones((ctx.batch, ctx.height // 2, ctx.width // 2)),
+        "crop_box": [0, 0, ctx.width // 2, ctx.height // 2],
+    }
+
+
+def _video_inputs(ctx):
+    path = ctx.path(f"clip_{ctx.width}x{ctx.height}_{ctx.batch}.avi")
+    if not os.path.isfile(path):
+        make_video(path, frames=max(ctx.batch, 2), width=ctx.width, height=ctx.height)
+    return {"video_path": path, "target_frames": max(ctx.batch, 1), "images": None}
+
+
+def _audio_file_inputs(ctx):
+    path = ctx.path(f"audio_{ctx.audio_seconds:g}s.wav")
+    if not os.path.isfile(path):
+        make_wav(path, seconds=ctx.audio_seconds)
+    return {"path": path}
+
+
+# ComfyUI 执行器注入的隐藏参数
+HIDDEN_INPUT_VALUES = {"PROMPT": {}, "EXTRA_PNGINFO": {}, "UNIQUE_ID": "0"}
+
+# 节点特定的输入覆盖；值为 None 表示不传该参数
+NODE_INPUT_OVERRIDES = {
+    "BboxVisualize_UTK": lambda ctx: {
+        "bboxes": [[ctx.width // 4, ctx.height // 4, ctx.width // 2, ctx.height // 2]] * ctx.batch
+    },
+    "RestoreCropBox_UTK": _crop_box_inputs,
+    "Extract_Video_Frames_UTK": _video_inputs,
+    "LoadAudioPlusFromPath_UTK": _audio_file_inputs,
+    "LazySwitchKJ_UTK": lambda ctx: {
+        "on_false": _synthetic_image(ctx),
+        "on_true": _synthetic_image(ctx),
+    },
+    "PurgeVRAM_UTK": lambda ctx: {"anything": _synthetic_image(ctx)},
+    "ImageRemoveAlpha_UTK": lambda ctx: {"RGBA_image": _synthetic_image(ctx, channels=4)},
+    "ImageScaleByAspectRatio_UTK": lambda ctx: {
+        "scale_to_side": "longest",
+        "scale_to_length": max(ctx.height, ctx.width) // 2,
+    },
+    "ImageBatchExtendWithOverlap_UTK": lambda ctx: {
+        "overlap": max(ctx.batch // 4, 1),
+        "source_images": _synthetic_image(InputContext(ctx.height, ctx.width, max(ctx.batch, 2))),
+        "new_images": _synthetic_image(InputContext(ctx.height, ctx.width, max(ctx.batch, 2), seed=1)),
+    },
+    "GetImageRangeFromBatch_UTK": lambda ctx: {"num_frames": max(ctx.batch // 2, 1)},
+    "MathExpression_UTK": lambda ctx: {"expression": "(1 + 2) * 3"},
+}
+
+
+def build_inputs(node_name, node_class, ctx):
+    """根据 INPUT_TYPES 生成合成参数：必填参数全部提供，可选参数只提供 IMAGE/MASK"""
+    input_types = node_class.INPUT_TYPES()
+    kwargs = {}
+    sections = (("required", True), ("optional", False))
+    for section, required in sections:
+        for name, spec in input_types.get(section, {}).items():
+            type_name = spec[0]
+            if type_name == "IMAGE":
+                kwargs[name] = _synthetic_image(ctx)
+            elif type_name == "MASK":
+                kwargs[name] = _synthetic_mask(ctx)
+            elif type_name == "AUDIO":
+                kwargs[name] = _synthetic_audio(ctx)
+            elif required:
+                kwargs[name] = _default_value(spec)
+    for name, type_name in input_types.get("hidden", {}).items():
+        kwargs[name] = HIDDEN_INPUT_VALUES.get(type_name)
+    override = NODE_INPUT_OVERRIDES.get(node_name)
+    if override is not None:
+        for name, value in override(ctx).items():
+            if value is None:
+                kwargs.pop(name, None)
+            else:
+                kwargs[name] = value
+    return kwargs
+
+
+def call_node(node_class, kwargs):
+    """与 ComfyUI 执行器一样实例化节点并调用 FUNCTION"""
+    instance = node_class()
+    return getattr(instance, node_class.FUNCTION)(**kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Child processes and result files
+# ---------------------------------------------------------------------------
+
+
+def emit_result(data):
+    """子进程通过带标记的一行 JSON 把结果交给父进程"""
+    sys.stdout.flush()
+    print(RESULT_MARKER + json.dumps(data), flush=True)
+
+
+def run_child(script, args, timeout=600, env=None):
+    """在全新解释器中运行脚本的子模式并解析其结果"""
+    command = [sys.executable, script] + list(args)
+    try:
+        result = subprocess.run(
+            command, capture_output=True, text=True, timeout=timeout, env=env
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timeout after {timeout}s"}
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER) :])
+    tail = (result.stderr or result.stdout).strip().splitlines()[-5:]
+    return {"error": f"exit code {result.returncode}", "stderr": tail}
+
+
+def write_json(data, path=None):
+    text = json.dumps(data, indent=2, ensure_ascii=False, sort_keys=False)
+    if path:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        log(f"结果已写入 {path}", message_type="finish")
+    else:
+        print(text)
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,95 @@
+"""
+Frame Index Planner Micro-Benchmark
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Times ``plan_frame_indices`` (the planner behind
+``Extract_Video_Frames_UTK.calculate_frame_indices``) for every sampling mode
+over growing ``target_frames`` and reports the cost per index, which should
+stay flat as the target grows. Every plan is also validated: exactly
+``min(target, total)`` indices, strictly increasing, inside ``[0, total)``.
+
+Usage::
+
+    python benchmarks/frame_index_bench.py
+    python benchmarks/frame_index_bench.py --targets 1000,10000,65536 --total 2000000 --output results/frame_index.json
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_common  # noqa: E402
+
+
+def _validate(indices, total, target):
+    import numpy as np
+
+    expected = min(total, target)
+    if len(indices) != expected:
+        return f"{len(indices)} indices, expected {expected}"
+    if expected and (indices[0] < 0 or indices[-1] >= total):
+        return "index out of range"
+    if expected > 1 and not bool(np.all(np.diff(indices) > 0)):
+        return "indices not strictly increasing"
+    return None
+
+
+def run_benchmark(targets, total, repeats):
+    bench_common.register_package_shell()
+    video_utils = importlib.import_module(f"{bench_common.PACKAGE_NAME}.nodes.video_utils")
+
+    report = {
+        "benchmark": "frame_index_bench",
+        "environment": bench_common.environment_info(),
+        "settings": {"total_frames": total, "repeats": repeats},
+        "results": {},
+        "failures": [],
+    }
+    for mode in video_utils.SAMPLING_MODES:
+        for target in targets:
+            times = []
+            indices = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                indices = video_utils.plan_frame_indices(total, target, mode)
+                times.append(time.perf_counter() - start)
+            wall = bench_common.median(times)
+            key = f"{mode}|target={target}"
+            error = _validate(indices, total, target)
+            report["results"][key] = {
+                "wall_ms": wall * 1000,
+                "ns_per_index": wall * 1e9 / max(len(indices), 1),
+                "error": error,
+            }
+            if error:
+                report["failures"].append(key)
+            bench_common.log(
+                f"{key}: {wall * 1000:.3f} ms, {report['results'][key]['ns_per_index']:.1f} ns/index"
+                + (f"  <-- {error}" if error else ""),
+                message_type="warning" if error else "info",
+            )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalToolkit frame index planner micro-benchmark")
+    parser.add_argument("--output", help="JSON 输出路径（默认输出到 stdout）")
+    parser.add_argument("--targets", default="100,1000,10000,65536", help="目标帧数列表")
+    parser.add_argument("--total", type=int, default=1000000, help="视频总帧数")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    report = run_benchmark([int(v) for v in args.targets.split(",")], args.total, args.repeats)
+    bench_common.write_json(report, args.output)
+    sys.exit(1 if report["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Import-Time And Cold-Start Benchmark
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Measures, each in a fresh interpreter with ComfyUI stubbed out:
+
+- wall time and RSS growth of importing every module under ``nodes/``
+- wall time and RSS growth of importing the whole toolkit package
+- first-call (cold) and second-call (warm) latency of every registered node
+
+Modules that ComfyUI itself has already loaded (torch, numpy, PIL, aiohttp)
+are imported before the measurement starts, so the numbers reflect what the
+toolkit adds to a ComfyUI boot. Results are written as JSON.
+
+Usage::
+
+    python benchmarks/import_time.py --output benchmarks/results/import_time.json
+    python benchmarks/import_time.py --repeat 5 --nodes CheckMask_UTK,ColorMatch_UTK
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_common  # noqa: E402
+
+SCRIPT = os.path.abspath(__file__)
+
+
+def _preload_comfy_modules():
+    for name in bench_common.COMFY_PRELOADED_MODULES:
+        importlib.import_module(name)
+    bench_common.install_comfy_stubs()
+
+
+def _child_module(module_name):
+    _preload_comfy_modules()
+    bench_common.register_package_shell()
+    before_modules = bench_common.top_level_modules()
+    rss_before = bench_common.rss_mb()
+    start = time.perf_counter()
+    error = None
+    try:
+        importlib.import_module(f"{bench_common.PACKAGE_NAME}.{module_name}")
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall_ms = (time.perf_counter() - start) * 1000
+    new_modules = bench_common.top_level_modules() - before_modules
+    new_modules.discard(bench_common.PACKAGE_NAME)
+    return {
+        "wall_ms": wall_ms,
+        "rss_delta_mb": bench_common.rss_mb() - rss_before,
+        "peak_rss_mb": bench_common.peak_rss_mb(),
+        "new_modules": sorted(new_modules),
+        "error": error,
+    }
+
+
+def _child_package():
+    _preload_comfy_modules()
+    before_modules = bench_common.top_level_modules()
+    rss_before = bench_common.rss_mb()
+    start = time.perf_counter()
+    toolkit = bench_common.load_toolkit()
+    wall_ms = (time.perf_counter() - start) * 1000
+    new_modules = bench_common.top_level_modules() - before_modules
+    new_modules.discard(bench_common.PACKAGE_NAME)
+    return {
+        "wall_ms": wall_ms,
+        "rss_delta_mb": bench_common.rss_mb() - rss_before,
+        "peak_rss_mb": bench_common.peak_rss_mb(),
+        "node_count": len(toolkit.NODE_CLASS_MAPPINGS),
+        "new_modules": sorted(new_modules),
+    }
+
+
+def _list_nodes():
+    _preload_comfy_modules()
+    toolkit = bench_common.load_toolkit()
+    return {"nodes": sorted(toolkit.NODE_CLASS_MAPPINGS)}
+
+
+def _child_node(node_name, size):
+    _preload_comfy_modules()
+    toolkit = bench_common.load_toolkit()
+    node_class = toolkit.NODE_CLASS_MAPPINGS[node_name]
+    ctx = bench_common.InputContext(height=size, width=size, batch=1)
+    kwargs = bench_common.build_inputs(node_name, node_class, ctx)
+
+    before_modules = bench_common.top_level_modules()
+    rss_before = bench_common.rss_mb()
+    timings = []
+    error = None
+    for _ in range(2):
+        start = time.perf_counter()
+        try:
+            bench_common.call_node(node_class, kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            break
+        timings.append((time.perf_counter() - start) * 1000)
+    new_modules = bench_common.top_level_modules() - before_modules
+    return {
+        "first_ms": timings[0] if timings else None,
+        "second_ms": timings[1] if len(timings) > 1 else None,
+        "rss_delta_mb": bench_common.rss_mb() - rss_before,
+        "new_modules": sorted(new_modules),
+        "error": error,
+    }
+
+
+def _repeat_child(args, repeat, keys):
+    """重复运行子进程，对计时字段取中位数"""
+    runs = [bench_common.run_child(SCRIPT, args) for _ in range(repeat)]
+    ok_runs = [run for run in runs if "error" not in run or run.get("error") is None]
+    if not ok_runs:
+        return runs[-1]
+    result = dict(ok_runs[-1])
+    for key in keys:
+        values = [run[key] for run in ok_runs if run.get(key) is not None]
+        result[key] = bench_common.median(values)
+    result["runs"] = len(ok_runs)
+    return result
+
+
+def run_benchmark(repeat=3, node_filter=None, size=64, skip_modules=False, skip_nodes=False):
+    report = {
+        "benchmark": "import_time",
+        "environment": bench_common.environment_info(),
+        "settings": {"repeat": repeat, "first_call_size": size},
+        "preloaded_modules": list(bench_common.COMFY_PRELOADED_MODULES),
+        "baseline": _repeat_child(["--child-baseline"], repeat, ("rss_mb",)),
+        "package": _repeat_child(["--child-package"], repeat, ("wall_ms", "rss_delta_mb", "peak_rss_mb")),
+        "modules": {},
+        "first_call": {},
+    }
+    bench_common.log(
+        f"toolkit package: {report['package'].get('wall_ms', 0):.1f} ms, "
+        f"+{report['package'].get('rss_delta_mb', 0):.1f} MB"
+    )
+
+    if not skip_modules:
+        for module_name in bench_common.iter_node_modules():
+            result = _repeat_child(
+                ["--child-module", module_name], repeat, ("wall_ms", "rss_delta_mb", "peak_rss_mb")
+            )
+            report["modules"][module_name] = result
+            bench_common.log(
+                f"{module_name}: {result.get('wall_ms') or 0:.1f} ms, "
+                f"+{result.get('rss_delta_mb') or 0:.1f} MB {result.get('new_modules', [])}"
+            )
+
+    if not skip_nodes:
+        node_names = bench_common.run_child(SCRIPT, ["--list-nodes"]).get("nodes", [])
+        if node_filter:
+            node_names = [name for name in node_names if name in node_filter]
+        for node_name in node_names:
+            if node_name in bench_common.SKIP_NODES:
+                report["first_call"][node_name] = {"skipped": bench_common.SKIP_NODES[node_name]}
+                continue
+            result = _repeat_child(
+                ["--child-node", node_name, "--size", str(size)],
+                repeat,
+                ("first_ms", "second_ms", "rss_delta_mb"),
+            )
+            report["first_call"][node_name] = result
+            if result.get("error"):
+                bench_common.log(f"{node_name}: {result['error']}", message_type="warning")
+            else:
+                bench_common.log(
+                    f"{node_name}: first {result.get('first_ms') or 0:.1f} ms, "
+                    f"second {result.get('second_ms') or 0:.1f} ms {result.get('new_modules', [])}"
+                )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalToolkit import-time / cold-start benchmark")
+    parser.add_argument("--output", help="JSON 输出路径（默认输出到 stdout）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量的全新解释器次数（取中位数）")
+    parser.add_argument("--nodes", help="只测量这些节点的首次调用（逗号分隔）")
+    parser.add_argument("--size", type=int, default=64, help="首次调用使用的合成图像边长")
+    parser.add_argument("--skip-modules", action="store_true", help="跳过逐模块导入测量")
+    parser.add_argument("--skip-nodes", action="store_true", help="跳过节点首次调用测量")
+    parser.add_argument("--child-module", help=argparse.SUPPRESS)
+    parser.add_argument("--child-node", help=argparse.SUPPRESS)
+    parser.add_argument("--child-package", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--child-baseline", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--list-nodes", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_module:
+        bench_common.emit_result(_child_module(args.child_module))
+    elif args.child_node:
+        bench_common.emit_result(_child_node(args.child_node, args.size))
+    elif args.child_package:
+        bench_common.emit_result(_child_package())
+    elif args.child_baseline:
+        _preload_comfy_modules()
+        bench_common.emit_result({"rss_mb": bench_common.rss_mb()})
+    elif args.list_nodes:
+        bench_common.emit_result(_list_nodes())
+    else:
+        node_filter = set(args.nodes.split(",")) if args.nodes else None
+        report = run_benchmark(
+            repeat=max(args.repeat, 1),
+            node_filter=node_filter,
+            size=args.size,
+            skip_modules=args.skip_modules,
+            skip_nodes=args.skip_nodes,
+        )
+        bench_common.write_json(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
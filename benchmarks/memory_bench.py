@@ -0,0 +1,294 @@
+"""
+Node Peak-Memory Regression Suite
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Measures how much memory each node needs on top of its inputs. Every case runs
+in a fresh interpreter: the inputs are built first, then the node is called
+while peak RSS (``VmHWM``, reset through ``/proc/self/clear_refs`` where the
+kernel allows it, otherwise a 1 ms sampling thread) and the tracemalloc peak
+(Python / numpy allocations) are recorded.
+
+``peak_ratio`` is the peak growth divided by the input bytes (output bytes for
+generator nodes without tensor inputs). Cases above ``--max-ratio`` are flagged;
+those are the nodes whose transient copies cause out-of-memory kills.
+
+Usage::
+
+    # built-in stress scenarios (EmptyUnitGenerator B=9999, long video extraction, ...)
+    python benchmarks/memory_bench.py --output results/memory.json
+
+    # every image / mask / audio node at one size
+    python benchmarks/memory_bench.py --matrix --sizes 1024 --batches 16 --max-ratio 4
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_common  # noqa: E402
+
+SCRIPT = os.path.abspath(__file__)
+
+
+def _grid_mask(ctx, cell=64):
+    """棋盘式分布的独立方块，每个方块都是一个连通区域"""
+    import torch
+
+    mask = torch.zeros((ctx.batch, ctx.height, ctx.width))
+    for y in range(cell // 4, ctx.height - cell // 2, cell):
+        for x in range(cell // 4, ctx.width - cell // 2, cell):
+            mask[:, y : y + cell // 2, x : x + cell // 2] = 1.0
+    return mask
+
+
+# 已知会产生大量临时拷贝的节点/参数组合
+SCENARIOS = {
+    "empty_unit_batch_9999": {
+        "node": "EmptyUnitGenerator_UTK",
+        "height": 64,
+        "width": 64,
+        "batch": 1,
+        "params": lambda ctx: {"ratio": "custom", "width": 64, "height": 64, "divisor": 8, "batch": 9999},
+    },
+    "extract_video_frames_long": {
+        "node": "Extract_Video_Frames_UTK",
+        "height": 512,
+        "width": 512,
+        "batch": 240,
+    },
+    "separate_masks_many_components": {
+        "node": "SeparateMasks_UTK",
+        "height": 1024,
+        "width": 1024,
+        "batch": 1,
+        "params": lambda ctx: {
+            "mask": _grid_mask(ctx),
+            "size_threshold_width": 0,
+            "size_threshold_height": 0,
+        },
+    },
+    "image_batch_extend_overlap": {
+        "node": "ImageBatchExtendWithOverlap_UTK",
+        "height": 512,
+        "width": 512,
+        "batch": 64,
+    },
+    "batch_map_scale_long_batch": {
+        "node": "BatchMap_UTK",
+        "height": 512,
+        "width": 512,
+        "batch": 256,
+        "params": lambda ctx: {
+            "node": "ImageScaleByAspectRatio_UTK",
+            "params": '{"aspect_ratio": "original", "fit": "pad", "scale_to_side": "longest", '
+            '"scale_to_length": 768}',
+            "memory_budget_mb": 256,
+            "working_set_factor": 4.0,
+        },
+    },
+}
+
+
+class _RssSampler(threading.Thread):
+    """无法重置 VmHWM 时，以固定间隔采样 RSS 的最大值"""
+
+    def __init__(self, interval=0.001):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_mb = bench_common.rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_mb = max(self.peak_mb, bench_common.rss_mb())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak_mb = max(self.peak_mb, bench_common.rss_mb())
+        return self.peak_mb
+
+
+def _reset_peak_rss():
+    """Linux 上通过 clear_refs 把 VmHWM 重置为当前 RSS，成功返回 True"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _read_hwm_mb() is not None
+    except OSError:
+        return False
+
+
+def _read_hwm_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _child_case(case):
+    bench_common.install_comfy_stubs()
+    toolkit = bench_common.load_toolkit()
+    node_name = case["node"]
+    node_class = toolkit.NODE_CLASS_MAPPINGS[node_name]
+    ctx = bench_common.InputContext(
+        case.get("height", 512),
+        case.get("width", 512),
+        case.get("batch", 1),
+        audio_seconds=case.get("audio_seconds", 60.0),
+    )
+    kwargs = bench_common.build_inputs(node_name, node_class, ctx)
+    scenario = SCENARIOS.get(case.get("scenario"))
+    if scenario and "params" in scenario:
+        kwargs.update(scenario["params"](ctx))
+    input_bytes = bench_common.tensor_bytes(kwargs)
+
+    # 预热一次小调用会让首次导入的模块计入峰值，因此这里只做垃圾回收
+    gc.collect()
+    hwm_available = _reset_peak_rss()
+    sampler = None if hwm_available else _RssSampler()
+    if sampler is not None:
+        sampler.start()
+    rss_before = bench_common.rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    error = None
+    output = None
+    try:
+        output = bench_common.call_node(node_class, kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall_ms = (time.perf_counter() - start) * 1000
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_mb = _read_hwm_mb() if hwm_available else sampler.stop()
+    output_bytes = bench_common.tensor_bytes(output)
+
+    peak_delta_bytes = max(peak_mb - rss_before, 0.0) * 1024 * 1024
+    reference_bytes = input_bytes or output_bytes
+    return {
+        "node": node_name,
+        "height": ctx.height,
+        "width": ctx.width,
+        "batch": ctx.batch,
+        "wall_ms": wall_ms,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "peak_rss_delta_bytes": int(peak_delta_bytes),
+        "tracemalloc_peak_bytes": traced_peak,
+        "transient_bytes": int(max(peak_delta_bytes - output_bytes, 0)),
+        "reference": "input" if input_bytes else "output",
+        "peak_ratio": peak_delta_bytes / reference_bytes if reference_bytes else None,
+        "peak_method": "VmHWM" if hwm_available else "sampled",
+        "error": error,
+    }
+
+
+def build_case_list(use_matrix, sizes, batches, node_filter=None, audio_seconds=60.0):
+    cases = {}
+    if use_matrix:
+        import node_bench
+
+        bench_common.install_comfy_stubs()
+        toolkit = bench_common.load_toolkit()
+        for node_name in node_bench.select_nodes(toolkit.NODE_CLASS_MAPPINGS, node_filter):
+            node_class = toolkit.NODE_CLASS_MAPPINGS[node_name]
+            if node_bench._is_audio_node(node_name, node_class):
+                cases[f"{node_name}|audio={audio_seconds:g}s"] = {
+                    "node": node_name,
+                    "audio_seconds": audio_seconds,
+                }
+                continue
+            for size in sizes:
+                for batch in batches:
+                    cases[f"{node_name}|{size}x{size}|B={batch}"] = {
+                        "node": node_name,
+                        "height": size,
+                        "width": size,
+                        "batch": batch,
+                    }
+    else:
+        for name, scenario in SCENARIOS.items():
+            if node_filter and scenario["node"] not in node_filter:
+                continue
+            case = {key: scenario[key] for key in ("node", "height", "width", "batch")}
+            case["scenario"] = name
+            cases[name] = case
+    return cases
+
+
+def run_benchmark(cases, max_ratio=3.0, timeout=900):
+    report = {
+        "benchmark": "memory_bench",
+        "environment": bench_common.environment_info(),
+        "settings": {"max_ratio": max_ratio},
+        "results": {},
+        "flagged": [],
+    }
+    for key, case in cases.items():
+        result = bench_common.run_child(SCRIPT, ["--child-case", json.dumps(case)], timeout=timeout)
+        ratio = result.get("peak_ratio")
+        result["flagged"] = bool(ratio is not None and ratio > max_ratio)
+        report["results"][key] = result
+        if result.get("error"):
+            bench_common.log(f"{key}: {result['error']}", message_type="warning")
+            continue
+        if result["flagged"]:
+            report["flagged"].append(key)
+        bench_common.log(
+            f"{key}: peak +{result['peak_rss_delta_bytes'] / 1048576:.1f} MB, "
+            f"{result['reference']} {max(result['input_bytes'], result['output_bytes']) / 1048576:.1f} MB, "
+            f"ratio {ratio if ratio is not None else float('nan'):.2f}"
+            + ("  <-- exceeds limit" if result["flagged"] else ""),
+            message_type="warning" if result["flagged"] else "info",
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalToolkit node peak-memory regression suite")
+    parser.add_argument("--output", help="JSON 输出路径（默认输出到 stdout）")
+    parser.add_argument("--matrix", action="store_true", help="测量所有图像/遮罩/音频节点，而不是内置压力场景")
+    parser.add_argument("--sizes", default="1024", help="--matrix 使用的图像边长列表")
+    parser.add_argument("--batches", default="16", help="--matrix 使用的批次列表")
+    parser.add_argument("--audio-seconds", type=float, default=60.0, help="--matrix 中音频节点的时长（秒）")
+    parser.add_argument("--nodes", help="只测量这些节点（逗号分隔）")
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="峰值增长超过输入字节数该倍数时标记")
+    parser.add_argument("--timeout", type=int, default=900, help="单个用例的超时时间（秒）")
+    parser.add_argument("--child-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_case:
+        bench_common.emit_result(_child_case(json.loads(args.child_case)))
+        return
+
+    node_filter = set(args.nodes.split(",")) if args.nodes else None
+    cases = build_case_list(
+        args.matrix,
+        [int(v) for v in args.sizes.split(",")],
+        [int(v) for v in args.batches.split(",")],
+        node_filter=node_filter,
+        audio_seconds=args.audio_seconds,
+    )
+    report = run_benchmark(cases, max_ratio=args.max_ratio, timeout=args.timeout)
+    bench_common.write_json(report, args.output)
+    sys.exit(1 if report["flagged"] else 0)
+
+
+if __name__ == "__main__":
+    main()
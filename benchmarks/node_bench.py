@@ -0,0 +1,247 @@
+"""
+Synthetic-Workload Node Benchmark
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Runs every image, mask and audio node on synthetic inputs across a size and
+batch matrix (CPU only, ComfyUI stubbed out) and stores the timings as a JSON
+baseline. A second run can be compared against a stored baseline to get a
+per-case speedup / regression report.
+
+Usage::
+
+    # quick matrix, save a baseline
+    python benchmarks/node_bench.py --output results/nodes_base.json
+
+    # full 512²..4096², B=1..256 matrix for a few nodes
+    python benchmarks/node_bench.py --preset full --nodes ResizeImageVerKJ_UTK,ColorMatch_UTK
+
+    # compare a new run against the baseline
+    python benchmarks/node_bench.py --output results/nodes_new.json --compare results/nodes_base.json
+
+    # compare two stored result files without running anything
+    python benchmarks/node_bench.py --report results/nodes_base.json results/nodes_new.json
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_common  # noqa: E402
+
+BENCH_CATEGORIES = ("UniversalToolkit/Image", "UniversalToolkit/Mask", "UniversalToolkit/Audio")
+
+# 音频节点不使用图像尺寸矩阵，而是按音频时长（秒）测量
+AUDIO_TYPES = ("AUDIO",)
+
+PRESETS = {
+    "quick": {"sizes": [512, 1024], "batches": [1, 4], "audio_seconds": [10, 60]},
+    "standard": {"sizes": [512, 1024, 2048], "batches": [1, 8, 32], "audio_seconds": [10, 60, 300]},
+    "full": {
+        "sizes": [512, 1024, 2048, 4096],
+        "batches": [1, 4, 16, 64, 256],
+        "audio_seconds": [10, 60, 300, 1800],
+    },
+}
+
+
+def _is_audio_node(node_name, node_class):
+    if node_class.CATEGORY == "UniversalToolkit/Audio":
+        return True
+    required = node_class.INPUT_TYPES().get("required", {})
+    return any(spec[0] in AUDIO_TYPES for spec in required.values())
+
+
+def select_nodes(node_class_mappings, node_filter=None):
+    names = []
+    for name, node_class in sorted(node_class_mappings.items()):
+        if node_filter and name not in node_filter:
+            continue
+        if not node_filter and getattr(node_class, "CATEGORY", "") not in BENCH_CATEGORIES:
+            continue
+        if name in bench_common.SKIP_NODES:
+            continue
+        names.append(name)
+    return names
+
+
+def _time_case(node_class, kwargs, repeat, warmup):
+    for _ in range(warmup):
+        bench_common.call_node(node_class, kwargs)
+    timings = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = bench_common.call_node(node_class, kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, output
+
+
+def case_key(node_name, case):
+    if "audio_seconds" in case:
+        return f"{node_name}|audio={case['audio_seconds']:g}s"
+    return f"{node_name}|{case['width']}x{case['height']}|B={case['batch']}"
+
+
+def build_cases(is_audio, settings):
+    if is_audio:
+        return [{"audio_seconds": seconds} for seconds in settings["audio_seconds"]]
+    cases = []
+    for size in settings["sizes"]:
+        for batch in settings["batches"]:
+            cases.append({"width": size, "height": size, "batch": batch})
+    # 从小到大执行，便于在单个节点超出时间预算后跳过更大的用例
+    return sorted(cases, key=lambda c: c["width"] * c["height"] * c["batch"])
+
+
+def run_benchmark(settings, node_filter=None, repeat=3, warmup=1, max_input_mb=2048, node_budget_s=60.0):
+    bench_common.install_comfy_stubs()
+    toolkit = bench_common.load_toolkit()
+    work_dir = bench_common.InputContext().work_dir
+    report = {
+        "benchmark": "node_bench",
+        "environment": bench_common.environment_info(),
+        "settings": dict(settings, repeat=repeat, warmup=warmup, max_input_mb=max_input_mb),
+        "results": {},
+    }
+
+    for node_name in select_nodes(toolkit.NODE_CLASS_MAPPINGS, node_filter):
+        node_class = toolkit.NODE_CLASS_MAPPINGS[node_name]
+        is_audio = _is_audio_node(node_name, node_class)
+        node_started = time.perf_counter()
+        over_budget = False
+        for case in build_cases(is_audio, settings):
+            key = case_key(node_name, case)
+            if over_budget:
+                report["results"][key] = dict(case, node=node_name, skipped="node time budget exceeded")
+                continue
+            if is_audio:
+                ctx = bench_common.InputContext(audio_seconds=case["audio_seconds"], work_dir=work_dir)
+            else:
+                ctx = bench_common.InputContext(case["height"], case["width"], case["batch"], work_dir=work_dir)
+                estimated_mb = case["width"] * case["height"] * case["batch"] * 4 * 4 / (1024 * 1024)
+                if estimated_mb > max_input_mb:
+                    report["results"][key] = dict(case, node=node_name, skipped=f"input > {max_input_mb} MB")
+                    continue
+            entry = dict(case, node=node_name)
+            try:
+                kwargs = bench_common.build_inputs(node_name, node_class, ctx)
+                entry["input_bytes"] = bench_common.tensor_bytes(kwargs)
+                timings, output = _time_case(node_class, kwargs, repeat, warmup)
+                entry.update(
+                    {
+                        "median_ms": bench_common.median(timings),
+                        "min_ms": min(timings),
+                        "max_ms": max(timings),
+                        "output_bytes": bench_common.tensor_bytes(output),
+                    }
+                )
+                bench_common.log(f"{key}: {entry['median_ms']:.1f} ms")
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+                bench_common.log(f"{key}: {entry['error']}", message_type="warning")
+            finally:
+                kwargs = output = None
+                gc.collect()
+            report["results"][key] = entry
+            if time.perf_counter() - node_started > node_budget_s:
+                over_budget = True
+    return report
+
+
+def compare_reports(baseline, current, threshold=0.10):
+    """逐用例对比中位耗时，返回 (rows, regressions)"""
+    rows = []
+    regressions = []
+    for key, entry in current["results"].items():
+        base = baseline["results"].get(key)
+        if not base or base.get("median_ms") is None or entry.get("median_ms") is None:
+            continue
+        ratio = entry["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        row = {
+            "case": key,
+            "baseline_ms": base["median_ms"],
+            "current_ms": entry["median_ms"],
+            "speedup": 1.0 / ratio if ratio else float("inf"),
+        }
+        rows.append(row)
+        if ratio > 1.0 + threshold:
+            regressions.append(row)
+    return rows, regressions
+
+
+def format_report(rows, regressions, threshold):
+    lines = [
+        f"{'case':<64} {'baseline ms':>12} {'current ms':>12} {'speedup':>8}",
+        "-" * 100,
+    ]
+    for row in rows:
+        flag = "  <-- regression" if row in regressions else ""
+        lines.append(
+            f"{row['case']:<64} {row['baseline_ms']:>12.2f} {row['current_ms']:>12.2f} "
+            f"{row['speedup']:>7.2f}x{flag}"
+        )
+    lines.append("-" * 100)
+    lines.append(
+        f"{len(rows)} comparable cases, {len(regressions)} slower than baseline by more than {threshold:.0%}"
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalToolkit synthetic-workload node benchmark")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick", help="尺寸/批次矩阵预设")
+    parser.add_argument("--sizes", help="覆盖图像边长列表，如 512,1024")
+    parser.add_argument("--batches", help="覆盖批次列表，如 1,16,256")
+    parser.add_argument("--audio-seconds", help="覆盖音频时长列表（秒），如 10,60")
+    parser.add_argument("--nodes", help="只测量这些节点（逗号分隔，可包含非图像类节点）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例的计时次数（取中位数）")
+    parser.add_argument("--warmup", type=int, default=1, help="每个用例的预热次数")
+    parser.add_argument("--max-input-mb", type=float, default=2048, help="跳过输入超过该大小的用例")
+    parser.add_argument("--node-budget", type=float, default=60.0, help="单个节点的时间预算（秒），超出后跳过更大的用例")
+    parser.add_argument("--output", help="JSON 结果路径（默认输出到 stdout）")
+    parser.add_argument("--compare", help="与该基线 JSON 对比并打印报告")
+    parser.add_argument("--threshold", type=float, default=0.10, help="判定回归的耗时增幅")
+    parser.add_argument("--report", nargs=2, metavar=("BASELINE", "CURRENT"), help="只对比两个已有结果文件")
+    args = parser.parse_args()
+
+    if args.report:
+        rows, regressions = compare_reports(
+            bench_common.read_json(args.report[0]), bench_common.read_json(args.report[1]), args.threshold
+        )
+        print(format_report(rows, regressions, args.threshold))
+        sys.exit(1 if regressions else 0)
+
+    settings = dict(PRESETS[args.preset])
+    if args.sizes:
+        settings["sizes"] = [int(v) for v in args.sizes.split(",")]
+    if args.batches:
+        settings["batches"] = [int(v) for v in args.batches.split(",")]
+    if args.audio_seconds:
+        settings["audio_seconds"] = [float(v) for v in args.audio_seconds.split(",")]
+    node_filter = set(args.nodes.split(",")) if args.nodes else None
+
+    report = run_benchmark(
+        settings,
+        node_filter=node_filter,
+        repeat=max(args.repeat, 1),
+        warmup=max(args.warmup, 0),
+        max_input_mb=args.max_input_mb,
+        node_budget_s=args.node_budget,
+    )
+    bench_common.write_json(report, args.output)
+
+    if args.compare:
+        rows, regressions = compare_reports(bench_common.read_json(args.compare), report, args.threshold)
+        print(format_report(rows, regressions, args.threshold), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
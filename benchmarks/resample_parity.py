@@ -0,0 +1,304 @@
+"""
+Resampling Parity Check
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Golden-image comparison of ``nodes/resample.py`` against PIL ``Image.resize``
+for every filter, plus a timing of one batched call against a per-frame PIL
+round trip (what the nodes did before).
+
+The ``pad_edge``, ``pad_edge_pixel`` and ``pillarbox_blur`` fit modes of
+``nodes/image_utils.fit_resize_image`` are compared against the per-frame PIL
+implementation they replaced (reproduced below as ``pil_fit_reference``). The
+PIL code truncates to 8 bits after the blur, the desaturation and the dim, and
+averages edges with integer division, so these modes are allowed
+``FIT_TOLERANCE`` levels.
+
+RGB and L images must match PIL within one 8-bit level (PIL rounds between the
+horizontal and vertical pass, the engine stays in float). Nearest must match
+exactly. RGBA alpha must match within one level; RGBA colour is reported only,
+because PIL premultiplies in 8 bits and loses precision at low alpha.
+
+Usage::
+
+    python benchmarks/resample_parity.py
+    python benchmarks/resample_parity.py --batch 300 --size 1024 --output results/resample.json
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_common  # noqa: E402
+
+# (宽, 高)：缩小、放大、不等比、整数倍与非整数倍
+TARGET_SIZES = [(64, 48), (262, 194), (300, 50), (17, 200), (13, 7), (500, 400), (131, 60)]
+SOURCE_SIZE = (131, 97)
+
+FIT_MODES = ("pad_edge", "pad_edge_pixel", "pillarbox_blur")
+# (宽, 高, 对齐)：左右留边、上下留边、偏向一侧、无留边
+FIT_TARGETS = [
+    (200, 97, "center"),
+    (131, 160, "center"),
+    (300, 120, "left"),
+    (300, 120, "right"),
+    (100, 150, "top"),
+    (100, 150, "bottom"),
+    (262, 194, "center"),
+]
+FIT_TOLERANCE = 2
+
+
+def _golden_source(mode, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    height, width = SOURCE_SIZE[1], SOURCE_SIZE[0]
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    yy, xx = np.mgrid[0:height, 0:width]
+    # 平滑渐变 + 硬边缘，覆盖振铃和截断
+    image[..., 1] = ((xx * 3 + yy * 2) % 256).astype(np.uint8)
+    image[height // 3 : height // 2, width // 3 : width * 2 // 3, 2] = 255
+    if mode == "L":
+        return image[..., 0].copy()
+    if mode == "RGBA":
+        alpha = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        return np.dstack([image, alpha])
+    return image
+
+
+def check_parity(resample_module):
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    filters = {
+        "lanczos": Image.LANCZOS,
+        "bicubic": Image.BICUBIC,
+        "hamming": Image.HAMMING,
+        "bilinear": Image.BILINEAR,
+        "box": Image.BOX,
+        "nearest": Image.NEAREST,
+    }
+    results = {}
+    failures = []
+    for mode in ("RGB", "L", "RGBA"):
+        source = _golden_source(mode)
+        tensor = torch.from_numpy(source.astype(np.float32) / 255.0).unsqueeze(0)
+        for method, pil_filter in filters.items():
+            worst = 0
+            worst_alpha = 0
+            for width, height in TARGET_SIZES:
+                expected = np.asarray(Image.fromarray(source).resize((width, height), pil_filter)).astype(np.int32)
+                actual = resample_module.resample(tensor, width, height, method)[0].numpy()
+                actual = np.round(actual * 255.0).astype(np.int32)
+                diff = np.abs(actual - expected)
+                if mode == "RGBA":
+                    worst_alpha = max(worst_alpha, int(diff[..., 3].max()))
+                    opaque = expected[..., 3] == 255
+                    worst = max(worst, int(diff[..., :3][opaque].max()) if opaque.any() else 0)
+                else:
+                    worst = max(worst, int(diff.max()))
+            tolerance = 0 if method == "nearest" else 1
+            key = f"{mode}|{method}"
+            if mode == "RGBA":
+                results[key] = {"max_diff_alpha": worst_alpha, "max_diff_opaque_color": worst}
+                passed = worst_alpha <= tolerance
+            else:
+                results[key] = {"max_diff": worst}
+                passed = worst <= tolerance
+            results[key]["passed"] = passed
+            if not passed:
+                failures.append(key)
+            bench_common.log(
+                f"{key}: {results[key]}", message_type="info" if passed else "warning"
+            )
+    return results, failures
+
+
+def _edge_fill(strip):
+    """旧实现的边缘平均色：逐通道整数除法"""
+    import numpy as np
+
+    pixels = np.asarray(strip).reshape(-1, len(strip.getbands())).astype(np.int64)
+    fill = tuple(int(v) for v in pixels.sum(axis=0) // len(pixels))
+    return fill if len(fill) > 1 else fill[0]
+
+
+def pil_fit_reference(image, target_width, target_height, fit, crop_position="center"):
+    """
+    节点改为批量张量实现之前的逐帧 PIL 版本（pad_edge / pad_edge_pixel /
+    pillarbox_blur），缩放滤波器固定为 LANCZOS。
+    """
+    from PIL import Image, ImageFilter
+
+    scale = min(target_width / image.width, target_height / image.height)
+    new_width = int(image.width * scale)
+    new_height = int(image.height * scale)
+    resized = image.resize((new_width, new_height), Image.LANCZOS)
+
+    if fit == "pillarbox_blur":
+        scale_fill = max(target_width / max(1, image.width), target_height / max(1, image.height))
+        bg_w = max(1, int(round(image.width * scale_fill)))
+        bg_h = max(1, int(round(image.height * scale_fill)))
+        bg = image.resize((bg_w, bg_h), Image.BILINEAR)
+        x0 = max(0, (bg_w - target_width) // 2)
+        y0 = max(0, (bg_h - target_height) // 2)
+        bg = bg.crop((x0, y0, x0 + target_width, y0 + target_height))
+        sigma = max(1.0, 0.006 * float(min(target_width, target_height)))
+        bg = bg.filter(ImageFilter.GaussianBlur(radius=sigma))
+        if bg.mode == "RGB":
+            luma = bg.split()[0].point(lambda v: int(0.2126 * v))
+            bg = Image.blend(bg, Image.merge("RGB", (luma, luma, luma)), 0.2)
+        result = bg.point(lambda v: int(v * 0.35))
+    else:
+        result = Image.new(image.mode, (target_width, target_height), "black")
+
+    free_width, free_height = target_width - new_width, target_height - new_height
+    paste_x, paste_y = {
+        "top": (free_width // 2, 0),
+        "bottom": (free_width // 2, free_height),
+        "left": (0, free_height // 2),
+        "right": (free_width, free_height // 2),
+    }.get(crop_position, (free_width // 2, free_height // 2))
+
+    if fit in ("pad_edge", "pad_edge_pixel"):
+        left, right = paste_x, free_width - paste_x
+        top, bottom = paste_y, free_height - paste_y
+        first_col = resized.crop((0, 0, 1, new_height))
+        last_col = resized.crop((new_width - 1, 0, new_width, new_height))
+        first_row = resized.crop((0, 0, new_width, 1))
+        last_row = resized.crop((0, new_height - 1, new_width, new_height))
+        if fit == "pad_edge_pixel":
+            if left > 0:
+                result.paste(first_col.resize((left, new_height), Image.NEAREST), (0, paste_y))
+            if right > 0:
+                result.paste(last_col.resize((right, new_height), Image.NEAREST), (paste_x + new_width, paste_y))
+            if top > 0:
+                result.paste(first_row.resize((new_width, top), Image.NEAREST), (paste_x, 0))
+                if left > 0:
+                    result.paste(resized.getpixel((0, 0)), (0, 0, left, top))
+                if right > 0:
+                    result.paste(resized.getpixel((new_width - 1, 0)), (paste_x + new_width, 0, target_width, top))
+            if bottom > 0:
+                y = paste_y + new_height
+                result.paste(last_row.resize((new_width, bottom), Image.NEAREST), (paste_x, y))
+                if left > 0:
+                    result.paste(resized.getpixel((0, new_height - 1)), (0, y, left, target_height))
+                if right > 0:
+                    corner = resized.getpixel((new_width - 1, new_height - 1))
+                    result.paste(corner, (paste_x + new_width, y, target_width, target_height))
+        else:
+            if left > 0:
+                result.paste(_edge_fill(first_col), (0, paste_y, left, paste_y + new_height))
+            if right > 0:
+                result.paste(_edge_fill(last_col), (paste_x + new_width, paste_y, target_width, paste_y + new_height))
+            if top > 0:
+                result.paste(_edge_fill(first_row), (0, 0, target_width, top))
+            if bottom > 0:
+                result.paste(_edge_fill(last_row), (0, paste_y + new_height, target_width, target_height))
+
+    result.paste(resized, (paste_x, paste_y))
+    return result
+
+
+def check_fit_modes(image_utils):
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    results = {}
+    failures = []
+    for mode in ("RGB", "L"):
+        source = _golden_source(mode)
+        tensor = torch.from_numpy(source.astype(np.float32) / 255.0).unsqueeze(0)
+        for fit in FIT_MODES:
+            worst = 0
+            for width, height, position in FIT_TARGETS:
+                expected = np.asarray(
+                    pil_fit_reference(Image.fromarray(source), width, height, fit, position)
+                ).astype(np.int32)
+                actual = image_utils.fit_resize_image(
+                    tensor, width, height, fit, "lanczos", "black", position
+                )[0].numpy()
+                actual = np.round(actual * 255.0).astype(np.int32).reshape(expected.shape)
+                worst = max(worst, int(np.abs(actual - expected).max()))
+            key = f"{mode}|{fit}"
+            passed = worst <= FIT_TOLERANCE
+            results[key] = {"max_diff": worst, "tolerance": FIT_TOLERANCE, "passed": passed}
+            if not passed:
+                failures.append(key)
+            bench_common.log(f"{key}: {results[key]}", message_type="info" if passed else "warning")
+    return results, failures
+
+
+def time_batch(resample_module, batch, size, target, method):
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    images = torch.rand((batch, size, size, 3))
+    start = time.perf_counter()
+    resample_module.resample(images, target, target, method)
+    engine_ms = (time.perf_counter() - start) * 1000
+
+    pil_filter = {"lanczos": Image.LANCZOS, "bicubic": Image.BICUBIC, "bilinear": Image.BILINEAR}.get(
+        method, Image.LANCZOS
+    )
+    start = time.perf_counter()
+    frames = torch.mul(images, 255.0).clamp_(0, 255).to(torch.uint8).numpy()
+    resized = [np.asarray(Image.fromarray(frame).resize((target, target), pil_filter)) for frame in frames]
+    torch.from_numpy(np.stack(resized)).float().div_(255.0)
+    pil_ms = (time.perf_counter() - start) * 1000
+    return {
+        "batch": batch,
+        "size": size,
+        "target": target,
+        "method": method,
+        "engine_ms": engine_ms,
+        "pil_loop_ms": pil_ms,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalToolkit resampling parity check against PIL")
+    parser.add_argument("--output", help="JSON 输出路径（默认输出到 stdout）")
+    parser.add_argument("--batch", type=int, default=64, help="计时用的批次大小")
+    parser.add_argument("--size", type=int, default=512, help="计时用的输入边长")
+    parser.add_argument("--target", type=int, default=768, help="计时用的输出边长")
+    parser.add_argument("--method", default="lanczos", help="计时用的滤波器")
+    args = parser.parse_args()
+
+    bench_common.register_package_shell()
+    resample_module = importlib.import_module(f"{bench_common.PACKAGE_NAME}.nodes.resample")
+    image_utils = importlib.import_module(f"{bench_common.PACKAGE_NAME}.nodes.image_utils")
+
+    results, failures = check_parity(resample_module)
+    fit_results, fit_failures = check_fit_modes(image_utils)
+    failures += fit_failures
+    timing = time_batch(resample_module, args.batch, args.size, args.target, args.method)
+    bench_common.log(
+        f"batch {args.batch} x {args.size}² -> {args.target}² {args.method}: "
+        f"engine {timing['engine_ms']:.0f} ms, PIL loop {timing['pil_loop_ms']:.0f} ms"
+    )
+    report = {
+        "benchmark": "resample_parity",
+        "environment": bench_common.environment_info(),
+        "parity": results,
+        "fit_modes": fit_results,
+        "failures": failures,
+        "timing": timing,
+    }
+    bench_common.write_json(report, args.output)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
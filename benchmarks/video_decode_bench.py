@@ -0,0 +1,180 @@
+"""
+Video Decode Benchmark
+~~~~~~~~~~~~~~~~~~~~~~
+
+Times ``Extract_Video_Frames_UTK`` frame decoding on a synthetic clip written
+with ``cv2.VideoWriter``: every installed decoder backend (OpenCV, PyAV,
+ffmpeg pipe) against single-stream OpenCV decode, each with several worker
+counts, plus the backend ``auto`` picks for the clip. When ffmpeg is
+available the same runs are repeated on a variable-frame-rate clip. Every
+result is compared with frames read one after another with
+``VideoCapture.read()`` (no seeking), so neither a speedup nor a parallel or
+seeking decode path can hide a wrong frame.
+
+Usage::
+
+    python benchmarks/video_decode_bench.py
+    python benchmarks/video_decode_bench.py --frames 3600 --width 1920 --height 1080 \\
+        --targets 400 --workers 1,4,8,16 --decoders cv2,pyav --output results/video_decode.json
+    python benchmarks/video_decode_bench.py --no-vfr
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_common  # noqa: E402
+
+
+def _time_decode(node, path, indices, workers, decoder, repeats):
+    times = []
+    frames = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = node.load_video_frames(path, indices, uint8_output=True, decode_workers=workers, decoder=decoder)
+        times.append((time.perf_counter() - start) * 1000)
+    return bench_common.median(times), frames
+
+
+def _sequential_frames(path, indices):
+    """不跳转、逐帧 read() 得到的参考帧，按 indices 顺序排列的 uint8 RGB 张量"""
+    import cv2
+    import numpy as np
+    import torch
+
+    wanted = set(indices)
+    frames = {}
+    cap = cv2.VideoCapture(path)
+    index = 0
+    while len(frames) < len(wanted):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if index in wanted:
+            frames[index] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        index += 1
+    cap.release()
+    return torch.from_numpy(np.stack([frames[i] for i in indices if i in frames]))
+
+
+def _run_clip(report, clip, node, video_utils, path, args):
+    """在一个合成视频上运行所有后端和线程数，结果写入 report"""
+    import torch
+
+    video_index = video_utils.get_video_index(path)
+    indices = node.calculate_frame_indices(video_index.frame_count, args.targets, args.mode)
+    reference = _sequential_frames(path, indices)
+    report["clips"][clip] = {"frames": video_index.frame_count, "vfr": video_index.vfr, "targets": len(indices)}
+    report["auto_decoder"][clip] = video_utils.select_decoder(path, video_index)
+    bench_common.log(f"{clip}: auto -> {report['auto_decoder'][clip]}")
+
+    baseline_ms = None
+    for decoder in args.decoders.split(","):
+        if not video_utils.DECODER_BACKENDS[decoder].available():
+            if decoder not in report["skipped"]:
+                report["skipped"].append(decoder)
+            bench_common.log(f"{decoder}: not installed, skipped", message_type="warning")
+            continue
+        for workers in [int(v) for v in args.workers.split(",")]:
+            key = f"{clip}|{decoder}|workers={workers}"
+            wall_ms, frames = _time_decode(node, path, indices, workers, decoder, args.repeats)
+            if baseline_ms is None:
+                baseline_ms = wall_ms
+            identical = bool(torch.equal(frames, reference))
+            if not identical:
+                report["mismatches"].append(key)
+            report["results"][key] = {
+                "wall_ms": wall_ms,
+                "speedup": baseline_ms / wall_ms if wall_ms else None,
+                "identical": identical,
+            }
+            bench_common.log(
+                f"{key}: {wall_ms:.0f} ms, x{baseline_ms / wall_ms:.2f}"
+                + ("" if identical else "  <-- frames differ from sequential decode"),
+                message_type="info" if identical else "warning",
+            )
+
+
+def run_benchmark(args):
+    bench_common.install_comfy_stubs()
+    bench_common.register_package_shell()
+    module = importlib.import_module(f"{bench_common.PACKAGE_NAME}.nodes.tools.load_video_frames")
+    video_utils = importlib.import_module(f"{bench_common.PACKAGE_NAME}.nodes.video_utils")
+    node = module.Extract_Video_Frames_UTK()
+
+    work_dir = tempfile.mkdtemp(prefix="utk_video_bench_")
+    # 自动选择结果写到临时目录，每次运行都重新测速
+    video_utils._INDEX_DIR = os.path.join(work_dir, "index")
+    try:
+        path = os.path.join(work_dir, f"clip.{args.container}")
+        bench_common.make_video(
+            path, frames=args.frames, width=args.width, height=args.height, fourcc=args.fourcc
+        )
+        report = {
+            "benchmark": "video_decode_bench",
+            "environment": bench_common.environment_info(),
+            "settings": {
+                "frames": args.frames,
+                "width": args.width,
+                "height": args.height,
+                "fourcc": args.fourcc,
+                "targets": args.targets,
+                "mode": args.mode,
+                "repeats": args.repeats,
+            },
+            "clips": {},
+            "auto_decoder": {},
+            "results": {},
+            "skipped": [],
+            "mismatches": [],
+        }
+        _run_clip(report, "cfr", node, video_utils, path, args)
+
+        ffmpeg = video_utils.find_ffmpeg()
+        if args.vfr and ffmpeg:
+            vfr_path = os.path.join(work_dir, "clip_vfr.mp4")
+            bench_common.make_vfr_video(vfr_path, ffmpeg, frames=args.frames, width=args.width, height=args.height)
+            _run_clip(report, "vfr", node, video_utils, vfr_path, args)
+        elif args.vfr:
+            report["skipped"].append("vfr")
+            bench_common.log("vfr: ffmpeg not found, variable-frame-rate clip skipped", message_type="warning")
+        return report
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalToolkit video decode benchmark")
+    parser.add_argument("--output", help="JSON 输出路径（默认输出到 stdout）")
+    parser.add_argument("--frames", type=int, default=1800, help="合成视频的总帧数")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--fourcc", default="mp4v", help="cv2.VideoWriter 编码器")
+    parser.add_argument("--container", default="mp4", help="合成视频的扩展名")
+    parser.add_argument("--targets", type=int, default=200, help="抽取的帧数")
+    parser.add_argument("--mode", default="average", help="抽取模式")
+    parser.add_argument("--workers", default="1,2,4,8", help="比较的解码线程数列表，第一个作为基准")
+    parser.add_argument("--decoders", default="cv2,pyav,ffmpeg", help="比较的解码后端列表，第一个作为基准，未安装的跳过")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-vfr", dest="vfr", action="store_false", help="跳过可变帧率视频（需要 ffmpeg）")
+    args = parser.parse_args()
+
+    # 节点的进度输出写到 stderr，stdout 只留给 JSON 结果
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(args)
+    bench_common.write_json(report, args.output)
+    sys.exit(1 if report["mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,12 @@ import math
 import os
 from pathlib import Path
 
-import librosa
-import soundfile as sf
 import torch
 
+from ..audio_utils import load_audio, load_audio_cached
+from ..file_fingerprint import file_fingerprint
+from ..tools.profiling import span
+
 FLOAT_MAX = 99999999999999999.0
 
 
@@ -35,7 +37,13 @@ class LoadAudioPlusFromPath_UTK:
                 ),
                 "resample_to_hz": ("FLOAT", {"default": 0, "min": 0, "max": FLOAT_MAX}),
                 "make_stereo": ("BOOLEAN", {"default": True}),
-            }
+            },
+            "optional": {
+                "cache_decoded": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "整段解码一次并缓存，之后同一文件的任意偏移和时长都直接从缓存切片（适合从同一长音频反复截取片段）",
+                }),
+            },
         }
 
     RETURN_TYPES = ("AUDIO", "INT", "INT", "FLOAT")
@@ -46,12 +54,9 @@ class LoadAudioPlusFromPath_UTK:
         return 10 ** (db / 20)
 
     @classmethod
-    def IS_CHANGED(cls, path: str, *args):
-        if os.path.exists(path):
-            mtime = os.path.getmtime(path)
-        else:
-            mtime = None
-        return (mtime, path, *args)
+    def IS_CHANGED(cls, path: str, **kwargs):
+        # 其余参数由 ComfyUI 自行比较，这里只反映文件内容是否变化
+        return file_fingerprint(path)
 
     def execute(
         self,
@@ -61,6 +66,7 @@ class LoadAudioPlusFromPath_UTK:
         duration_seconds: float,
         resample_to_hz: float,
         make_stereo: bool,
+        cache_decoded: bool = False,
     ):
         # 路径预处理：去除首尾单双引号，替换分隔符，兼容Windows绝对路径
         path = path.strip().strip('"').strip("'")
@@ -72,34 +78,39 @@ class LoadAudioPlusFromPath_UTK:
             raise FileNotFoundError(
                 f"音频文件不存在或路径错误: {path}\n请检查路径是否正确，注意不要包含多余的引号或空格，Windows下建议使用/或\\分隔符。"
             )
-        # 加载音频，异常时详细提示
+        # WAV/FLAC/OGG 等由 soundfile 跳转后只解码所需区间，其余格式回退到 librosa
         try:
             sr = int(resample_to_hz) if resample_to_hz > 0 else None
             duration = duration_seconds if duration_seconds > 0 else None
-            mix, sr = librosa.load(
-                path, sr=sr, mono=False, offset=offset_seconds, duration=duration
-            )
+            with span("decode"):
+                if cache_decoded:
+                    mix, sr = load_audio_cached(path, offset=offset_seconds, duration=duration, sr=sr)
+                else:
+                    mix, sr, _ = load_audio(path, offset=offset_seconds, duration=duration, sr=sr)
         except Exception as e:
             raise RuntimeError(
                 f"音频加载失败: {e}\n请确认文件格式是否受支持，路径是否包含特殊字符。"
             )
-        # shape调整
-        if len(mix.shape) == 1:
-            mix = torch.stack([mix], dim=0)
+        # cache_decoded 时 mix 是 PCM 缓存波形的视图，输出前必须复制一份
+        shares_cache = cache_decoded
+        # shape调整：mix 为 [C, N]
         if make_stereo:
             if mix.shape[0] == 1:
                 mix = torch.cat([mix, mix], dim=0)
+                shares_cache = False
             elif mix.shape[0] == 2:
                 pass
             else:
                 raise ValueError(
                     f"Input audio has {mix.shape[0]} channels, cannot convert to stereo (2 channels)"
                 )
-        mix = torch.from_numpy(mix)  # 保证为Tensor
         mix = torch.unsqueeze(mix, 0)  # shape: [1, 2, N] 或 [1, 1, N]
         if gain_db != 0.0:
             gain_scalar = 10 ** (gain_db / 20)
             mix = gain_scalar * mix
+        elif shares_cache:
+            # 下游节点原地修改波形时不会污染缓存
+            mix = mix.clone()
         sample_rate = int(sr)
         channels = int(mix.shape[1])
         duration_val = float(mix.shape[2] / sample_rate) if sample_rate > 0 else 0.0
@@ -0,0 +1,415 @@
+"""
+Audio Decoding for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Windowed decoding for ``LoadAudioPlusFromPath_UTK``. Files libsndfile can
+read (WAV, FLAC, OGG and the other formats ``soundfile`` lists) are opened
+with ``soundfile``: the reader seeks straight to the offset and decodes only
+the requested frames, so a few seconds from an hour-long recording cost a few
+seconds of decoding. Resampling runs through ``torchaudio`` and only when the
+requested rate differs from the file's. Anything ``soundfile`` rejects is
+decoded with ``librosa.load`` at its native rate and resampled the same way.
+
+Uncompressed PCM / float WAV files skip decoding altogether: ``map_wav``
+maps the ``data`` chunk with ``np.memmap`` and only the requested window is
+copied out and converted to float32, so a few seconds out of a multi-hour
+recording never bring the rest of it into RAM. The map is closed right after
+the copy; no tensor ever points into it, so the file is not held open (and
+locked, on Windows) by anything that outlives the call.
+
+``load_audio_cached`` keeps whole decoded (and resampled) tracks in a
+``PCMCache`` LRU bounded by ``UTK_AUDIO_CACHE_BYTES``, keyed by path, size,
+mtime, sample rate and channel layout, so cutting many segments out of the
+same track decodes it once and serves every later offset as a slice. With
+``UTK_AUDIO_CACHE_DIR`` set, evicted tracks are kept on disk as float16 or
+int16 ``.npy`` files and sliced straight from the memory-mapped file.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import collections
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+
+
+def read_soundfile_window(path: str, offset: float = 0.0, duration: Optional[float] = None):
+    """
+    用 soundfile 跳转到 offset 后只读取 duration 秒，返回 ([C,N] float32 数组, 原始采样率)。
+    帧位置的取整方式与 librosa.load 相同。
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(path) as f:
+        sample_rate = f.samplerate
+        start = min(int(offset * sample_rate), f.frames) if offset > 0 else 0
+        if start:
+            f.seek(start)
+        frames = int(duration * sample_rate) if duration is not None else -1
+        data = f.read(frames=frames, dtype="float32", always_2d=True)
+    return np.ascontiguousarray(data.T), sample_rate
+
+
+def resample(waveform: torch.Tensor, orig_sr: int, target_sr: int) -> torch.Tensor:
+    """[..., N] 波形重采样；采样率相同时原样返回"""
+    if not target_sr or int(target_sr) == int(orig_sr) or waveform.shape[-1] == 0:
+        return waveform
+    try:
+        import torchaudio.functional as AF
+    except ImportError:
+        import librosa
+
+        resampled = librosa.resample(waveform.numpy(), orig_sr=int(orig_sr), target_sr=int(target_sr))
+        return torch.from_numpy(resampled)
+    return AF.resample(waveform, int(orig_sr), int(target_sr))
+
+
+# WAV 格式码：整数 PCM、IEEE 浮点、WAVE_FORMAT_EXTENSIBLE（真实格式在子格式 GUID 的前两个字节）
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (格式码, 位深) -> (内存映射的 numpy 类型, 转换到 [-1,1) 的除数)
+_WAV_SAMPLE_TYPES = {
+    (_WAVE_FORMAT_PCM, 8): ("u1", 128.0),
+    (_WAVE_FORMAT_PCM, 16): ("<i2", 32768.0),
+    (_WAVE_FORMAT_PCM, 24): ("u1", 8388608.0),
+    (_WAVE_FORMAT_PCM, 32): ("<i4", 2147483648.0),
+    (_WAVE_FORMAT_IEEE_FLOAT, 32): ("<f4", None),
+    (_WAVE_FORMAT_IEEE_FLOAT, 64): ("<f8", None),
+}
+
+
+class WavMap:
+    """未压缩 PCM WAV 的 data 块内存映射，samples 形状为 [帧数, 声道]（24 位为 [帧数, 声道, 3] 字节）"""
+
+    __slots__ = ("samples", "sample_rate", "channels", "bits", "scale")
+
+    def __init__(self, samples, sample_rate, channels, bits, scale):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bits = bits
+        self.scale = scale
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    def window(self, start: int = 0, frames: Optional[int] = None) -> torch.Tensor:
+        """
+        [start, start+frames) 区间的 [C,N] float32 张量，总是从映射中复制出来（32 位浮点文件也一样），
+        返回值不引用映射文件。
+        """
+        end = self.frames if frames is None or frames < 0 else min(start + frames, self.frames)
+        block = self.samples[min(start, end) : end]
+        if self.bits == 24:
+            # 三个小端字节拼成 int32，符号位由最高字节的左移带出
+            raw = block.astype(np.int32)
+            block = ((raw[..., 0] << 8) | (raw[..., 1] << 16) | (raw[..., 2] << 24)) >> 8
+        # np.array 总是复制，即使 dtype 与内存布局都已符合要求
+        window = np.array(block.T, dtype=np.float32, order="C")
+        if self.scale is None:
+            return torch.from_numpy(window)
+        if self.bits == 8:
+            window -= 128.0
+        window /= self.scale
+        return torch.from_numpy(window)
+
+    def close(self):
+        """释放映射；Windows 上映射存在期间文件无法被覆盖或删除"""
+        self.samples = None
+
+
+def map_wav(path: str) -> Optional[WavMap]:
+    """解析 RIFF 头并映射 data 块；不是未压缩 PCM / 浮点 WAV 时返回 None"""
+    import struct
+
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+                return None
+            fmt = None
+            position = 12
+            while position + 8 <= size:
+                f.seek(position)
+                chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+                if chunk_id == b"fmt ":
+                    fmt = f.read(min(chunk_size, 40))
+                elif chunk_id == b"data":
+                    data_offset = position + 8
+                    # 流式写入的文件 data 长度可能未回填，以文件实际长度为准
+                    data_size = min(chunk_size, size - data_offset)
+                    break
+                position += 8 + chunk_size + (chunk_size & 1)
+            else:
+                return None
+    except (OSError, struct.error):
+        return None
+    if fmt is None or len(fmt) < 16:
+        return None
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    sample_type = _WAV_SAMPLE_TYPES.get((format_tag, bits))
+    if sample_type is None or channels < 1 or block_align != channels * bits // 8:
+        return None
+    dtype, scale = sample_type
+    frames = data_size // block_align
+    if frames == 0:
+        return None
+    shape = (frames, channels, 3) if bits == 24 else (frames, channels)
+    # copy-on-write 映射：得到可写（对 torch 而言）的数组，但不会修改文件
+    samples = np.memmap(path, dtype=dtype, mode="c", offset=data_offset, shape=shape)
+    return WavMap(samples, sample_rate, channels, bits, scale)
+
+
+def load_audio(
+    path: str, offset: float = 0.0, duration: Optional[float] = None, sr: Optional[int] = None
+) -> Tuple[torch.Tensor, int, str]:
+    """
+    读取 [offset, offset+duration) 区间的音频，返回 ([C,N] float32 张量, 采样率, 使用的后端)。
+    sr 为空时保持原始采样率。未压缩 WAV 直接从内存映射中切出区间，soundfile 无法读取的格式交给 librosa。
+    """
+    wav = map_wav(path) if path.lower().endswith((".wav", ".wave")) else None
+    if wav is not None:
+        start = int(offset * wav.sample_rate) if offset > 0 else 0
+        frames = int(duration * wav.sample_rate) if duration is not None else None
+        try:
+            waveform = wav.window(start, frames)
+        finally:
+            wav.close()
+        return resample(waveform, wav.sample_rate, sr), int(sr or wav.sample_rate), "memmap"
+
+    try:
+        data, native_sr = read_soundfile_window(path, offset, duration)
+    except (RuntimeError, TypeError):
+        data = None
+    if data is not None:
+        waveform = resample(torch.from_numpy(data), native_sr, sr)
+        return waveform, int(sr or native_sr), "soundfile"
+
+    # librosa 导入较慢，只在需要回退时加载；重采样同样交给 torchaudio
+    import librosa
+
+    mix, native_sr = librosa.load(path, sr=None, mono=False, offset=offset, duration=duration)
+    waveform = torch.from_numpy(mix)
+    if waveform.dim() == 1:
+        waveform = waveform.unsqueeze(0)
+    return resample(waveform, native_sr, sr), int(sr or native_sr), "librosa"
+
+
+_AUDIO_CACHE_BYTES = int(os.environ.get("UTK_AUDIO_CACHE_BYTES", str(2 << 30)))
+_AUDIO_CACHE_DIR = os.environ.get("UTK_AUDIO_CACHE_DIR", "")
+_AUDIO_CACHE_DISK_BYTES = int(os.environ.get("UTK_AUDIO_CACHE_DISK_BYTES", str(20 << 30)))
+_AUDIO_CACHE_DTYPE = os.environ.get("UTK_AUDIO_CACHE_DTYPE", "float16")
+
+SPILL_DTYPES = ("float16", "int16")
+
+
+def native_sample_rate(path: str) -> int:
+    """文件的原始采样率，只读取文件头"""
+    try:
+        import soundfile as sf
+
+        return int(sf.info(path).samplerate)
+    except (RuntimeError, TypeError):
+        import librosa
+
+        return int(librosa.get_samplerate(path))
+
+
+class PCMCache:
+    """
+    解码后的整段波形 [C,N] float32 的 LRU，按字节数限制；设置 spill_dir 时被淘汰（或超出内存预算）
+    的波形以 float16 / int16 .npy 写入磁盘，之后的请求直接从内存映射文件切出所需区间。
+    键为 (路径, 大小, mtime_ns, 采样率, 是否单声道)，文件变化后自然失效。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = _AUDIO_CACHE_BYTES,
+        spill_dir: str = _AUDIO_CACHE_DIR,
+        max_disk_bytes: int = _AUDIO_CACHE_DISK_BYTES,
+        spill_dtype: str = _AUDIO_CACHE_DTYPE,
+    ):
+        if spill_dtype not in SPILL_DTYPES:
+            raise ValueError(f"UTK_AUDIO_CACHE_DTYPE must be one of {SPILL_DTYPES}, got {spill_dtype}")
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_dtype = spill_dtype
+        self._entries = collections.OrderedDict()  # key -> waveform
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(path: str, sr: int, mono: bool = False):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return (path, stat.st_size, stat.st_mtime_ns, int(sr), bool(mono))
+
+    def _spill_path(self, key) -> str:
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.{self.spill_dtype}.npy")
+
+    def _spill(self, key, waveform: torch.Tensor):
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        if self.spill_dtype == "int16":
+            array = torch.mul(waveform.clamp(-1.0, 1.0), 32767.0).round_().to(torch.int16).numpy()
+        else:
+            array = waveform.to(torch.float16).numpy()
+        if array.nbytes > self.max_disk_bytes:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"警告: 无法写入音频缓存 {path}: {e}")
+            return
+        self._evict_disk(keep=path)
+
+    def _evict_disk(self, keep: str):
+        entries = []
+        for name in os.listdir(self.spill_dir):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _read_spilled(self, key, start: int, frames: Optional[int]):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        end = array.shape[1] if frames is None else min(start + frames, array.shape[1])
+        # 只转换需要的区间
+        window = np.asarray(array[:, min(start, end) : end], dtype=np.float32)
+        if array.dtype == np.int16:
+            window /= 32767.0
+        return torch.from_numpy(window)
+
+    def window(self, key, start: int, frames: Optional[int] = None) -> Optional[torch.Tensor]:
+        """返回缓存波形 [start, start+frames) 的切片（内存命中时为视图），未命中返回 None"""
+        with self._lock:
+            waveform = self._entries.get(key)
+            if waveform is not None:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                end = waveform.shape[1] if frames is None else start + frames
+                return waveform[:, start:end]
+        spilled = self._read_spilled(key, start, frames)
+        with self._lock:
+            self.counters["disk_hits" if spilled is not None else "misses"] += 1
+        return spilled
+
+    def put(self, key, waveform: torch.Tensor):
+        nbytes = waveform.element_size() * waveform.nelement()
+        evicted = []
+        with self._lock:
+            if nbytes > self.max_bytes:
+                evicted.append((key, waveform))
+            else:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old.element_size() * old.nelement()
+                self._entries[key] = waveform
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    old_key, old = self._entries.popitem(last=False)
+                    self._bytes -= old.element_size() * old.nelement()
+                    evicted.append((old_key, old))
+        if self.spill_dir:
+            for old_key, old in evicted:
+                self._spill(old_key, old)
+
+    def clear(self) -> int:
+        """清空内存中的波形（磁盘文件保留），返回释放的字节数"""
+        with self._lock:
+            freed = self._bytes
+            self._entries.clear()
+            self._bytes = 0
+        return freed
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes, **self.counters}
+
+
+_pcm_cache = PCMCache()
+
+
+def clear_pcm_cache() -> int:
+    return _pcm_cache.clear()
+
+
+def load_audio_cached(
+    path: str,
+    offset: float = 0.0,
+    duration: Optional[float] = None,
+    sr: Optional[int] = None,
+    mono: bool = False,
+    cache: Optional[PCMCache] = None,
+) -> Tuple[torch.Tensor, int]:
+    """
+    与 load_audio 相同，但整段解码（并重采样）一次后放入 PCM 缓存，之后任意 offset/duration
+    都只是缓存波形的切片。内存命中时返回的是缓存的视图，调用方不能原地修改。
+    """
+    cache = cache or _pcm_cache
+    target_sr = int(sr) if sr else native_sample_rate(path)
+    start = int(offset * target_sr) if offset > 0 else 0
+    frames = int(duration * target_sr) if duration is not None else None
+    wav = map_wav(path) if path.lower().endswith((".wav", ".wave")) else None
+    if wav is not None:
+        # 不需要重采样的未压缩 WAV 直接从内存映射复制出所需区间，无需再缓存一份
+        try:
+            waveform = wav.window(start, frames) if wav.sample_rate == target_sr else None
+        finally:
+            wav.close()
+        if waveform is not None:
+            if mono and waveform.shape[0] > 1:
+                waveform = waveform.mean(dim=0, keepdim=True)
+            return waveform, target_sr
+
+    key = cache.make_key(path, target_sr, mono)
+    waveform = cache.window(key, start, frames)
+    if waveform is not None:
+        return waveform, target_sr
+
+    waveform, target_sr, _ = load_audio(path, sr=target_sr)
+    if mono and waveform.shape[0] > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+    cache.put(key, waveform)
+    end = waveform.shape[1] if frames is None else start + frames
+    return waveform[:, start:end], target_sr
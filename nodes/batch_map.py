@@ -0,0 +1,131 @@
+"""
+Chunked Batch Execution for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Runs a per-frame operation over an IMAGE / MASK batch in chunks sized from a
+memory budget. Only one chunk of float32 intermediates is alive at a time and
+chunk results are copied into outputs preallocated for the whole batch, so
+peak memory is ``inputs + outputs + budget`` instead of a multiple of the
+batch.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import torch
+
+# 节点内部临时张量约为输入的几倍（float32 中间结果、拷贝、拼接）
+DEFAULT_WORKING_FACTOR = 4.0
+
+
+def frame_bytes(tensors):
+    """批次中单帧在所有分块输入上的字节数"""
+    total = 0
+    for tensor in tensors:
+        if tensor.dim() > 0 and tensor.shape[0] > 0:
+            total += tensor[0].nelement() * tensor.element_size()
+    return total
+
+
+def chunk_size_for_budget(per_frame_bytes, budget_bytes, working_factor=DEFAULT_WORKING_FACTOR):
+    """按内存预算计算每块帧数，至少为 1"""
+    per_frame = max(int(per_frame_bytes * working_factor), 1)
+    return max(1, int(budget_bytes // per_frame))
+
+
+def batch_map(
+    function,
+    batched,
+    static=None,
+    chunk_size=None,
+    budget_bytes=1 << 30,
+    working_factor=DEFAULT_WORKING_FACTOR,
+    progress=None,
+    constant_outputs=(),
+    count_outputs=(),
+    optional_outputs=(),
+):
+    """
+    按第 0 维把 batched 中的张量切块调用 function(**static, **切片)，返回结果元组。
+
+    输出默认必须是第 0 维等于块长度的张量，写入预先分配的整批输出。constant_outputs（宽高、原始尺寸等）
+    在每块中必须相同，取第一块的值；count_outputs 是每块的帧数，返回整批的帧数；optional_outputs
+    可以逐帧，也可以在每块中是同一个占位值（例如没有输入遮罩时的 None）。其他情况（改变帧数的张量、
+    非张量或 UI 字典）抛出 ValueError，而不是静默丢弃后面的块。
+    chunk_size 为空时由 budget_bytes 和 working_factor 计算。progress 接收每块处理的帧数。
+    """
+    static = static or {}
+    batch = None
+    for name, tensor in batched.items():
+        if batch is None:
+            batch = tensor.shape[0]
+        elif tensor.shape[0] != batch:
+            raise ValueError(f"Batched input '{name}' has {tensor.shape[0]} frames, expected {batch}")
+    if not batch:
+        result = function(**static, **batched)
+        return result if isinstance(result, tuple) else (result,)
+    if chunk_size is None:
+        chunk_size = chunk_size_for_budget(frame_bytes(batched.values()), budget_bytes, working_factor)
+
+    outputs = None
+    for start in range(0, batch, chunk_size):
+        end = min(start + chunk_size, batch)
+        result = function(**static, **{name: tensor[start:end] for name, tensor in batched.items()})
+        if not isinstance(result, tuple):
+            result = (result,)
+        if outputs is None:
+            outputs = [_first_output(index, value, end - start, batch, constant_outputs, count_outputs, optional_outputs)
+                       for index, value in enumerate(result)]
+        elif len(result) != len(outputs):
+            raise ValueError(f"Chunk returned {len(result)} outputs, expected {len(outputs)}")
+        for index, value in enumerate(result):
+            target = outputs[index]
+            if index in count_outputs:
+                if value != end - start:
+                    raise ValueError(f"Output {index} should be the chunk length {end - start}, got {value}")
+                continue
+            if not isinstance(target, _Preallocated):
+                if not _same_value(value, target):
+                    raise ValueError(f"Output {index} differs between chunks")
+                continue
+            if not isinstance(value, torch.Tensor) or value.shape[1:] != target.tensor.shape[1:]:
+                raise ValueError(f"Output {index} changed shape between chunks")
+            if value.shape[0] != end - start:
+                raise ValueError(f"Output {index} is not per-frame ({value.shape[0]} frames for a chunk of {end - start})")
+            target.tensor[start:end].copy_(value)
+        del result
+        if progress is not None:
+            progress(end - start)
+    return tuple(
+        batch if index in count_outputs else value.tensor if isinstance(value, _Preallocated) else value
+        for index, value in enumerate(outputs)
+    )
+
+
+class _Preallocated:
+    __slots__ = ("tensor",)
+
+    def __init__(self, tensor):
+        self.tensor = tensor
+
+
+def _is_per_frame(value, chunk_frames):
+    return isinstance(value, torch.Tensor) and value.dim() > 0 and value.shape[0] == chunk_frames
+
+
+def _first_output(index, value, chunk_frames, batch, constant_outputs, count_outputs, optional_outputs):
+    """按第一块的结果决定每个输出的处理方式：逐帧输出预先分配整批，其余原样保留用于比较"""
+    if index in constant_outputs or index in count_outputs:
+        return value
+    if _is_per_frame(value, chunk_frames):
+        return _Preallocated(torch.empty((batch,) + tuple(value.shape[1:]), dtype=value.dtype, device=value.device))
+    if index in optional_outputs:
+        return value
+    kind = f"{value.shape[0]} frames" if isinstance(value, torch.Tensor) and value.dim() else type(value).__name__
+    raise ValueError(f"Output {index} is not per-frame ({kind} for a chunk of {chunk_frames})")
+
+
+def _same_value(value, first):
+    if isinstance(value, torch.Tensor) or isinstance(first, torch.Tensor):
+        return isinstance(value, torch.Tensor) and isinstance(first, torch.Tensor) and torch.equal(value, first)
+    return value == first
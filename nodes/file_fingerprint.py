@@ -0,0 +1,80 @@
+"""
+File Fingerprints for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+``IS_CHANGED`` helpers for nodes that read from disk. A fingerprint combines
+the file size and ``mtime_ns`` with a hash of the first and last blocks of
+the file, so an unchanged file lets ComfyUI reuse the cached outputs while a
+replaced file is picked up even when the copy preserved its mtime.
+
+On POSIX, hashes are memoized per process by ``(size, mtime_ns, ctime_ns,
+inode)``; ``ctime`` is the inode change time there and cannot be set from
+user space, so any rewrite of the file changes the key and the blocks are
+read again. Repeated queues only cost a ``stat``. On Windows ``ctime`` is the
+creation time, which an in-place rewrite with a restored mtime leaves alone,
+so the blocks are read on every call.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Iterable
+
+# 单个文件读取开头和结尾各这么多字节
+FINGERPRINT_BLOCK = 1 << 16
+
+# 记忆的文件数上限，超出后清空重新开始
+_MEMO_LIMIT = 1 << 17
+_memo = {}
+_memo_lock = threading.Lock()
+# 只有 POSIX 的 ctime 是状态变更时间；Windows 上是创建时间，不能作为记忆的依据
+_MEMO_ENABLED = os.name == "posix"
+
+
+def normalize_path(path: str) -> str:
+    """去掉首尾空白和引号，统一路径分隔符"""
+    return path.strip().strip('"').strip("'").replace("\\", "/")
+
+
+def file_fingerprint(path: str, block_size: int = FINGERPRINT_BLOCK) -> str:
+    """文件大小、mtime_ns 与首尾块哈希组成的指纹；文件不存在时返回 missing:路径"""
+    path = os.path.abspath(normalize_path(path))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return f"missing:{path}"
+    key = (stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino, block_size)
+    if _MEMO_ENABLED:
+        with _memo_lock:
+            cached = _memo.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            digest.update(f.read(block_size))
+            if stat.st_size > block_size:
+                f.seek(max(block_size, stat.st_size - block_size))
+                digest.update(f.read(block_size))
+    except OSError:
+        return f"unreadable:{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    fingerprint = f"{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()}"
+    if not _MEMO_ENABLED:
+        return fingerprint
+    with _memo_lock:
+        if len(_memo) >= _MEMO_LIMIT:
+            _memo.clear()
+        _memo[path] = (key, fingerprint)
+    return fingerprint
+
+
+def files_fingerprint(paths: Iterable[str], block_size: int = 4096) -> str:
+    """一组文件（例如图片序列）的组合指纹，文件名、顺序或任一文件变化都会改变结果"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(f"{os.path.basename(path)}|{file_fingerprint(path, block_size)}\n".encode("utf-8"))
+    return digest.hexdigest()
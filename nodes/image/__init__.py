@@ -11,21 +11,27 @@ Image processing nodes for ComfyUI Universal Toolkit.
 import importlib
 import os
 
-NODE_CLASS_MAPPINGS = {}
-NODE_DISPLAY_NAME_MAPPINGS = {}
-
-# 自动导入本目录下所有节点文件的注册表
-for filename in os.listdir(os.path.dirname(__file__)):
-    if filename.endswith(".py") and filename not in (
-        "__init__.py",
-        "image_utils.py",
-        "image_converters.py",
-    ):
-        modulename = filename[:-3]
-        module = importlib.import_module(f".{modulename}", __package__)
-        if hasattr(module, "NODE_CLASS_MAPPINGS"):
-            NODE_CLASS_MAPPINGS.update(getattr(module, "NODE_CLASS_MAPPINGS"))
-        if hasattr(module, "NODE_DISPLAY_NAME_MAPPINGS"):
-            NODE_DISPLAY_NAME_MAPPINGS.update(
-                getattr(module, "NODE_DISPLAY_NAME_MAPPINGS")
-            )
+_MAPPING_NAMES = ("NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS")
+
+
+def _collect_mappings():
+    """按需导入本目录下所有节点文件并合并注册表"""
+    mappings = {name: {} for name in _MAPPING_NAMES}
+    for filename in sorted(os.listdir(os.path.dirname(__file__))):
+        if filename.endswith(".py") and filename not in (
+            "__init__.py",
+            "image_utils.py",
+        ):
+            modulename = filename[:-3]
+            module = importlib.import_module(f".{modulename}", __package__)
+            for name in _MAPPING_NAMES:
+                mappings[name].update(getattr(module, name, {}))
+    globals().update(mappings)
+    return mappings
+
+
+def __getattr__(name):
+    # 导入单个子模块时不再连带导入整个目录，只有访问注册表时才收集
+    if name in _MAPPING_NAMES:
+        return _collect_mappings()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,13 +8,12 @@ Check if a mask is valid and provide information about it.
 :license: MIT, see LICENSE for more details.
 """
 
-import cv2
 import numpy as np
 import torch
 from PIL import Image
 
 from ..tools.logging_utils import log
-from .image_converters import pil2tensor, tensor2pil
+from ..image_convert import tensor2pil
 
 
 def mask_white_area(mask, white_point):
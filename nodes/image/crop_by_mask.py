@@ -12,7 +12,8 @@ import numpy as np
 import torch
 from PIL import Image, ImageDraw, ImageFilter
 
-from ..image_utils import image2mask, pil2tensor, tensor2pil
+from ..image_convert import (batch_pil2tensor, batch_tensor2pil, image2mask,
+                             pil2tensor, tensor2pil)
 
 
 def log(message, message_type="info"):
@@ -130,11 +131,8 @@ class CropByMask_UTK:
 
         ret_images = []
         ret_masks = []
-        l_images = []
         l_masks = []
 
-        for l in image:
-            l_images.append(torch.unsqueeze(l, 0))
         if mask_for_crop.dim() == 2:
             mask_for_crop = torch.unsqueeze(mask_for_crop, 0)
         # 如果有多张mask输入，使用第一张
@@ -146,7 +144,7 @@ class CropByMask_UTK:
             mask_for_crop = torch.unsqueeze(mask_for_crop[0], 0)
         if invert_mask:
             mask_for_crop = 1 - mask_for_crop
-        l_masks.append(tensor2pil(torch.unsqueeze(mask_for_crop, 0)).convert("L"))
+        l_masks.append(tensor2pil(mask_for_crop))
 
         _mask = mask2image(mask_for_crop)
         try:
@@ -168,9 +166,7 @@ class CropByMask_UTK:
         width = num_round_up_to_multiple(width, 8)
         height = num_round_up_to_multiple(height, 8)
         log(f"CropByMask_UTK: Box detected. x={x},y={y},width={width},height={height}")
-        canvas_width, canvas_height = (
-            tensor2pil(torch.unsqueeze(image[0], 0)).convert("RGB").size
-        )
+        canvas_width, canvas_height = image.shape[2], image.shape[1]
         x1 = x - left_reserve if x - left_reserve > 0 else 0
         y1 = y - top_reserve if y - top_reserve > 0 else 0
         x2 = (
@@ -205,11 +201,11 @@ class CropByMask_UTK:
         crop_box = (x1, y1, x2, y2)
         remaining_masks = []
         
-        for i in range(len(l_images)):
-            _canvas = tensor2pil(l_images[i]).convert("RGB")
-            _mask = l_masks[0]
-            ret_images.append(pil2tensor(_canvas.crop(crop_box)))
-            ret_masks.append(image2mask(_mask.crop(crop_box)))
+        # 所有帧共用同一张裁剪 mask，只需转换一次
+        croped_mask = image2mask(l_masks[0].crop(crop_box))
+        for i, _canvas in enumerate(batch_tensor2pil(image)):
+            ret_images.append(_canvas.convert("RGB").crop(crop_box))
+            ret_masks.append(croped_mask)
             
             # 计算remaining area：被裁剪掉的区域显示为白色
             original_mask_tensor = mask_for_crop[0] if i == 0 else mask_for_crop[min(i, mask_for_crop.shape[0]-1)]
@@ -227,7 +223,7 @@ class CropByMask_UTK:
             message_type="finish",
         )
         return (
-            torch.cat(ret_images, dim=0),
+            batch_pil2tensor(ret_images),
             torch.cat(ret_masks, dim=0),
             list(crop_box),
             pil2tensor(preview_image),
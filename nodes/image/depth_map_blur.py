@@ -10,7 +10,6 @@ Applies depth-based blur effects to images using depth maps.
 
 import os
 
-import cv2
 import folder_paths
 import numpy as np
 import torch
@@ -121,6 +120,8 @@ class DepthMapBlur_UTK:
         focal_range,
         mask_blur,
     ):
+        import cv2
+
         def make_odd(x):
             x = int(round(x))
             return x if x % 2 == 1 else x + 1
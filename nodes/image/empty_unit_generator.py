@@ -10,7 +10,6 @@ Generate empty units for testing and development.
 
 import re
 
-import cv2
 import numpy as np
 import torch
 from PIL import Image
@@ -8,10 +8,8 @@ Fills masked areas in images using various algorithms.
 :license: MIT, see LICENSE for more details.
 """
 
-import cv2
 import numpy as np
 import torch
-from scipy.ndimage import binary_erosion, gaussian_filter
 
 
 # mask二值化，阈值0.5
@@ -21,6 +19,8 @@ def mask_floor(mask):
 
 # 腐蚀操作，kernel为feathering
 def mask_erosion(mask, feathering):
+    from scipy.ndimage import binary_erosion
+
     if feathering > 0:
         structure = np.ones((feathering, feathering), dtype=np.uint8)
         return binary_erosion(mask, structure=structure).astype(np.float32)
@@ -29,6 +29,8 @@ def mask_erosion(mask, feathering):
 
 # 高斯模糊，sigma=feathering/3
 def mask_blur(mask, feathering):
+    from scipy.ndimage import gaussian_filter
+
     if feathering > 0:
         sigma = feathering / 3.0
         return gaussian_filter(mask, sigma=sigma)
@@ -92,6 +94,8 @@ class FillMaskedArea_UTK:
             return (torch.from_numpy(result).unsqueeze(0).float(),)
 
     def _fill_single_image(self, image, mask, fill_mode, feathering):
+        import cv2
+
         # [C,H,W] -> [H,W,C]
         if image.shape[0] <= 4:
             image = np.transpose(image, (1, 2, 0))
@@ -16,6 +16,7 @@ from nodes import SaveImage
 
 # 导入本地的 ImageCompositeMasked 实现
 from .image_composite_masked import ImageCompositeMasked
+from ..tools.profiling import span
 
 
 class ImageAndMaskPreview_UTK(SaveImage):
@@ -108,7 +109,8 @@ nodes for example.
             )
         if pass_through:
             return (preview,)
-        return self.save_images(preview, filename_prefix, prompt, extra_pnginfo)
+        with span("encode"):
+            return self.save_images(preview, filename_prefix, prompt, extra_pnginfo)
 
 
 # Node mappings
@@ -10,14 +10,17 @@ extended sequence (when new_images is provided).
 :license: MIT, see LICENSE for more details.
 """
 
+import importlib.util
+
 import torch
 
 
 def _overlap_modes():
     modes = ["cut", "linear_blend", "ease_in_out", "filmic_crossfade"]
+    # 只探测 kornia 是否已安装，真正的导入推迟到使用 perceptual_crossfade 时
     try:
-        import kornia  # noqa: F401
-        modes.append("perceptual_crossfade")
+        if importlib.util.find_spec("kornia") is not None:
+            modes.append("perceptual_crossfade")
     except Exception:
         pass
     return modes
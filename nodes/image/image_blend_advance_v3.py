@@ -13,7 +13,10 @@ import torch
 import copy
 import numpy as np
 from PIL import Image, ImageOps
-from ..image_utils import tensor2pil, pil2tensor, image2mask
+from ..image_convert import (batch_image2mask, batch_pil2tensor,
+                             batch_tensor2pil)
+from ..resample import resample
+from ..tools.profiling import span
 
 
 class ImageBlendAdvance_UTK:
@@ -170,40 +173,41 @@ and artistic effects with precise control over blending.
         """
         # If background image is empty, create transparent background for each layer image
         if background_image is None:
-            background_image = []
-            for l in layer_image:
-                layer_pil = tensor2pil(l)
-                bg = Image.new('RGBA', (layer_pil.width, layer_pil.height), (0, 0, 0, 0))
-                background_image.append(pil2tensor(bg))
-
-        b_images = []
-        l_images = []
-        l_masks = []
+            background_image = torch.zeros(
+                (layer_image.shape[0], layer_image.shape[1], layer_image.shape[2], 4),
+                dtype=torch.float32,
+            )
+
         ret_images = []
         ret_masks = []
-        
-        # Prepare background images
-        for b in background_image:
-            b_images.append(torch.unsqueeze(b, 0))
-        
-        # Prepare layer images and extract alpha masks
-        for l in layer_image:
-            l_images.append(torch.unsqueeze(l, 0))
-            layer_pil = tensor2pil(l)
-            if layer_pil.mode == 'RGBA':
-                l_masks.append(layer_pil.split()[-1])
-            else:
-                l_masks.append(Image.new('L', layer_pil.size, 'white'))
-        
-        # Use provided layer masks if available
+
+        # Use provided layer masks if available, otherwise the layer alpha
         if layer_mask is not None:
             if layer_mask.dim() == 2:
                 layer_mask = torch.unsqueeze(layer_mask, 0)
-            l_masks = []
-            for m in layer_mask:
-                if invert_mask:
-                    m = 1 - m
-                l_masks.append(tensor2pil(torch.unsqueeze(m, 0)).convert('L'))
+            if invert_mask:
+                layer_mask = 1 - layer_mask
+        elif layer_image.shape[-1] == 4:
+            layer_mask = layer_image[..., 3]
+
+        # Apply scaling to the whole layer batch at once
+        orig_layer_width = layer_image.shape[2]
+        orig_layer_height = layer_image.shape[1]
+        target_layer_width = int(orig_layer_width * scale)
+        target_layer_height = int(orig_layer_height * scale * aspect_ratio)
+        if target_layer_width != orig_layer_width or target_layer_height != orig_layer_height:
+            with span("resize"):
+                if layer_mask is not None and layer_mask.shape[1:] == layer_image.shape[1:3]:
+                    layer_mask = resample(layer_mask, target_layer_width, target_layer_height, "bilinear")
+                layer_image = resample(layer_image, target_layer_width, target_layer_height, transform_method)
+
+        # Prepare background and layer images (quantized once per batch)
+        b_images = batch_tensor2pil(background_image)
+        l_images = batch_tensor2pil(layer_image)
+        if layer_mask is not None:
+            l_masks = batch_tensor2pil(layer_mask)
+        else:
+            l_masks = [Image.new('L', (layer_image.shape[2], layer_image.shape[1]), 'white')]
 
         # Process each image in the batch
         max_batch = max(len(b_images), len(l_images), len(l_masks))
@@ -213,23 +217,16 @@ and artistic effects with precise control over blending.
             mask = l_masks[i] if i < len(l_masks) else l_masks[-1]
             
             # Convert to PIL images
-            canvas = tensor2pil(background).convert('RGBA')
-            layer_pil = tensor2pil(layer)
+            canvas = background.convert('RGBA')
+            layer_pil = layer
 
             # Ensure mask matches layer size
             if mask.size != layer_pil.size:
                 mask = Image.new('L', layer_pil.size, 'white')
                 print(f"Warning: {self.NODE_NAME} mask size mismatch, using white mask!")
 
-            # Store original dimensions
-            orig_layer_width = layer_pil.width
-            orig_layer_height = layer_pil.height
             mask = mask.convert("L")
 
-            # Apply transforms
-            target_layer_width = int(orig_layer_width * scale)
-            target_layer_height = int(orig_layer_height * scale * aspect_ratio)
-
             # Apply mirroring
             if mirror == 'horizontal':
                 layer_pil = layer_pil.transpose(Image.FLIP_LEFT_RIGHT)
@@ -238,21 +235,6 @@ and artistic effects with precise control over blending.
                 layer_pil = layer_pil.transpose(Image.FLIP_TOP_BOTTOM)
                 mask = mask.transpose(Image.FLIP_TOP_BOTTOM)
 
-            # Apply scaling
-            if target_layer_width != orig_layer_width or target_layer_height != orig_layer_height:
-                resample_map = {
-                    'nearest': Image.NEAREST,
-                    'bilinear': Image.BILINEAR,
-                    'bicubic': Image.BICUBIC,
-                    'lanczos': Image.LANCZOS,
-                    'box': Image.BOX,
-                    'hamming': Image.HAMMING,
-                }
-                resample = resample_map.get(transform_method, Image.LANCZOS)
-                
-                layer_pil = layer_pil.resize((target_layer_width, target_layer_height), resample)
-                mask = mask.resize((target_layer_width, target_layer_height), Image.BILINEAR)
-
             # Apply rotation
             if rotate != 0:
                 layer_pil, mask = self.transform_image_with_rotation(
@@ -307,11 +289,11 @@ and artistic effects with precise control over blending.
             # Final composition with mask
             canvas.paste(comp_canvas, mask=comp_mask)
 
-            ret_images.append(pil2tensor(canvas))
-            ret_masks.append(image2mask(comp_mask))
+            ret_images.append(canvas)
+            ret_masks.append(comp_mask)
 
         print(f"{self.NODE_NAME} Processed {len(ret_images)} image(s).")
-        return (torch.cat(ret_images, dim=0), torch.cat(ret_masks, dim=0))
+        return (batch_pil2tensor(ret_images), batch_image2mask(ret_masks))
 
 
 # Node registration
@@ -11,7 +11,7 @@ Combines RGB image with mask to create RGBA image.
 import torch
 from PIL import Image
 
-from ..image_utils import pil2tensor, tensor2pil
+from ..image_convert import tensor2uint8, uint82tensor
 
 
 def log(message, message_type="info"):
@@ -65,33 +65,22 @@ class ImageCombineAlpha_UTK:
 
     def image_combine_alpha(self, RGB_image, mask):
 
-        ret_images = []
-        input_images = []
-        input_masks = []
-
-        for i in RGB_image:
-            input_images.append(torch.unsqueeze(i, 0))
         if mask.dim() == 2:
             mask = torch.unsqueeze(mask, 0)
-        for m in mask:
-            input_masks.append(torch.unsqueeze(m, 0))
-
-        max_batch = max(len(input_images), len(input_masks))
-        for i in range(max_batch):
-            _image = input_images[i] if i < len(input_images) else input_images[-1]
-            _mask = input_masks[i] if i < len(input_masks) else input_masks[-1]
-            r, g, b = image_channel_split(tensor2pil(_image).convert("RGB"), "RGB")
-            ret_image = image_channel_merge(
-                (r, g, b, tensor2pil(_mask).convert("L")), "RGBA"
-            )
 
-            ret_images.append(pil2tensor(ret_image))
+        # 整批量化为 uint8，较短的一侧重复最后一帧补齐批次
+        max_batch = max(RGB_image.shape[0], mask.shape[0])
+        image_index = torch.arange(max_batch).clamp_(max=RGB_image.shape[0] - 1)
+        mask_index = torch.arange(max_batch).clamp_(max=mask.shape[0] - 1)
+        rgb = tensor2uint8(RGB_image[..., :3])[image_index]
+        alpha = tensor2uint8(mask)[mask_index].unsqueeze(-1)
+        ret_images = uint82tensor(torch.cat((rgb, alpha), dim=-1))
 
         log(
             f"ImageCombineAlpha_UTK Processed {len(ret_images)} image(s).",
             message_type="finish",
         )
-        return (torch.cat(ret_images, dim=0),)
+        return (ret_images,)
 
 
 # Node mappings
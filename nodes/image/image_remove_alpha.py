@@ -8,10 +8,10 @@ Removes alpha channel from RGBA images with optional background filling.
 :license: MIT, see LICENSE for more details.
 """
 
-import torch
 from PIL import Image
 
-from ..image_utils import pil2tensor, tensor2pil
+from ..image_convert import (batch_pil2tensor, batch_tensor2pil, tensor2pil,
+                             tensor2uint8, uint82tensor)
 
 
 def log(message, message_type="info"):
@@ -66,46 +66,49 @@ class ImageRemoveAlpha_UTK:
         # 获取对应的颜色值
         bg_color = color_map.get(background_color, "#000000")
 
-        ret_images = []
+        if not fill_background:
+            # 不填充背景时直接丢弃 alpha 通道，整批量化一次即可
+            ret_images = uint82tensor(tensor2uint8(RGBA_image[..., :3]))
+            log(
+                f"ImageRemoveAlpha_UTK Processed {ret_images.shape[0]} image(s).",
+                message_type="finish",
+            )
+            return (ret_images,)
 
-        for index, img in enumerate(RGBA_image):
-            _image = tensor2pil(img)
-
-            if fill_background:
-                if mask is not None:
-                    m = (
-                        mask[index].unsqueeze(0)
-                        if index < len(mask)
-                        else mask[-1].unsqueeze(0)
-                    )
-                    alpha = tensor2pil(m).convert("L")
-                elif _image.mode == "RGBA":
-                    alpha = _image.split()[-1]
-                else:
-                    log(
-                        f"Error: ImageRemoveAlpha_UTK skipped, because the input image is not RGBA and mask is None.",
-                        message_type="error",
-                    )
-                    return (RGBA_image,)
-
-                # 处理透明背景
-                if bg_color is None:
-                    # 如果选择透明，直接转换为RGB（透明部分变为白色）
-                    ret_image = _image.convert("RGB")
-                else:
-                    ret_image = Image.new("RGB", size=_image.size, color=bg_color)
-                    ret_image.paste(_image, mask=alpha)
-
-                ret_images.append(pil2tensor(ret_image))
+        ret_images = []
 
+        for index, _image in enumerate(batch_tensor2pil(RGBA_image)):
+            if mask is not None:
+                m = (
+                    mask[index].unsqueeze(0)
+                    if index < len(mask)
+                    else mask[-1].unsqueeze(0)
+                )
+                alpha = tensor2pil(m).convert("L")
+            elif _image.mode == "RGBA":
+                alpha = _image.split()[-1]
             else:
-                ret_images.append(pil2tensor(tensor2pil(img).convert("RGB")))
+                log(
+                    f"Error: ImageRemoveAlpha_UTK skipped, because the input image is not RGBA and mask is None.",
+                    message_type="error",
+                )
+                return (RGBA_image,)
+
+            # 处理透明背景
+            if bg_color is None:
+                # 如果选择透明，直接转换为RGB（透明部分变为白色）
+                ret_image = _image.convert("RGB")
+            else:
+                ret_image = Image.new("RGB", size=_image.size, color=bg_color)
+                ret_image.paste(_image, mask=alpha)
+
+            ret_images.append(ret_image)
 
         log(
             f"ImageRemoveAlpha_UTK Processed {len(ret_images)} image(s).",
             message_type="finish",
         )
-        return (torch.cat(ret_images, dim=0),)
+        return (batch_pil2tensor(ret_images),)
 
 
 # Node mappings
@@ -9,9 +9,9 @@ Restores images to original size or scales them with specified parameters.
 """
 
 import torch
-from PIL import Image
 
-from ..image_utils import image2mask, pil2tensor, tensor2pil
+from ..resample import resample
+from ..tools.profiling import span
 
 
 def log(message, message_type="info"):
@@ -85,26 +85,13 @@ class ImageScaleRestore_UTK:
     ):
         import math
 
-        l_images = []
-        l_masks = []
-        ret_images = []
-        ret_masks = []
-        for l in image:
-            l_images.append(torch.unsqueeze(l, 0))
-            m = tensor2pil(l)
-            if m.mode == "RGBA":
-                l_masks.append(m.split()[-1])
-
         if mask is not None:
             if mask.dim() == 2:
                 mask = torch.unsqueeze(mask, 0)
-            l_masks = []
-            for m in mask:
-                l_masks.append(tensor2pil(torch.unsqueeze(m, 0)).convert("L"))
 
-        max_batch = max(len(l_images), len(l_masks))
+        max_batch = max(image.shape[0], mask.shape[0] if mask is not None else 0)
 
-        orig_width, orig_height = tensor2pil(l_images[0]).size
+        orig_width, orig_height = image.shape[2], image.shape[1]
         # 计算目标宽高
         if original_size is not None:
             target_width = original_size[0]
@@ -155,36 +142,27 @@ class ImageScaleRestore_UTK:
             target_width = 4
         if target_height < 4:
             target_height = 4
-        resize_sampler = Image.LANCZOS
-        if method == "bicubic":
-            resize_sampler = Image.BICUBIC
-        elif method == "hamming":
-            resize_sampler = Image.HAMMING
-        elif method == "bilinear":
-            resize_sampler = Image.BILINEAR
-        elif method == "box":
-            resize_sampler = Image.BOX
-        elif method == "nearest":
-            resize_sampler = Image.NEAREST
-
-        for i in range(max_batch):
-            _image = l_images[i] if i < len(l_images) else l_images[-1]
-            _canvas = tensor2pil(_image).convert("RGB")
-            ret_image = _canvas.resize((target_width, target_height), resize_sampler)
-            ret_mask = Image.new("L", size=ret_image.size, color="white")
+
+        def extend_batch(batch):
+            # 批次较短的一方重复最后一帧
+            if batch.shape[0] >= max_batch:
+                return batch
+            return batch[torch.arange(max_batch).clamp(max=batch.shape[0] - 1)]
+
+        with span("resize"):
+            ret_image = extend_batch(resample(image[..., :3], target_width, target_height, method))
             if mask is not None:
-                _mask = l_masks[i] if i < len(l_masks) else l_masks[-1]
-                ret_mask = _mask.resize((target_width, target_height), resize_sampler)
-            ret_images.append(pil2tensor(ret_image))
-            ret_masks.append(image2mask(ret_mask))
+                ret_mask = extend_batch(resample(mask, target_width, target_height, method))
+            else:
+                ret_mask = torch.ones((max_batch, target_height, target_width), dtype=torch.float32)
 
         log(
-            f"ImageScaleRestore_UTK Processed {len(ret_images)} image(s).",
+            f"ImageScaleRestore_UTK Processed {max_batch} image(s).",
             message_type="finish",
         )
         return (
-            torch.cat(ret_images, dim=0),
-            torch.cat(ret_masks, dim=0),
+            ret_image,
+            ret_mask,
             [orig_width, orig_height],
             target_width,
             target_height,
@@ -8,17 +8,14 @@ Performs color transfer and imitation between images with skin protection.
 :license: MIT, see LICENSE for more details.
 """
 
-import cv2
 import numpy as np
-import torch
 
 try:
     from comfy.utils import ProgressBar
 except ImportError:
     ProgressBar = None
-from PIL import Image
 
-from ..image_utils import pil2tensor
+from ..image_convert import tensor2cv2, tensor2np, uint82tensor
 
 
 def image_stats(image):
@@ -33,6 +30,8 @@ def is_skin_or_lips(lab_image):
 
 
 def adjust_brightness(image, factor, mask=None):
+    import cv2
+
     hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
     v = hsv[:, :, 2].astype(np.float32)
     if mask is not None:
@@ -45,6 +44,8 @@ def adjust_brightness(image, factor, mask=None):
 
 
 def adjust_saturation(image, factor, mask=None):
+    import cv2
+
     hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
     s = hsv[:, :, 1].astype(np.float32)
     if mask is not None:
@@ -71,6 +72,8 @@ def adjust_contrast(image, factor, mask=None):
 
 
 def adjust_tone(source, target, tone_strength=0.7, mask=None):
+    import cv2
+
     h, w = target.shape[:2]
     source = cv2.resize(source, (w, h))
     lab_image = cv2.cvtColor(target, cv2.COLOR_BGR2LAB).astype(np.float32)
@@ -125,14 +128,6 @@ def adjust_tone(source, target, tone_strength=0.7, mask=None):
     return cv2.cvtColor(lab_image.astype(np.uint8), cv2.COLOR_LAB2BGR)
 
 
-def tensor2cv2(image: torch.Tensor) -> np.array:
-    if image.dim() == 4:
-        image = image.squeeze()
-    npimage = image.numpy()
-    cv2image = np.uint8(npimage * 255 / npimage.max())
-    return cv2.cvtColor(cv2image, cv2.COLOR_RGB2BGR)
-
-
 def color_transfer(
     source,
     target,
@@ -148,6 +143,8 @@ def color_transfer(
     auto_tone=False,
     tone_strength=0.7,
 ):
+    import cv2
+
     source_lab = cv2.cvtColor(source, cv2.COLOR_BGR2LAB).astype(np.float32)
     target_lab = cv2.cvtColor(target, cv2.COLOR_BGR2LAB).astype(np.float32)
 
@@ -326,21 +323,24 @@ Performs color transfer and imitation between images with skin protection.
         tone_strength,
         mask=None,
     ):
+        import cv2
+
         # 只取一张imitation_image
         img_cv1 = tensor2cv2(imitation_image[0])
-        results = []
         num_targets = len(target_image)
         has_mask = mask is not None and len(mask) == num_targets
+        # 目标图像与遮罩整批量化一次，结果写入预分配的 uint8 批次
+        targets_cv2 = tensor2cv2(target_image)
+        if targets_cv2.ndim == 3:
+            targets_cv2 = targets_cv2[None]
+        masks_cv2 = tensor2np(mask) if has_mask else None
+        results = np.empty(targets_cv2.shape, dtype=np.uint8)
         pb = ProgressBar(num_targets) if ProgressBar else None
-        for idx, img in enumerate(target_image):
+        for idx in range(num_targets):
             if pb:
                 pb.update(idx + 1)
-            img_cv2 = tensor2cv2(img)
-            img_cv3 = None
-            if has_mask:
-                m = mask[idx]
-                img_cv3 = m.cpu().numpy()
-                img_cv3 = (img_cv3 * 255).astype(np.uint8)
+            img_cv2 = targets_cv2[idx]
+            img_cv3 = masks_cv2[idx] if has_mask else None
             result_img = color_transfer(
                 img_cv1,
                 img_cv2,
@@ -356,11 +356,8 @@ Performs color transfer and imitation between images with skin protection.
                 auto_tone,
                 tone_strength,
             )
-            result_img = cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(result_img)
-            rst = pil2tensor(pil_img)
-            results.append(rst)
-        return (torch.cat(results, dim=0),)
+            cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB, dst=results[idx])
+        return (uint82tensor(results),)
 
 
 # Node mappings
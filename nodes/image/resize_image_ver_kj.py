@@ -189,52 +189,23 @@ class ResizeImageVerKJ_UTK:
                 padded_h = height + pad_top + pad_bottom
 
             if keep_proportion == "pad_edge" or keep_proportion == "pad_edge_pixel":
-                # Build canvas and apply edge/edge_pixel logic similar to KJ implementation
-                canvas = torch.zeros((B, padded_h, padded_w, C), dtype=out_img.dtype, device=out_img.device)
-                for b in range(B):
-                    # content
-                    canvas[b, pad_top:pad_top+height, pad_left:pad_left+width, :] = out_img[b]
-                    if keep_proportion == "pad_edge":
-                        # mean color along edges
-                        top_edge = out_img[b, 0, :, :]
-                        bottom_edge = out_img[b, height-1, :, :]
-                        left_edge = out_img[b, :, 0, :]
-                        right_edge = out_img[b, :, width-1, :]
-                        if pad_top > 0:
-                            canvas[b, :pad_top, :, :] = top_edge.mean(dim=0)
-                        if pad_bottom > 0:
-                            canvas[b, pad_top+height:, :, :] = bottom_edge.mean(dim=0)
-                        if pad_left > 0:
-                            canvas[b, :, :pad_left, :] = left_edge.mean(dim=0)
-                        if pad_right > 0:
-                            canvas[b, :, pad_left+width:, :] = right_edge.mean(dim=0)
-                    else:
-                        # edge_pixel: extend exact edge rows/columns
-                        if pad_top > 0:
-                            row = out_img[b, 0:1, :, :].expand(pad_top, width, C)
-                            canvas[b, :pad_top, pad_left:pad_left+width, :] = row
-                            # corners
-                            if pad_left > 0:
-                                tl = out_img[b, 0, 0, :]
-                                canvas[b, :pad_top, :pad_left, :] = tl
-                            if pad_right > 0:
-                                tr = out_img[b, 0, width-1, :]
-                                canvas[b, :pad_top, pad_left+width:, :] = tr
-                        if pad_bottom > 0:
-                            row = out_img[b, height-1:height, :, :].expand(pad_bottom, width, C)
-                            canvas[b, pad_top+height:, pad_left:pad_left+width, :] = row
-                            if pad_left > 0:
-                                bl = out_img[b, height-1, 0, :]
-                                canvas[b, pad_top+height:, :pad_left, :] = bl
-                            if pad_right > 0:
-                                br = out_img[b, height-1, width-1, :]
-                                canvas[b, pad_top+height:, pad_left+width:, :] = br
-                        if pad_left > 0:
-                            col = out_img[b, :, 0:1, :].expand(height, pad_left, C)
-                            canvas[b, pad_top:pad_top+height, :pad_left, :] = col
-                        if pad_right > 0:
-                            col = out_img[b, :, width-1:width, :].expand(height, pad_right, C)
-                            canvas[b, pad_top:pad_top+height, pad_left+width:, :] = col
+                # Build canvas and apply edge/edge_pixel logic similar to KJ implementation, whole batch at once
+                if keep_proportion == "pad_edge":
+                    canvas = torch.zeros((B, padded_h, padded_w, C), dtype=out_img.dtype, device=out_img.device)
+                    canvas[:, pad_top:pad_top+height, pad_left:pad_left+width, :] = out_img
+                    # mean color along edges
+                    if pad_top > 0:
+                        canvas[:, :pad_top, :, :] = out_img[:, 0, :, :].mean(dim=1)[:, None, None, :]
+                    if pad_bottom > 0:
+                        canvas[:, pad_top+height:, :, :] = out_img[:, height-1, :, :].mean(dim=1)[:, None, None, :]
+                    if pad_left > 0:
+                        canvas[:, :, :pad_left, :] = out_img[:, :, 0, :].mean(dim=1)[:, None, None, :]
+                    if pad_right > 0:
+                        canvas[:, :, pad_left+width:, :] = out_img[:, :, width-1, :].mean(dim=1)[:, None, None, :]
+                else:
+                    # edge_pixel: extend exact edge rows/columns, corners take the corner pixel
+                    canvas = F.pad(out_img.movedim(-1, 1), (pad_left, pad_right, pad_top, pad_bottom), mode="replicate")
+                    canvas = canvas.movedim(1, -1).contiguous()
                 out_img = canvas
                 if out_m is not None:
                     # replicate for mask to keep crisp edges
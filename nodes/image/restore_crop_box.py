@@ -11,7 +11,8 @@ Restores cropped images back to their original background.
 import torch
 from PIL import Image
 
-from ..image_utils import image2mask, pil2tensor, tensor2pil
+from ..image_convert import (batch_image2mask, batch_pil2tensor,
+                             batch_tensor2pil, tensor2pil)
 
 
 def log(message, message_type="info"):
@@ -57,28 +58,25 @@ class RestoreCropBox_UTK:
         self, background_image, croped_image, invert_mask, crop_box, croped_mask=None
     ):
 
-        b_images = []
-        l_images = []
         l_masks = []
         ret_images = []
         ret_masks = []
-        for b in background_image:
-            b_images.append(torch.unsqueeze(b, 0))
+        # 整批量化一次，逐帧只取 PIL 视图
+        b_images = batch_tensor2pil(background_image)
+        l_images = batch_tensor2pil(croped_image)
         for l in croped_image:
-            l_images.append(torch.unsqueeze(l, 0))
-            m = tensor2pil(l)
-            if m.mode == "RGBA":
-                l_masks.append(m.split()[-1])
+            if l.shape[-1] == 4:
+                l_masks.append(tensor2pil(l[..., 3]))
             else:
-                l_masks.append(Image.new("L", size=m.size, color="white"))
+                l_masks.append(
+                    Image.new("L", size=(l.shape[1], l.shape[0]), color="white")
+                )
         if croped_mask is not None:
             if croped_mask.dim() == 2:
                 croped_mask = torch.unsqueeze(croped_mask, 0)
-            l_masks = []
-            for m in croped_mask:
-                if invert_mask:
-                    m = 1 - m
-                l_masks.append(tensor2pil(torch.unsqueeze(m, 0)).convert("L"))
+            if invert_mask:
+                croped_mask = 1 - croped_mask
+            l_masks = batch_tensor2pil(croped_mask)
 
         max_batch = max(len(b_images), len(l_images), len(l_masks))
         for i in range(max_batch):
@@ -86,22 +84,22 @@ class RestoreCropBox_UTK:
             croped_image = l_images[i] if i < len(l_images) else l_images[-1]
             _mask = l_masks[i] if i < len(l_masks) else l_masks[-1]
 
-            _canvas = tensor2pil(background_image).convert("RGB")
-            _layer = tensor2pil(croped_image).convert("RGB")
+            _canvas = background_image.convert("RGB")
+            _layer = croped_image.convert("RGB")
 
             ret_mask = Image.new("L", size=_canvas.size, color="black")
             _canvas.paste(_layer, box=tuple(crop_box), mask=_mask)
             ret_mask.paste(_mask, box=tuple(crop_box))
-            ret_images.append(pil2tensor(_canvas))
-            ret_masks.append(image2mask(ret_mask))
+            ret_images.append(_canvas)
+            ret_masks.append(ret_mask)
 
         log(
             f"RestoreCropBox_UTK Processed {len(ret_images)} image(s).",
             message_type="finish",
         )
         return (
-            torch.cat(ret_images, dim=0),
-            torch.cat(ret_masks, dim=0),
+            batch_pil2tensor(ret_images),
+            batch_image2mask(ret_masks),
         )
 
 
@@ -0,0 +1,131 @@
+"""
+Image Conversion for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Batched tensor / PIL / NumPy conversion helpers shared by UniversalToolkit nodes.
+
+All conversions work on whole batches: float tensors are quantized once into a
+uint8 tensor whose NumPy view is handed to PIL/OpenCV without further copies,
+and uint8 data is turned back into float32 with a single allocation.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+from typing import List, Sequence, Union
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+def tensor2uint8(images: torch.Tensor) -> torch.Tensor:
+    """将 [0,1] 浮点张量整体量化为 uint8 张量（截断取整，与 np.clip(255*x).astype(uint8) 一致）"""
+    if images.dtype == torch.uint8:
+        return images.cpu()
+    images = images.detach().cpu()
+    return torch.mul(images, 255.0).clamp_(0, 255).to(torch.uint8)
+
+
+def uint82tensor(array: Union[np.ndarray, torch.Tensor]) -> torch.Tensor:
+    """将 uint8 数组/张量整体转换为 [0,1] float32 张量，只分配一次输出内存"""
+    if isinstance(array, np.ndarray):
+        if array.dtype != np.uint8 or not array.flags.writeable:
+            # PIL 导出的只读数组或非 uint8 数据：直接在 numpy 中转换并原地缩放
+            out = array.astype(np.float32)
+            out /= 255.0
+            return torch.from_numpy(out)
+        array = torch.from_numpy(array)
+    if array.dtype.is_floating_point:
+        return array.to(torch.float32) / 255.0
+    return array.to(torch.float32).div_(255.0)
+
+
+def tensor2np(tensor: torch.Tensor) -> np.ndarray:
+    """将 IMAGE/MASK 张量（单张或批次）转换为 uint8 numpy 数组，与 uint8 张量共享内存"""
+    return tensor2uint8(tensor).numpy()
+
+
+def np2tensor(np_array: np.ndarray) -> torch.Tensor:
+    """将单张 uint8 numpy 图像转换为带批次维的 float32 张量"""
+    return uint82tensor(np_array).unsqueeze(0)
+
+
+def _single_frame(array: np.ndarray) -> np.ndarray:
+    """去掉单张图像前导的批次维，返回 [H,W] 或 [H,W,C]"""
+    while array.ndim > 3 and array.shape[0] == 1:
+        array = array[0]
+    if array.ndim == 3 and array.shape[0] == 1 and array.shape[-1] not in (3, 4):
+        # [1,H,W] 掩码
+        array = array[0]
+    if array.ndim == 3 and array.shape[-1] == 1:
+        array = array[..., 0]
+    return array
+
+
+def _np2pil(array: np.ndarray) -> Image.Image:
+    """uint8 [H,W] / [H,W,3] / [H,W,4] 直接对应 L / RGB / RGBA"""
+    return Image.fromarray(_single_frame(array))
+
+
+def tensor2pil(image: torch.Tensor) -> Image.Image:
+    """将单张 IMAGE/MASK 张量转换为 PIL Image（支持 [1,H,W,C]、[H,W,C]、[1,H,W]、[H,W]）"""
+    return _np2pil(tensor2np(image))
+
+
+def batch_tensor2pil(images: torch.Tensor) -> List[Image.Image]:
+    """将整个批次一次性量化后逐帧生成 PIL 视图列表"""
+    if images.dim() == 2:
+        images = images.unsqueeze(0)
+    return [_np2pil(frame) for frame in tensor2np(images)]
+
+
+def _pil2np(image: Image.Image) -> np.ndarray:
+    return np.asarray(image)
+
+
+def pil2tensor(image: Image.Image) -> torch.Tensor:
+    """将 PIL Image 转换为 [1,H,W,C]（L 模式为 [1,H,W]）的 float32 张量"""
+    return uint82tensor(_pil2np(image)).unsqueeze(0)
+
+
+def batch_pil2tensor(images: Sequence[Image.Image]) -> torch.Tensor:
+    """将同尺寸、同模式的 PIL 列表写入预分配的 uint8 批次后一次性转为 float32 张量"""
+    first = _pil2np(images[0])
+    batch = np.empty((len(images),) + first.shape, dtype=first.dtype)
+    batch[0] = first
+    for i in range(1, len(images)):
+        batch[i] = _pil2np(images[i])
+    return uint82tensor(batch)
+
+
+def _mask_array(image: Image.Image) -> np.ndarray:
+    """L 模式直接使用，RGB/RGBA 取 R 通道，其余模式先转 RGB"""
+    if image.mode == "L":
+        return _pil2np(image)
+    if image.mode in ("RGB", "RGBA"):
+        return _pil2np(image)[..., 0]
+    return _pil2np(image.convert("RGB"))[..., 0]
+
+
+def image2mask(image: Image.Image) -> torch.Tensor:
+    """将图像转换为 [1,H,W] 掩码张量"""
+    return uint82tensor(_mask_array(image)).unsqueeze(0)
+
+
+def batch_image2mask(images: Sequence[Image.Image]) -> torch.Tensor:
+    """将同尺寸的 PIL 列表转换为 [B,H,W] 掩码张量"""
+    first = _mask_array(images[0])
+    batch = np.empty((len(images),) + first.shape, dtype=first.dtype)
+    batch[0] = first
+    for i in range(1, len(images)):
+        batch[i] = _mask_array(images[i])
+    return uint82tensor(batch)
+
+
+def tensor2cv2(image: torch.Tensor) -> np.ndarray:
+    """将 IMAGE 张量转换为 OpenCV BGR uint8 数组（按 255 固定缩放，支持批次）"""
+    array = tensor2np(image)
+    while array.ndim > 3 and array.shape[0] == 1:
+        array = array[0]
+    return np.ascontiguousarray(array[..., 2::-1])
@@ -4,44 +4,19 @@ Image Utilities for UniversalToolkit
 
 Image processing utility functions for UniversalToolkit nodes.
 
+Resizing goes through the batched torch engine in ``resample.py``.
+
 :copyright: (c) 2024 by May
 :license: MIT, see LICENSE for more details.
 """
 
-import numpy as np
-import torch
-from PIL import Image
-
-
-def tensor2pil(t_image: torch.Tensor) -> Image:
-    """将 PyTorch tensor 转换为 PIL Image"""
-    return Image.fromarray(
-        np.clip(255.0 * t_image.cpu().numpy().squeeze(), 0, 255).astype(np.uint8)
-    )
-
-
-def pil2tensor(image: Image) -> torch.Tensor:
-    """将 PIL Image 转换为 PyTorch tensor"""
-    return torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
-
-
-def image2mask(image: Image) -> torch.Tensor:
-    """将图像转换为掩码格式"""
-    if image.mode == "L":
-        return torch.tensor([pil2tensor(image)[0, :, :].tolist()])
-    else:
-        image = image.convert("RGB").split()[0]
-        return torch.tensor([pil2tensor(image)[0, :, :].tolist()])
-
-
-def tensor2np(tensor: torch.Tensor) -> np.ndarray:
-    """将 PyTorch tensor 转换为 numpy 数组"""
-    return np.clip(255.0 * tensor.cpu().numpy(), 0, 255).astype(np.uint8)
+import math
 
+import torch
+import torch.nn.functional as F
+from PIL import ImageColor
 
-def np2tensor(np_array: np.ndarray) -> torch.Tensor:
-    """将 numpy 数组转换为 PyTorch tensor"""
-    return torch.from_numpy(np_array.astype(np.float32) / 255.0).unsqueeze(0)
+from .resample import resample
 
 
 def log(message: str, message_type: str = "info"):
@@ -61,51 +36,157 @@ def num_round_up_to_multiple(number: int, multiple: int) -> int:
     return ((number + multiple - 1) // multiple) * multiple
 
 
+def paste_offset(crop_position: str, free_width: int, free_height: int):
+    """根据对齐位置计算放置（pad）或裁剪（crop）的左上角偏移"""
+    if crop_position == "top":
+        return free_width // 2, 0
+    if crop_position == "bottom":
+        return free_width // 2, free_height
+    if crop_position == "left":
+        return 0, free_height // 2
+    if crop_position == "right":
+        return free_width, free_height // 2
+    return free_width // 2, free_height // 2
+
+
+def fill_color(color, channels: int) -> torch.Tensor:
+    """把颜色名或 #RRGGBB 转换为 [0,1] 的颜色张量；单通道（遮罩）使用灰度值"""
+    if channels == 1:
+        return torch.tensor([ImageColor.getcolor(color, "L") / 255.0])
+    rgb = [v / 255.0 for v in ImageColor.getrgb(color)[:3]]
+    return torch.tensor((rgb + [1.0] * channels)[:channels])
+
+
+def gaussian_blur(images: torch.Tensor, radius: float, passes: int = 3) -> torch.Tensor:
+    """
+    批量高斯模糊 [B,H,W,C]，与 PIL ImageFilter.GaussianBlur 一样用三次
+    小数半径的盒式模糊近似，边缘像素向外复制。
+    """
+    sigma2 = radius * radius / passes
+    box_length = math.sqrt(12.0 * sigma2 + 1.0)
+    inner = math.floor((box_length - 1.0) / 2.0)
+    fraction = (2 * inner + 1) * (inner * (inner + 1) - 3 * sigma2)
+    fraction /= 6 * (sigma2 - (inner + 1) * (inner + 1))
+    box_radius = inner + fraction
+
+    weight = 1.0 / (box_radius * 2 + 1)
+    edge = (1.0 - (inner * 2 + 1) * weight) / 2
+    kernel = torch.tensor([edge] + [weight] * (inner * 2 + 1) + [edge], dtype=images.dtype, device=images.device)
+    pad = inner + 1
+
+    batch, height, width, channels = images.shape
+    x = images.permute(0, 3, 1, 2).reshape(batch * channels, 1, height, width)
+    for _ in range(passes):
+        x = F.conv2d(F.pad(x, (pad, pad, 0, 0), mode="replicate"), kernel.view(1, 1, 1, -1))
+    for _ in range(passes):
+        x = F.conv2d(F.pad(x, (0, 0, pad, pad), mode="replicate"), kernel.view(1, 1, -1, 1))
+    return x.reshape(batch, channels, height, width).permute(0, 2, 3, 1).contiguous()
+
+
+def _pad_edge_mean(resized: torch.Tensor, left: int, right: int, top: int, bottom: int) -> torch.Tensor:
+    """pad_edge：左右填充边缘列的平均色，上下（含四角）填充边缘行的平均色"""
+    batch, height, width, channels = resized.shape
+    out = resized.new_empty((batch, height + top + bottom, width + left + right, channels))
+    out[:, top : top + height, left : left + width] = resized
+    if left > 0:
+        out[:, top : top + height, :left] = resized[:, :, :1].mean(dim=1, keepdim=True)
+    if right > 0:
+        out[:, top : top + height, left + width :] = resized[:, :, -1:].mean(dim=1, keepdim=True)
+    if top > 0:
+        out[:, :top] = resized[:, :1].mean(dim=2, keepdim=True)
+    if bottom > 0:
+        out[:, top + height :] = resized[:, -1:].mean(dim=2, keepdim=True)
+    return out
+
+
+def _pad_edge_pixel(resized: torch.Tensor, left: int, right: int, top: int, bottom: int) -> torch.Tensor:
+    """pad_edge_pixel：边缘像素向外复制，四角为角点像素"""
+    out = F.pad(resized.permute(0, 3, 1, 2), (left, right, top, bottom), mode="replicate")
+    return out.permute(0, 2, 3, 1).contiguous()
+
+
+def _pillarbox_background(images: torch.Tensor, target_width: int, target_height: int) -> torch.Tensor:
+    """pillarbox_blur 背景：原图铺满画布后居中裁剪、高斯模糊、轻微去饱和并压暗"""
+    batch, height, width, channels = images.shape
+    scale_fill = max(target_width / max(1, width), target_height / max(1, height))
+    bg_width = max(1, int(round(width * scale_fill)))
+    bg_height = max(1, int(round(height * scale_fill)))
+    bg = resample(images, bg_width, bg_height, "bilinear")
+    x0 = max(0, (bg_width - target_width) // 2)
+    y0 = max(0, (bg_height - target_height) // 2)
+    canvas = images.new_zeros((batch, target_height, target_width, channels))
+    crop = bg[:, y0 : y0 + target_height, x0 : x0 + target_width]
+    canvas[:, : crop.shape[1], : crop.shape[2]] = crop
+    sigma = max(1.0, 0.006 * float(min(target_width, target_height)))
+    bg = gaussian_blur(canvas, sigma)
+    if channels == 3:
+        # 与红色通道亮度分量按 0.2 混合，降低饱和度
+        bg = bg * 0.8 + bg[..., :1] * (0.2126 * 0.2)
+    return bg * 0.35
+
+
 def fit_resize_image(
-    image, target_width, target_height, fit, resize_sampler, background_color="#000000"
-):
-    image = image.convert("RGB")
-    orig_width, orig_height = image.size
-    if fit == "letterbox":
-        if orig_width / orig_height > target_width / target_height:
-            fit_width = target_width
-            fit_height = int(target_width / orig_width * orig_height)
-        else:
-            fit_height = target_height
-            fit_width = int(target_height / orig_height * orig_width)
-        fit_image = image.resize((fit_width, fit_height), resize_sampler)
-        ret_image = Image.new(
-            "RGB", size=(target_width, target_height), color=background_color
+    images: torch.Tensor,
+    target_width: int,
+    target_height: int,
+    fit: str,
+    method: str = "lanczos",
+    background_color="black",
+    crop_position: str = "center",
+) -> torch.Tensor:
+    """
+    按 fit 模式批量缩放 IMAGE [B,H,W,C] 或 MASK [B,H,W] 张量。
+
+    - resize：等比缩放到目标框内，不填充，输出尺寸可能小于目标
+    - letterbox / pad：等比缩放后按 crop_position 放到 background_color 画布上
+    - pad_edge：空白处填充相邻边缘行/列的平均色
+    - pad_edge_pixel：空白处复制边缘像素
+    - pillarbox_blur：空白处为模糊、压暗后的原图
+    - crop：等比缩放覆盖目标框后按 crop_position 裁剪
+    - 其他（stretch / fill）：直接拉伸到目标尺寸
+    """
+    orig_height, orig_width = images.shape[1], images.shape[2]
+    if fit == "resize":
+        scale = min(target_width / orig_width, target_height / orig_height)
+        return resample(images, int(orig_width * scale), int(orig_height * scale), method)
+
+    if fit in ("letterbox", "pad", "pad_edge", "pad_edge_pixel", "pillarbox_blur"):
+        is_mask = images.dim() == 3
+        if is_mask:
+            images = images.unsqueeze(-1)
+        scale = min(target_width / orig_width, target_height / orig_height)
+        new_width = int(orig_width * scale)
+        new_height = int(orig_height * scale)
+        resized = resample(images, new_width, new_height, method)
+        paste_x, paste_y = paste_offset(crop_position, target_width - new_width, target_height - new_height)
+        pads = (
+            paste_x,
+            target_width - new_width - paste_x,
+            paste_y,
+            target_height - new_height - paste_y,
         )
-        ret_image.paste(
-            fit_image,
-            box=((target_width - fit_width) // 2, (target_height - fit_height) // 2),
-        )
-    elif fit == "crop":
-        if orig_width / orig_height > target_width / target_height:
-            fit_width = int(orig_height * target_width / target_height)
-            fit_image = image.crop(
-                (
-                    (orig_width - fit_width) // 2,
-                    0,
-                    (orig_width - fit_width) // 2 + fit_width,
-                    orig_height,
-                )
-            )
+        if fit == "pad_edge":
+            result = _pad_edge_mean(resized, *pads)
+        elif fit == "pad_edge_pixel":
+            result = _pad_edge_pixel(resized, *pads)
         else:
-            fit_height = int(orig_width * target_height / target_width)
-            fit_image = image.crop(
-                (
-                    0,
-                    (orig_height - fit_height) // 2,
-                    orig_width,
-                    (orig_height - fit_height) // 2 + fit_height,
-                )
-            )
-        ret_image = fit_image.resize((target_width, target_height), resize_sampler)
-    else:
-        ret_image = image.resize((target_width, target_height), resize_sampler)
-    return ret_image
+            if fit == "pillarbox_blur":
+                result = _pillarbox_background(images, target_width, target_height)
+            else:
+                color = fill_color(background_color, images.shape[-1]).to(images.device, images.dtype)
+                result = color.expand((images.shape[0], target_height, target_width, images.shape[-1])).contiguous()
+            result[:, paste_y : paste_y + new_height, paste_x : paste_x + new_width] = resized
+        return result.squeeze(-1) if is_mask else result
+
+    if fit == "crop":
+        scale = max(target_width / orig_width, target_height / orig_height)
+        new_width = int(orig_width * scale)
+        new_height = int(orig_height * scale)
+        resized = resample(images, new_width, new_height, method)
+        crop_x, crop_y = paste_offset(crop_position, new_width - target_width, new_height - target_height)
+        return resized[:, crop_y : crop_y + target_height, crop_x : crop_x + target_width].contiguous()
+
+    return resample(images, target_width, target_height, method)
 
 
 def is_valid_mask(tensor: torch.Tensor) -> bool:
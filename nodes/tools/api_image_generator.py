@@ -12,7 +12,6 @@ API图像生成器节点
 import json
 import base64
 import io
-import requests
 from PIL import Image
 import numpy as np
 
@@ -305,6 +304,8 @@ class APIImageGenerator_UTK:
         
         基于火山引擎即梦4.0图像生成API文档实现
         """
+        import requests
+
         try:
             # 即梦4.0 API端点
             api_url = "https://ark.cn-beijing.volces.com/api/v3/seedream-4.0"
@@ -0,0 +1,191 @@
+"""
+Batch Map Node
+~~~~~~~~~~~~~~
+
+Applies any UniversalToolkit image / mask node to a large batch in chunks
+sized from a memory budget, writing the results into preallocated outputs.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import json
+
+from ..batch_map import batch_map, chunk_size_for_budget, frame_bytes
+from .logging_utils import log
+
+# 由 __init__ 在所有节点注册完成后填充：节点名 -> 节点类
+_TARGETS = {}
+
+# 可以逐块执行的节点：每帧输出只依赖该帧，第一个 IMAGE / MASK 输入就是要分块的批次。
+# 值为 (每块相同的输出序号, 表示帧数的输出序号)，其余输出必须逐帧
+ALLOWED_TARGETS = {
+    "BlockifyMask_UTK": ((), ()),
+    "ImageCombineAlpha_UTK": ((), ()),
+    "ImageRemoveAlpha_UTK": ((), ()),
+    "ImagePadForOutpaintMasked_UTK": ((), ()),
+    "ImageScaleByAspectRatio_UTK": ((2, 3, 4), (5,)),
+    "ImageScaleRestore_UTK": ((2, 3, 4), ()),
+    "ResizeImageVerKJ_UTK": ((1, 2), ()),
+}
+
+
+def _tensor_inputs(node_class):
+    """返回节点第一个 IMAGE 输入和第一个 MASK 输入的参数名"""
+    image_name = mask_name = None
+    spec = node_class.INPUT_TYPES()
+    for section in ("required", "optional"):
+        for name, value in spec.get(section, {}).items():
+            kind = value[0] if isinstance(value, (list, tuple)) and value else None
+            if kind == "IMAGE" and image_name is None:
+                image_name = name
+            elif kind == "MASK" and mask_name is None:
+                mask_name = name
+    return image_name, mask_name
+
+
+def _default_params(node_class):
+    """取节点必填参数的默认值，下拉框取第一项"""
+    params = {}
+    for name, value in node_class.INPUT_TYPES().get("required", {}).items():
+        if not isinstance(value, (list, tuple)) or not value:
+            continue
+        kind = value[0]
+        options = value[1] if len(value) > 1 and isinstance(value[1], dict) else {}
+        if isinstance(kind, (list, tuple)):
+            if kind:
+                params[name] = options.get("default", kind[0])
+        elif "default" in options:
+            params[name] = options["default"]
+    return params
+
+
+def register_targets(node_class_mappings):
+    """登记 ALLOWED_TARGETS 中已注册的节点"""
+    for node_name in ALLOWED_TARGETS:
+        node_class = node_class_mappings.get(node_name)
+        if node_class is None:
+            continue
+        try:
+            image_name, mask_name = _tensor_inputs(node_class)
+        except Exception:
+            continue
+        if image_name or mask_name:
+            _TARGETS[node_name] = node_class
+
+
+class BatchMap_UTK:
+    CATEGORY = "UniversalToolkit/Tools"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        targets = sorted(_TARGETS) or ["none"]
+        return {
+            "required": {
+                "node": (targets, {"tooltip": "逐块执行的节点，每帧结果必须只依赖该帧"}),
+                "params": ("STRING", {
+                    "default": "{}",
+                    "multiline": True,
+                    "tooltip": "目标节点的参数（JSON），未填写的使用节点默认值",
+                }),
+                "memory_budget_mb": ("INT", {
+                    "default": 4096,
+                    "min": 64,
+                    "max": 1048576,
+                    "step": 64,
+                    "tooltip": "每块可用的临时内存（MB），决定每块的帧数",
+                }),
+                "working_set_factor": ("FLOAT", {
+                    "default": 4.0,
+                    "min": 1.0,
+                    "max": 64.0,
+                    "step": 0.5,
+                    "tooltip": "目标节点临时内存约为输入的多少倍",
+                }),
+            },
+            "optional": {
+                "images": ("IMAGE",),
+                "mask": ("MASK",),
+            },
+        }
+
+    RETURN_TYPES = ("IMAGE", "MASK", "INT")
+    RETURN_NAMES = ("image", "mask", "chunk_size")
+    FUNCTION = "batch_map"
+
+    def batch_map(self, node, params, memory_budget_mb, working_set_factor, images=None, mask=None):
+        from comfy.utils import ProgressBar
+
+        node_class = _TARGETS.get(node)
+        if node_class is None:
+            raise ValueError(f"BatchMap_UTK: unknown node '{node}'")
+        try:
+            user_params = json.loads(params) if params.strip() else {}
+        except json.JSONDecodeError as e:
+            raise ValueError(f"BatchMap_UTK: params is not valid JSON: {e}")
+
+        image_name, mask_name = _tensor_inputs(node_class)
+        static = _default_params(node_class)
+        static.update(user_params)
+        batched = {}
+        if images is not None and image_name:
+            batched[image_name] = images
+        if mask is not None and mask_name:
+            if mask.dim() == 2:
+                mask = mask.unsqueeze(0)
+            reference = images if images is not None and image_name else None
+            # 单张遮罩作用于所有帧，不参与分块
+            if reference is not None and mask.shape[0] != reference.shape[0]:
+                static[mask_name] = mask
+            else:
+                batched[mask_name] = mask
+        for name in batched:
+            static.pop(name, None)
+        if not batched:
+            raise ValueError(f"BatchMap_UTK: {node} needs an IMAGE or MASK input")
+
+        total = next(iter(batched.values())).shape[0]
+        chunk_size = chunk_size_for_budget(
+            frame_bytes(batched.values()), memory_budget_mb * 1024 * 1024, working_set_factor
+        )
+        log(f"BatchMap_UTK: {node} over {total} frames, {chunk_size} per chunk")
+
+        instance = node_class()
+        function = getattr(instance, node_class.FUNCTION)
+        pbar = ProgressBar(total)
+        constant_outputs, count_outputs = ALLOWED_TARGETS[node]
+        # 没有提供的 IMAGE / MASK 输入对应的输出可以是占位值（None 或固定大小的空遮罩）
+        missing = set()
+        if image_name not in batched:
+            missing.add("IMAGE")
+        if mask_name not in batched:
+            missing.add("MASK")
+        optional_outputs = tuple(i for i, kind in enumerate(node_class.RETURN_TYPES) if kind in missing)
+        outputs = batch_map(
+            function,
+            batched,
+            static,
+            chunk_size=chunk_size,
+            progress=pbar.update,
+            constant_outputs=constant_outputs,
+            count_outputs=count_outputs,
+            optional_outputs=optional_outputs,
+        )
+
+        ret_image = ret_mask = None
+        for kind, value in zip(node_class.RETURN_TYPES, outputs):
+            if kind == "IMAGE" and ret_image is None:
+                ret_image = value
+            elif kind == "MASK" and ret_mask is None:
+                ret_mask = value
+        log(f"BatchMap_UTK: {node} processed {total} frames", message_type="finish")
+        return (ret_image, ret_mask, chunk_size)
+
+
+NODE_CLASS_MAPPINGS = {
+    "BatchMap_UTK": BatchMap_UTK,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "BatchMap_UTK": "Batch Map (UTK)",
+}
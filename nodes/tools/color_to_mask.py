@@ -12,6 +12,8 @@ Converts chosen RGB values to mask based on color distance threshold.
 import torch
 from comfy.utils import ProgressBar
 
+from ..batch_map import batch_map
+
 
 class ColorToMask_UTK:
     """
@@ -116,41 +118,32 @@ Parameters:
         if invert:
             black, white = white, black
 
-        # Initialize progress bar and output list
+        # Initialize progress bar
         steps = images.shape[0]
         pbar = ProgressBar(steps)
-        tensors_out = []
-        
-        # Process images in batches
-        for start_idx in range(0, images.shape[0], per_batch):
-            end_idx = min(start_idx + per_batch, images.shape[0])
-            batch_images = images[start_idx:end_idx]
-            
+
+        def _color_distance_mask(batch_images):
             # Calculate color distances using Euclidean distance
             # Convert images from [0,1] to [0,255] range for comparison
             color_distances = torch.norm(batch_images * 255 - color.float(), dim=-1)
-            
+
             # Create mask based on threshold
             mask = color_distances <= threshold
-            
+
             # Apply mask to create output (white for match, black for no match)
             mask_out = torch.where(mask.unsqueeze(-1), white.float(), black.float())
-            
+
             # Convert to grayscale mask by taking mean across color channels
             mask_out = mask_out.mean(dim=-1)
-            
-            # Normalize to [0,1] range and move to CPU
-            mask_out = mask_out / 255.0
-            tensors_out.append(mask_out.cpu())
-            
-            # Update progress bar
-            batch_count = mask_out.shape[0]
-            pbar.update(batch_count)
-       
-        # Concatenate all batches and ensure proper range
-        tensors_out = torch.cat(tensors_out, dim=0)
-        tensors_out = torch.clamp(tensors_out, min=0.0, max=1.0)
-        
+
+            # Normalize to [0,1] range, clamp and move to CPU
+            return torch.clamp(mask_out / 255.0, min=0.0, max=1.0).cpu()
+
+        # Process images in batches, writing into a preallocated output
+        (tensors_out,) = batch_map(
+            _color_distance_mask, {"batch_images": images}, chunk_size=per_batch, progress=pbar.update
+        )
+
         return (tensors_out,)
 
 
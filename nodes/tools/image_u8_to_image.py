@@ -0,0 +1,43 @@
+"""
+Image U8 To Image Node
+~~~~~~~~~~~~~~~~~~~~~~
+
+Converts the uint8 IMAGE_U8 batches produced by the frame loaders (with
+``uint8_output`` enabled) into ComfyUI's float32 [0,1] IMAGE.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+from ..image_convert import uint82tensor
+
+
+class ImageU8ToImage_UTK:
+    CATEGORY = "UniversalToolkit/Tools"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "images_u8": ("IMAGE_U8", {
+                    "tooltip": "uint8 图像批次 [B,H,W,C]，来自开启 uint8_output 的抽帧/图片序列节点"
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    RETURN_NAMES = ("images",)
+    FUNCTION = "convert"
+
+    def convert(self, images_u8):
+        # 一次分配 float32 输出并原地缩放到 [0,1]
+        return (uint82tensor(images_u8),)
+
+
+NODE_CLASS_MAPPINGS = {
+    "ImageU8ToImage_UTK": ImageU8ToImage_UTK,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "ImageU8ToImage_UTK": "Image U8 To Image (UTK)",
+}
@@ -0,0 +1,180 @@
+"""
+Load Image Sequence Node
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Samples frames from a directory of images with the same sampling modes as
+``Extract_Video_Frames_UTK``. The sampled files are decoded in a thread pool
+straight into a preallocated batch; when a target size is set, JPEGs are
+decoded at reduced size with PIL's draft mode before the final resize.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import os
+import re
+
+from ..file_fingerprint import files_fingerprint
+from ..video_utils import SAMPLING_MODES, FrameBatch, FrameTransform, plan_frame_indices
+from .logging_utils import log
+from .profiling import span
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+
+
+def _natural_key(name: str):
+    """frame_2.png 排在 frame_10.png 之前"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def list_image_files(directory: str):
+    """目录中的图片文件（按自然顺序排序）"""
+    directory = directory.strip().strip('"').strip("'")
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"目录不存在: {directory}")
+    with os.scandir(directory) as entries:
+        names = [entry.name for entry in entries if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)]
+    return [os.path.join(directory, name) for name in sorted(names, key=_natural_key)]
+
+
+def _decode_image(path: str, size):
+    """解码为 size (宽, 高) 的 RGB uint8 数组；JPEG 先用 draft 以不小于 size 的 1/2、1/4、1/8 尺寸解码"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft("RGB", size)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        frame = np.asarray(image)
+    if (frame.shape[1], frame.shape[0]) != size:
+        return FrameTransform(*size)(frame)
+    # PIL 导出的数组是只读的
+    return frame if frame.flags.writeable else frame.copy()
+
+
+class LoadImageSequence_UTK:
+    CATEGORY = "UniversalToolkit/Tools"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "directory": ("STRING", {
+                    "default": "",
+                    "tooltip": "图片序列所在目录（png, jpg, webp, bmp, tif），按文件名自然顺序排列"
+                }),
+                "target_frames": ("INT", {
+                    "default": 8,
+                    "min": 1,
+                    "max": 65536,
+                    "step": 1,
+                    "tooltip": "目标抽取的帧数"
+                }),
+                "mode": (list(SAMPLING_MODES), {
+                    "default": "average",
+                    "tooltip": "Frame extraction mode"
+                }),
+            },
+            "optional": {
+                "target_long_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "tooltip": "把长边缩小到该值（仅缩小），JPEG 会以缩小尺寸直接解码；0 表示保持原尺寸"
+                }),
+                "target_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "tooltip": "输出宽度；只填宽或高时保持比例，优先于 target_long_side"
+                }),
+                "target_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "tooltip": "输出高度；只填宽或高时保持比例，优先于 target_long_side"
+                }),
+                "decode_workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 64,
+                    "step": 1,
+                    "tooltip": "并行解码线程数，0 表示使用全部 CPU 核心"
+                }),
+                "uint8_output": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "从 images_u8 输出 IMAGE_U8 类型的 uint8 张量（内存为 float32 的 1/4），此时 images 输出为空；可用 Image U8 To Image (UTK) 转回 IMAGE"
+                }),
+            }
+        }
+
+    # uint8 批次不符合 IMAGE 的 float32 [0,1] 约定，单独以 IMAGE_U8 类型输出
+    RETURN_TYPES = ("IMAGE", "INT", "IMAGE_U8")
+    RETURN_NAMES = ("images", "frames_count", "images_u8")
+    FUNCTION = "load_sequence"
+
+    @classmethod
+    def IS_CHANGED(cls, directory, **kwargs):
+        # 文件列表与每个文件的指纹都不变时跳过重新执行
+        try:
+            return files_fingerprint(list_image_files(directory))
+        except OSError:
+            return f"missing:{directory}"
+
+    def load_sequence(
+        self,
+        directory,
+        target_frames,
+        mode,
+        target_long_side=0,
+        target_width=0,
+        target_height=0,
+        decode_workers=0,
+        uint8_output=False,
+    ):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from PIL import Image
+
+        with span("probe"):
+            files = list_image_files(directory)
+        if not files:
+            raise RuntimeError(f"目录中没有图片: {directory}")
+        indices = plan_frame_indices(len(files), target_frames, mode).tolist()
+        log(f"LoadImageSequence_UTK: {len(indices)} of {len(files)} images from {directory} ({mode})")
+
+        # 输出尺寸由第一张抽中的图片决定，其余尺寸不同的图片缩放到该尺寸
+        transform = FrameTransform(target_width, target_height, target_long_side)
+        with Image.open(files[indices[0]]) as image:
+            size = transform.output_size(*image.size)
+
+        batch = FrameBatch(indices, uint8=uint8_output)
+
+        def _load(index):
+            batch.put_rgb(index, _decode_image(files[index], size))
+
+        workers = decode_workers if decode_workers > 0 else (os.cpu_count() or 1)
+        unique = sorted(set(indices))
+        with span("decode"):
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique))), thread_name_prefix="utk-image") as pool:
+                list(pool.map(_load, unique))
+
+        images = batch.result()
+        log(f"LoadImageSequence_UTK: loaded {len(images)} images, shape {tuple(images.shape)}", message_type="finish")
+        if uint8_output:
+            return (None, len(images), images)
+        return (images, len(images), None)
+
+
+NODE_CLASS_MAPPINGS = {
+    "LoadImageSequence_UTK": LoadImageSequence_UTK,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "LoadImageSequence_UTK": "Load Image Sequence (UTK)",
+}
@@ -9,13 +9,40 @@ based on target frame count and sampling mode.
 :license: MIT, see LICENSE for more details.
 """
 
+import functools
 import os
-import cv2
+
+import numpy as np
 import torch
 from typing import Optional, Tuple, List
-from PIL import Image
 
-from ..image.image_converters import pil2tensor
+from ..file_fingerprint import file_fingerprint
+from ..image_convert import tensor2uint8
+from ..video_utils import (
+    DECODERS,
+    FrameBatch,
+    FrameCache,
+    FrameTransform,
+    content_aware_probe_count,
+    decode_frames,
+    get_video_index,
+    normalize_video_path,
+    plan_content_aware_indices,
+    plan_frame_indices,
+    probe_thumbnails,
+    tensor_thumbnails,
+    transformed,
+)
+from .profiling import span
+
+
+def _format_indices(indices: List[int], limit: int = 32) -> str:
+    """帧索引过多时只显示首尾"""
+    if len(indices) <= limit:
+        return str(indices)
+    head = ", ".join(str(i) for i in indices[: limit // 2])
+    tail = ", ".join(str(i) for i in indices[-limit // 2 :])
+    return f"[{head}, ... {tail}] (共 {len(indices)} 个)"
 
 
 class Extract_Video_Frames_UTK:
@@ -28,11 +55,13 @@ class Extract_Video_Frames_UTK:
     - 后面较多：后半部分抽取更多帧
     - 中间较多：中间部分抽取更多帧
     - 两端较多：开头和结尾抽取更多帧
+    - 内容感知：按画面变化分配帧数，优先场景切换和运动剧烈处，丢弃近似重复帧
     """
     
     CATEGORY = "UniversalToolkit/Tools"
-    RETURN_TYPES = ("IMAGE", "INT")
-    RETURN_NAMES = ("images", "frames_count")
+    # uint8 批次不符合 IMAGE 的 float32 [0,1] 约定，单独以 IMAGE_U8 类型输出
+    RETURN_TYPES = ("IMAGE", "INT", "IMAGE_U8")
+    RETURN_NAMES = ("images", "frames_count", "images_u8")
     FUNCTION = "load_frames"
     
     @classmethod
@@ -46,11 +75,11 @@ class Extract_Video_Frames_UTK:
                 "target_frames": ("INT", {
                     "default": 8,
                     "min": 1,
-                    "max": 1000,
+                    "max": 65536,
                     "step": 1,
                     "tooltip": "目标抽取的帧数"
                 }),
-                "mode": (["average", "front_heavy", "back_heavy", "middle_heavy", "ends_heavy"], {
+                "mode": (["average", "front_heavy", "back_heavy", "middle_heavy", "ends_heavy", "content_aware"], {
                     "default": "average",
                     "tooltip": "Frame extraction mode"
                 }),
@@ -59,12 +88,71 @@ class Extract_Video_Frames_UTK:
                 "images": ("IMAGE", {
                     "tooltip": "图片序列输入（如果提供，将优先使用图片序列而不是视频）"
                 }),
+                "duplicate_threshold": ("FLOAT", {
+                    "default": 0.01,
+                    "min": 0.0,
+                    "max": 1.0,
+                    "step": 0.001,
+                    "tooltip": "content_aware 模式下，与上一保留帧的缩略图平均差低于该值的帧视为重复并丢弃；0 表示不丢弃"
+                }),
+                "decode_workers": ("INT", {
+                    "default": 1,
+                    "min": 0,
+                    "max": 64,
+                    "step": 1,
+                    "tooltip": "并行解码线程数，每个线程打开独立的视频句柄解码一段区间；0 表示使用全部 CPU 核心"
+                }),
+                "decoder": (list(DECODERS), {
+                    "default": "auto",
+                    "tooltip": "解码后端：cv2 (OpenCV)、pyav (PyAV 多线程解码)、ffmpeg (ffmpeg 子进程管道)；auto 按容器、编码和是否可变帧率测速后选择（画面与 cv2 不一致的后端不参选），未安装的后端自动退回 cv2"
+                }),
+                "target_long_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "tooltip": "解码后立即把长边缩小到该值（仅缩小，INTER_AREA），0 表示保持原尺寸"
+                }),
+                "target_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "tooltip": "解码后立即缩放到的宽度；只填宽或高时保持比例，优先于 target_long_side"
+                }),
+                "target_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8,
+                    "tooltip": "解码后立即缩放到的高度；只填宽或高时保持比例，优先于 target_long_side"
+                }),
+                "crop_x": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 1, "tooltip": "裁剪区域左上角 x（源视频坐标），先裁剪再缩放"}),
+                "crop_y": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 1, "tooltip": "裁剪区域左上角 y（源视频坐标）"}),
+                "crop_width": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 1, "tooltip": "裁剪宽度，0 表示不裁剪"}),
+                "crop_height": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 1, "tooltip": "裁剪高度，0 表示不裁剪"}),
+                "frame_cache": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "把解码后的帧保存到磁盘内存映射缓存，之后以不同参数抽取同一视频时直接读取已缓存的帧"
+                }),
+                "uint8_output": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "从 images_u8 输出 IMAGE_U8 类型的 uint8 张量（内存为 float32 的 1/4），此时 images 输出为空；可用 Image U8 To Image (UTK) 转回 IMAGE"
+                }),
             }
         }
     
+    @classmethod
+    def IS_CHANGED(cls, video_path: str = "", **kwargs):
+        # 其余参数和图片序列输入由 ComfyUI 自行比较；视频文件未变化时直接使用缓存的输出
+        if not video_path or not video_path.strip():
+            return ""
+        return file_fingerprint(video_path)
+
     def calculate_frame_indices(self, total_frames: int, target_frames: int, mode: str) -> List[int]:
         """
-        根据模式和目标帧数计算要抽取的帧索引
+        根据模式和目标帧数计算要抽取的帧索引（升序、不重复，见 plan_frame_indices）。
+        content_aware 需要画面内容，只给出帧数时按 average 计算。
         
         Args:
             total_frames: 总帧数
@@ -74,223 +162,80 @@ class Extract_Video_Frames_UTK:
         Returns:
             帧索引列表
         """
-        if total_frames <= 0:
-            return []
-        
-        if target_frames >= total_frames:
-            # 如果目标帧数大于等于总帧数，返回所有帧
-            return list(range(total_frames))
-        
-        indices = []
-        
-        if mode == "average":
-            # 均匀分布
-            step = total_frames / target_frames
-            indices = [int(i * step) for i in range(target_frames)]
-            # 确保最后一个索引不超过总帧数
-            indices[-1] = min(indices[-1], total_frames - 1)
-            
-        elif mode == "front_heavy":
-            # 前半部分抽取60%，后半部分抽取40%
-            front_count = int(target_frames * 0.6)
-            back_count = target_frames - front_count
-            
-            # 前半部分均匀抽取
-            if front_count > 0:
-                front_step = (total_frames // 2) / front_count
-                front_indices = [int(i * front_step) for i in range(front_count)]
-            else:
-                front_indices = []
-            
-            # 后半部分均匀抽取
-            if back_count > 0:
-                back_start = total_frames // 2
-                back_step = (total_frames - back_start) / back_count
-                back_indices = [back_start + int(i * back_step) for i in range(back_count)]
-            else:
-                back_indices = []
-            
-            indices = front_indices + back_indices
-            
-        elif mode == "back_heavy":
-            # 前半部分抽取40%，后半部分抽取60%
-            front_count = int(target_frames * 0.4)
-            back_count = target_frames - front_count
-            
-            # 前半部分均匀抽取
-            if front_count > 0:
-                front_step = (total_frames // 2) / front_count
-                front_indices = [int(i * front_step) for i in range(front_count)]
-            else:
-                front_indices = []
-            
-            # 后半部分均匀抽取
-            if back_count > 0:
-                back_start = total_frames // 2
-                back_step = (total_frames - back_start) / back_count
-                back_indices = [back_start + int(i * back_step) for i in range(back_count)]
-            else:
-                back_indices = []
-            
-            indices = front_indices + back_indices
-            
-        elif mode == "middle_heavy":
-            # 开头20%，中间60%，结尾20%
-            start_count = int(target_frames * 0.2)
-            middle_count = int(target_frames * 0.6)
-            end_count = target_frames - start_count - middle_count
-            
-            # 开头部分
-            if start_count > 0:
-                start_step = (total_frames // 4) / max(start_count, 1)
-                start_indices = [int(i * start_step) for i in range(start_count)]
-            else:
-                start_indices = []
-            
-            # 中间部分
-            if middle_count > 0:
-                middle_start = total_frames // 4
-                middle_end = total_frames * 3 // 4
-                middle_step = (middle_end - middle_start) / max(middle_count, 1)
-                middle_indices = [middle_start + int(i * middle_step) for i in range(middle_count)]
-            else:
-                middle_indices = []
-            
-            # 结尾部分
-            if end_count > 0:
-                end_start = total_frames * 3 // 4
-                end_step = (total_frames - end_start) / max(end_count, 1)
-                end_indices = [end_start + int(i * end_step) for i in range(end_count)]
-            else:
-                end_indices = []
-            
-            indices = start_indices + middle_indices + end_indices
-            
-        elif mode == "ends_heavy":
-            # 开头40%，中间20%，结尾40%
-            start_count = int(target_frames * 0.4)
-            middle_count = int(target_frames * 0.2)
-            end_count = target_frames - start_count - middle_count
-            
-            # 开头部分
-            if start_count > 0:
-                start_step = (total_frames // 3) / max(start_count, 1)
-                start_indices = [int(i * start_step) for i in range(start_count)]
-            else:
-                start_indices = []
-            
-            # 中间部分
-            if middle_count > 0:
-                middle_start = total_frames // 3
-                middle_end = total_frames * 2 // 3
-                middle_step = (middle_end - middle_start) / max(middle_count, 1)
-                middle_indices = [middle_start + int(i * middle_step) for i in range(middle_count)]
-            else:
-                middle_indices = []
-            
-            # 结尾部分
-            if end_count > 0:
-                end_start = total_frames * 2 // 3
-                end_step = (total_frames - end_start) / max(end_count, 1)
-                end_indices = [end_start + int(i * end_step) for i in range(end_count)]
-            else:
-                end_indices = []
-            
-            indices = start_indices + middle_indices + end_indices
-        
-        # 去重并排序
-        indices = sorted(list(set(indices)))
-        # 确保索引在有效范围内
-        indices = [idx for idx in indices if 0 <= idx < total_frames]
-        
-        # 如果去重后数量不足，补充帧
-        while len(indices) < target_frames and len(indices) < total_frames:
-            # 找到最大的间隔并补充
-            if len(indices) == 0:
-                indices.append(0)
-            elif len(indices) == 1:
-                if indices[0] < total_frames - 1:
-                    indices.append(total_frames - 1)
-                else:
-                    break
-            else:
-                max_gap = 0
-                insert_pos = 0
-                for i in range(len(indices) - 1):
-                    gap = indices[i + 1] - indices[i]
-                    if gap > max_gap:
-                        max_gap = gap
-                        insert_pos = i + 1
-                        insert_value = (indices[i] + indices[i + 1]) // 2
-                
-                if max_gap > 1:
-                    indices.insert(insert_pos, insert_value)
-                    indices.sort()
-                else:
-                    # 如果没有大间隔，在两端补充
-                    if indices[0] > 0:
-                        indices.insert(0, indices[0] - 1)
-                    elif indices[-1] < total_frames - 1:
-                        indices.append(min(indices[-1] + 1, total_frames - 1))
-                    else:
-                        break
-        
-        return indices[:target_frames]
+        if mode == "content_aware":
+            mode = "average"
+        return plan_frame_indices(total_frames, target_frames, mode).tolist()
     
-    def load_video_frames(self, video_path: str, indices: List[int]) -> List[torch.Tensor]:
+    def load_video_frames(
+        self,
+        video_path: str,
+        indices: List[int],
+        uint8_output: bool = False,
+        keyframes: Optional[List[int]] = None,
+        decode_workers: int = 1,
+        frame_cache: bool = False,
+        transform: Optional[FrameTransform] = None,
+        decoder: str = "cv2"
+    ) -> torch.Tensor:
         """
         从视频文件中加载指定索引的帧
         
         Args:
             video_path: 视频文件路径
             indices: 要加载的帧索引列表
+            uint8_output: 为 True 时输出 uint8 张量，否则输出 [0,1] float32
+            keyframes: 关键帧位置（来自视频索引），用于决定何时跳转
+            decode_workers: 并行解码的线程数，每个线程用独立的 VideoCapture 解码一段连续区间
+            frame_cache: 是否使用磁盘帧缓存（已解码的帧直接从内存映射文件读取）
+            transform: 解码后立即在 uint8 上执行的裁剪/缩放
+            decoder: 解码后端（cv2 / pyav / ffmpeg / auto）
             
         Returns:
-            帧张量列表
+            帧批次张量 [N, H, W, 3]
         """
-        # 路径预处理
-        video_path = video_path.strip().strip('"').strip("'")
-        video_path = video_path.replace("\\", "/")
-        
+        video_path = normalize_video_path(video_path)
         if not os.path.isfile(video_path):
             raise FileNotFoundError(f"视频文件不存在: {video_path}")
         
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise RuntimeError(f"无法打开视频文件: {video_path}")
-        
-        # 为了保持原始顺序，先按索引顺序读取并存储到字典中
-        frame_dict = {}
-        sorted_indices = sorted(set(indices))  # 去重并排序以提高效率
-        
-        for target_idx in sorted_indices:
-            # 跳转到目标帧
-            cap.set(cv2.CAP_PROP_POS_FRAMES, target_idx)
-            
-            ret, frame = cap.read()
-            if not ret:
-                print(f"警告: 无法读取第 {target_idx} 帧")
-                continue
-            
-            # 转换BGR到RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            # 转换为PIL图像
-            pil_image = Image.fromarray(frame_rgb)
-            # 转换为tensor
-            tensor = pil2tensor(pil_image)
-            frame_dict[target_idx] = tensor
-        
-        cap.release()
+        # 按照原始indices顺序直接写入预先分配的输出，不经过 PIL 和中间列表
+        frames = FrameBatch(indices, uint8=uint8_output)
+        to_decode = indices
+        on_frame = frames
+        cache = None
+        if frame_cache:
+            video_index = get_video_index(video_path)
+            width, height = video_index.width, video_index.height
+            variant = ""
+            if transform is not None:
+                width, height = transform.output_size(width, height)
+                variant = transform.key()
+            cache = FrameCache(video_index, width, height, variant=variant)
+            with span("cache"):
+                hits = cache.gather(indices, frames)
+            to_decode = cache.missing(indices)
+            on_frame = functools.partial(cache.store, sink=frames)
+            print(f"🗂️ 帧缓存: 命中 {hits} 帧, 需要解码 {len(to_decode)} 帧")
+
+        try:
+            if to_decode:
+                with span("decode"):
+                    # 小间隔顺序 grab，大间隔才跳转；多线程时各自解码互不重叠的区间
+                    backend, planners = decode_frames(
+                        video_path, to_decode, transformed(on_frame, transform), decode_workers, keyframes, decoder
+                    )
+                seeks = sum(planner.seeks for planner in planners)
+                grabs = sum(planner.grabs for planner in planners)
+                print(f"🎞️ 解码完成 ({backend}): {len(planners)} 个解码流, 跳转 {seeks} 次, 顺序跳过 {grabs} 帧")
+        finally:
+            if cache is not None:
+                cache.close()
         
-        if len(frame_dict) == 0:
+        if frames.count == 0:
             raise RuntimeError("未能从视频中加载任何帧")
         
-        # 按照原始indices顺序返回帧
-        frames = [frame_dict[idx] for idx in indices if idx in frame_dict]
-        
-        return frames
+        return frames.result()
     
-    def load_image_sequence_frames(self, images: torch.Tensor, indices: List[int]) -> List[torch.Tensor]:
+    def load_image_sequence_frames(self, images: torch.Tensor, indices: List[int]) -> torch.Tensor:
         """
         从图片序列中提取指定索引的帧
         
@@ -299,24 +244,36 @@ class Extract_Video_Frames_UTK:
             indices: 要提取的帧索引列表
             
         Returns:
-            帧张量列表
+            帧批次张量
         """
-        frames = []
+        valid_indices = []
         for idx in indices:
             if 0 <= idx < len(images):
-                frames.append(images[idx])
+                valid_indices.append(idx)
             else:
                 print(f"警告: 索引 {idx} 超出图片序列范围 [0, {len(images)-1}]")
         
-        return frames
+        return images[valid_indices]
     
     def load_frames(
         self,
         video_path: str,
         target_frames: int,
         mode: str,
-        images: Optional[torch.Tensor] = None
-    ) -> Tuple[torch.Tensor]:
+        images: Optional[torch.Tensor] = None,
+        uint8_output: bool = False,
+        duplicate_threshold: float = 0.01,
+        decode_workers: int = 1,
+        frame_cache: bool = False,
+        target_long_side: int = 0,
+        target_width: int = 0,
+        target_height: int = 0,
+        crop_x: int = 0,
+        crop_y: int = 0,
+        crop_width: int = 0,
+        crop_height: int = 0,
+        decoder: str = "auto"
+    ) -> Tuple[Optional[torch.Tensor], int, Optional[torch.Tensor]]:
         """
         加载并抽取帧
         
@@ -325,40 +282,75 @@ class Extract_Video_Frames_UTK:
             target_frames: 目标帧数
             mode: 抽取模式
             images: 可选的图片序列输入
+            uint8_output: 是否改为从 images_u8 输出 uint8 张量
+            duplicate_threshold: content_aware 模式的近似重复阈值
+            decode_workers: 并行解码线程数，0 表示使用全部 CPU 核心
+            frame_cache: 是否使用磁盘帧缓存
+            target_long_side / target_width / target_height: 解码后立即缩放（仅对视频生效）
+            crop_x / crop_y / crop_width / crop_height: 解码后立即裁剪（仅对视频生效）
+            decoder: 解码后端，auto 按容器和编码自动选择
             
         Returns:
-            抽取的帧批次张量
+            (images, frames_count, images_u8)，uint8_output 时帧批次在 images_u8 中，否则在 images 中
         """
         # 优先使用图片序列输入
         if images is not None:
             total_frames = len(images)
             print(f"📸 从图片序列中抽取帧: 总帧数={total_frames}, 目标帧数={target_frames}, 模式={mode}")
             
-            indices = self.calculate_frame_indices(total_frames, target_frames, mode)
-            print(f"📊 计算得到的帧索引: {indices}")
+            if mode == "content_aware":
+                with span("analyze"):
+                    thumbs = tensor_thumbnails(images)
+                indices = plan_content_aware_indices(
+                    np.arange(total_frames), thumbs, target_frames, duplicate_threshold
+                )
+            else:
+                indices = self.calculate_frame_indices(total_frames, target_frames, mode)
+            print(f"📊 计算得到的帧索引: {_format_indices(indices)}")
             
             # 按照indices的顺序提取帧（保持计算出的顺序）
             frame_tensors = self.load_image_sequence_frames(images, indices)
+            if uint8_output:
+                frame_tensors = tensor2uint8(frame_tensors)
             
         elif video_path and video_path.strip():
             # 使用视频文件
-            video_path = video_path.strip().strip('"').strip("'")
-            
-            # 先获取视频总帧数
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise RuntimeError(f"无法打开视频文件: {video_path}")
+            video_path = normalize_video_path(video_path)
             
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            cap.release()
+            # 帧数、帧率和关键帧来自持久化的视频索引，同一文件只扫描一次
+            with span("probe"):
+                video_index = get_video_index(video_path)
+            total_frames = video_index.frame_count
+            fps = video_index.fps
             
             print(f"🎬 从视频中抽取帧: 文件={video_path}, 总帧数={total_frames}, FPS={fps:.2f}, 目标帧数={target_frames}, 模式={mode}")
             
-            indices = self.calculate_frame_indices(total_frames, target_frames, mode)
-            print(f"📊 计算得到的帧索引: {indices}")
+            workers = decode_workers if decode_workers > 0 else (os.cpu_count() or 1)
+            crop = (crop_x, crop_y, crop_width, crop_height)
+            if mode == "content_aware":
+                # 预扫描缩略图得到画面变化量，再按变化量分配帧数
+                with span("analyze"):
+                    probe_frames, thumbs = probe_thumbnails(
+                        video_path,
+                        total_frames,
+                        max_probes=content_aware_probe_count(total_frames, target_frames),
+                        workers=workers,
+                        keyframes=video_index.keyframes,
+                        crop=crop,
+                        decoder=decoder,
+                    )
+                indices = plan_content_aware_indices(
+                    probe_frames, thumbs, target_frames, duplicate_threshold, total_frames=total_frames
+                )
+                print(f"🔍 内容分析: 探测 {len(probe_frames)} 帧, 保留 {len(indices)} 帧")
+            else:
+                indices = self.calculate_frame_indices(total_frames, target_frames, mode)
+            print(f"📊 计算得到的帧索引: {_format_indices(indices)}")
             
-            frame_tensors = self.load_video_frames(video_path, indices)
+            transform = FrameTransform(target_width, target_height, target_long_side, crop)
+            frame_tensors = self.load_video_frames(
+                video_path, indices, uint8_output, video_index.keyframes, workers, frame_cache, transform, decoder
+            )
             
         else:
             raise ValueError("必须提供视频路径或图片序列输入")
@@ -366,13 +358,14 @@ class Extract_Video_Frames_UTK:
         if len(frame_tensors) == 0:
             raise RuntimeError("未能加载任何帧")
         
-        # 将所有帧堆叠成批次
-        batch_tensor = torch.stack(frame_tensors, dim=0)
+        batch_tensor = frame_tensors
         frames_count = len(frame_tensors)
         
         print(f"✅ 成功加载 {frames_count} 帧，输出形状: {batch_tensor.shape}")
         
-        return (batch_tensor, frames_count)
+        if uint8_output:
+            return (None, frames_count, batch_tensor)
+        return (batch_tensor, frames_count, None)
 
 
 # 节点映射
@@ -10,12 +10,13 @@ Lora Info Node
 
 import folder_paths
 import hashlib
-import requests
 import json
 import server
 from aiohttp import web
 import os
 
+from ..file_fingerprint import file_fingerprint
+
 
 db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lora_info_db.json')
 
@@ -40,6 +41,8 @@ def save_dict_to_json(data_dict, file_path):
         print(f"Error saving JSON to file: {e}")
 
 def get_model_version_info(hash_value):
+    import requests
+
     api_url = f"https://civitai.com/api/v1/model-versions/by-hash/{hash_value}"
     try:
         response = requests.get(api_url, timeout=10)  # 设置10秒超时
@@ -270,6 +273,12 @@ class LoraInfo_UTK:
     OUTPUT_NODE = True
     CATEGORY = "UniversalToolkit/Tools"
 
+    @classmethod
+    def IS_CHANGED(cls, lora_name, **kwargs):
+        # LoRA 文件被替换后重新计算哈希并查询
+        lora_path = folder_paths.get_full_path("loras", lora_name)
+        return file_fingerprint(lora_path) if lora_path else ""
+
     def lora_info(self, lora_name):
         try:
             (output, triggerWords, examplePrompt, baseModel, metaInfo) = get_lora_info(lora_name)
@@ -0,0 +1,415 @@
+"""
+Node Profiling for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Opt-in per-node execution instrumentation. When ``UTK_PROFILE=1`` is set the
+``FUNCTION`` method of every registered node is wrapped and each call records
+wall time, CPU time, peak RSS growth, input/output tensor bytes and batch size.
+
+Peak RSS growth is the highest RSS seen during the call minus the RSS at its
+start. On Linux the kernel's high-water mark (``VmHWM``) is reset through
+``/proc/self/clear_refs`` before every call; where that is not allowed a
+background thread samples RSS every millisecond (``/proc/self/statm`` or
+``psutil``). Without either, the record says ``"unavailable"`` rather than 0.
+
+Heavy nodes add named sub-spans (decode / convert / resize / encode) with
+``span()``, which is a no-op while profiling is disabled.
+
+Records are kept in a ring buffer and served from ``/profile_utk`` (JSON) and
+``/profile_utk/trace`` (Chrome trace, open in chrome://tracing or Perfetto).
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+from .logging_utils import log
+
+_ENABLED = os.environ.get("UTK_PROFILE", "0") == "1"
+_BUFFER_SIZE = int(os.environ.get("UTK_PROFILE_BUFFER", "1000"))
+
+_records = collections.deque(maxlen=_BUFFER_SIZE)
+_records_lock = threading.Lock()
+_local = threading.local()
+_routes_registered = False
+
+
+def is_enabled():
+    return _ENABLED
+
+
+def _read_proc_bytes(path, field=None, index=1):
+    """读取 /proc/self 下的内存数值（字节）；不可用时返回 None"""
+    try:
+        with open(path, "r") as f:
+            if field is None:
+                return int(f.read().split()[index]) * os.sysconf("SC_PAGE_SIZE")
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return None
+
+
+def _rss_bytes():
+    """当前进程的 RSS（字节）；既没有 /proc 也没有 psutil 时返回 None"""
+    rss = _read_proc_bytes("/proc/self/statm")
+    if rss is not None:
+        return rss
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class _HighWaterMeter:
+    """Linux：通过 clear_refs 把 VmHWM 重置为当前 RSS，之后 VmHWM 即为重置以来的峰值"""
+
+    source = "hwm"
+
+    @staticmethod
+    def reset():
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+
+    def start(self):
+        self.reset()
+
+    def peak(self):
+        return _read_proc_bytes("/proc/self/status", "VmHWM:")
+
+    def stop(self):
+        pass
+
+
+class _SampledMeter:
+    """无法重置 VmHWM 时，节点执行期间由后台线程每毫秒采样一次 RSS"""
+
+    source = "sampled"
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self._peak = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # 先清除再检查 _active，之后到来的 start() 会重新置位，不会丢失唤醒
+            self._wake.clear()
+            while self._active:
+                rss = _rss_bytes() or 0
+                if rss > self._peak:
+                    self._peak = rss
+                time.sleep(self.interval)
+
+    def start(self):
+        with self._lock:
+            self._peak = _rss_bytes() or 0
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="utk-rss-sampler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def peak(self):
+        return max(self._peak, _rss_bytes() or 0)
+
+    def stop(self):
+        with self._lock:
+            self._active -= 1
+
+
+_meter = None
+_meter_checked = False
+
+
+def _memory_meter():
+    """选择峰值内存的测量方式（只检测一次）；都不可用时返回 None"""
+    global _meter, _meter_checked
+    if not _meter_checked:
+        _meter_checked = True
+        try:
+            _HighWaterMeter.reset()
+            if _HighWaterMeter().peak() is not None:
+                _meter = _HighWaterMeter()
+        except OSError:
+            pass
+        if _meter is None and _rss_bytes() is not None:
+            _meter = _SampledMeter()
+    return _meter
+
+
+def _tensor_stats(value, stats=None):
+    """统计嵌套结构中张量的总字节数，并以第一个张量的第 0 维作为批次大小"""
+    if stats is None:
+        stats = {"bytes": 0, "batch": None}
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        stats["bytes"] += value.element_size() * value.nelement()
+        if stats["batch"] is None and value.dim() > 0:
+            stats["batch"] = int(value.shape[0])
+    elif isinstance(value, dict):
+        for item in value.values():
+            _tensor_stats(item, stats)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _tensor_stats(item, stats)
+    return stats
+
+
+class _Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start": self.start,
+            "wall_ms": (self.end - self.start) * 1000 if self.end else None,
+            "spans": [
+                child.to_dict() if isinstance(child, _Span) else child
+                for child in self.children
+            ],
+        }
+
+
+class span:
+    """记录节点内部的命名子阶段，未启用分析或不在节点调用中时不做任何事"""
+
+    __slots__ = ("name", "_span")
+
+    def __init__(self, name):
+        self.name = name
+        self._span = None
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack:
+            self._span = _Span(self.name)
+            stack[-1].children.append(self._span)
+            stack.append(self._span)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.end = time.perf_counter()
+            _local.stack.pop()
+        return False
+
+
+def _record_call(node_name, function, args, kwargs):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    root = _Span(node_name)
+    stack.append(root)
+    inputs = _tensor_stats((args, kwargs))
+    # 外层节点调用的内存峰值；嵌套调用重置峰值前先把外层到目前为止的峰值记下
+    calls = getattr(_local, "calls", None)
+    if calls is None:
+        calls = _local.calls = []
+    meter = _memory_meter()
+    if meter is not None:
+        if calls:
+            calls[-1]["peak"] = max(calls[-1]["peak"], meter.peak() or 0)
+        call = {"rss": _rss_bytes() or 0, "peak": 0}
+        calls.append(call)
+        meter.start()
+    cpu_start = time.process_time()
+    error = None
+    result = None
+    try:
+        result = function(*args, **kwargs)
+        return result
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.end = time.perf_counter()
+        cpu_ms = (time.process_time() - cpu_start) * 1000
+        peak_delta = None
+        if meter is not None:
+            calls.pop()
+            peak = max(call["peak"], meter.peak() or 0)
+            meter.stop()
+            peak_delta = max(peak - call["rss"], 0)
+            if calls:
+                calls[-1]["peak"] = max(calls[-1]["peak"], peak)
+        stack.pop()
+        outputs = _tensor_stats(result)
+        record = root.to_dict()
+        record.update(
+            {
+                "node": node_name,
+                "thread": threading.get_ident(),
+                "cpu_ms": cpu_ms,
+                "peak_rss_delta_bytes": peak_delta,
+                "memory_source": meter.source if meter is not None else "unavailable",
+                "input_bytes": inputs["bytes"],
+                "output_bytes": outputs["bytes"],
+                "batch_size": inputs["batch"] if inputs["batch"] is not None else outputs["batch"],
+                "error": error,
+            }
+        )
+        # 嵌套调用（例如批处理执行器调用其他节点）只保留在父记录中
+        if stack:
+            stack[-1].children.append(record)
+        else:
+            with _records_lock:
+                _records.append(record)
+
+
+def instrument_node_class(node_name, node_class):
+    """包装节点类的 FUNCTION 方法，重复调用是安全的"""
+    function_name = getattr(node_class, "FUNCTION", None)
+    function = getattr(node_class, function_name, None) if function_name else None
+    if function is None or getattr(function, "_utk_profiled", False):
+        return node_class
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return _record_call(node_name, function, args, kwargs)
+
+    wrapper._utk_profiled = True
+    setattr(node_class, function_name, wrapper)
+    return node_class
+
+
+def install_profiling(node_class_mappings):
+    """为所有已注册节点安装分析包装并注册 HTTP 路由"""
+    for node_name, node_class in node_class_mappings.items():
+        instrument_node_class(node_name, node_class)
+    _register_routes()
+    log(
+        f"UniversalToolkit profiling enabled for {len(node_class_mappings)} nodes "
+        f"(ring buffer {_BUFFER_SIZE}).",
+        message_type="finish",
+    )
+
+
+def get_records(limit=None, node=None):
+    with _records_lock:
+        records = list(_records)
+    if node:
+        records = [record for record in records if record["node"] == node]
+    if limit:
+        records = records[-limit:]
+    return records
+
+
+def clear_records():
+    with _records_lock:
+        _records.clear()
+
+
+def summarize(records=None):
+    """按节点汇总调用次数、总耗时和最大耗时"""
+    summary = {}
+    for record in records if records is not None else get_records():
+        item = summary.setdefault(
+            record["node"], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "cpu_ms": 0.0}
+        )
+        item["calls"] += 1
+        item["total_ms"] += record["wall_ms"] or 0.0
+        item["max_ms"] = max(item["max_ms"], record["wall_ms"] or 0.0)
+        item["cpu_ms"] += record["cpu_ms"]
+    return dict(sorted(summary.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))
+
+
+def _trace_events(span_dict, pid, tid, args=None):
+    events = [
+        {
+            "name": span_dict["name"],
+            "cat": "node" if args is not None else "span",
+            "ph": "X",
+            "ts": span_dict["start"] * 1e6,
+            "dur": (span_dict["wall_ms"] or 0.0) * 1000,
+            "pid": pid,
+            "tid": tid,
+            "args": args or {},
+        }
+    ]
+    for child in span_dict["spans"]:
+        # 嵌套的节点调用带有自己的统计字段
+        child_args = {k: v for k, v in child.items() if k not in ("name", "start", "wall_ms", "spans")}
+        events.extend(_trace_events(child, pid, tid, child_args or None))
+    return events
+
+
+def chrome_trace(records=None):
+    """生成 Chrome Trace Event 格式（complete 事件）"""
+    pid = os.getpid()
+    events = []
+    for record in records if records is not None else get_records():
+        args = {
+            key: record[key]
+            for key in (
+                "cpu_ms",
+                "peak_rss_delta_bytes",
+                "memory_source",
+                "input_bytes",
+                "output_bytes",
+                "batch_size",
+                "error",
+            )
+        }
+        events.extend(_trace_events(record, pid, record["thread"], args))
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path, records=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(records), f)
+    return path
+
+
+def _register_routes():
+    global _routes_registered
+    if _routes_registered:
+        return
+    try:
+        import server
+        from aiohttp import web
+    except ImportError:
+        return
+
+    routes = server.PromptServer.instance.routes
+
+    @routes.get("/profile_utk")
+    async def get_profile(request):
+        limit = request.query.get("limit")
+        try:
+            limit = int(limit) if limit else None
+            if limit is not None and limit < 0:
+                raise ValueError(limit)
+        except ValueError:
+            return web.json_response({"error": "limit 必须是非负整数"}, status=400)
+        records = get_records(limit, request.query.get("node"))
+        return web.json_response({"summary": summarize(records), "records": records})
+
+    @routes.get("/profile_utk/trace")
+    async def get_profile_trace(request):
+        return web.json_response(chrome_trace())
+
+    @routes.post("/profile_utk/clear")
+    async def post_profile_clear(request):
+        clear_records()
+        return web.json_response({"cleared": True})
+
+    _routes_registered = True
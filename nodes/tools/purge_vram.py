@@ -12,8 +12,10 @@ import gc
 
 import torch
 
+from ..audio_utils import clear_pcm_cache
 from .any_type import AnyType
 from .logging_utils import log
+from .result_cache import clear as clear_result_cache
 
 # 创建 AnyType 实例
 any = AnyType("*")
@@ -46,6 +48,13 @@ class PurgeVRAM_UTK:
     OUTPUT_NODE = True
 
     def purge_vram(self, anything, purge_cache, purge_models):
+        if purge_cache:
+            freed = clear_result_cache()
+            if freed:
+                log(f"Result cache cleared ({freed / 1048576:.1f} MB)")
+            freed = clear_pcm_cache()
+            if freed:
+                log(f"Audio PCM cache cleared ({freed / 1048576:.1f} MB)")
         clear_memory()
         if purge_models:
             try:
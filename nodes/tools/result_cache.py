@@ -0,0 +1,350 @@
+"""
+Node Result Cache for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Opt-in memoization of deterministic nodes. When ``UTK_CACHE=1`` is set the
+``FUNCTION`` method of the nodes in ``CACHEABLE_NODES`` is wrapped and results
+are looked up by content: every tensor argument is reduced to a fingerprint
+(a BLAKE2b hash of its whole buffer plus shape, dtype and device) and
+combined with the remaining parameters into the key. A workflow re-queued with
+only the prompt changed therefore reuses color matching, blurs, mask
+separation and resizes even though ComfyUI hands over fresh tensor objects.
+
+Entries live in an LRU bounded by ``UTK_CACHE_BYTES``. With ``UTK_CACHE_DIR``
+set, evicted entries are spilled to disk (bounded by ``UTK_CACHE_DISK_BYTES``)
+and promoted back on the next hit. Spilled entries hold only tensors and
+plain Python values and are read back with ``torch.load(weights_only=True)``,
+so a foreign file in the spill directory cannot run code. ``PurgeVRAM_UTK``
+clears both tiers.
+
+The cache owns its tensors: results are cloned when stored and again on every
+hit, so a downstream node that edits its input in place cannot change what
+the next hit returns.
+
+Every byte is hashed, so a brush stroke on one mask frame changes the key.
+Buffers larger than ``HASH_BLOCK`` are hashed in blocks on a thread pool
+(``hashlib`` releases the GIL) and the block digests are hashed together.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import collections
+import functools
+import hashlib
+import os
+import threading
+
+from .logging_utils import log
+
+_ENABLED = os.environ.get("UTK_CACHE", "0") == "1"
+_MAX_BYTES = int(os.environ.get("UTK_CACHE_BYTES", str(4 << 30)))
+_SPILL_DIR = os.environ.get("UTK_CACHE_DIR", "")
+_MAX_DISK_BYTES = int(os.environ.get("UTK_CACHE_DISK_BYTES", str(20 << 30)))
+
+# 大张量按块并行哈希，每块的字节数
+HASH_BLOCK = 64 << 20
+
+# 输出只取决于输入的节点；读取文件、调用 API 或带随机数的节点不在其中
+CACHEABLE_NODES = (
+    "ColorMatch_UTK",
+    "DepthMapBlur_UTK",
+    "SeparateMasks_UTK",
+    "ImageScaleByAspectRatio_UTK",
+    "ImageMaskScaleAs_UTK",
+    "ImageScaleRestore_UTK",
+    "ResizeImageVerKJ_UTK",
+    "ImageBlendAdvance_UTK",
+    "ImageCropByMaskAndResize_UTK",
+    "CropByMask_UTK",
+    "RestoreCropBox_UTK",
+    "ImitationHueNode_UTK",
+    "FillMaskedArea_UTK",
+    "ImagePadForOutpaintMasked_UTK",
+    "ImageRemoveAlpha_UTK",
+    "ImageCombineAlpha_UTK",
+    "ImageConcatenate_UTK",
+    "ColorToMask_UTK",
+    "BlockifyMask_UTK",
+    "ImageBatchExtendWithOverlap_UTK",
+)
+
+
+class _Uncacheable(Exception):
+    """参数中含有无法稳定哈希的对象（模型、回调等）"""
+
+
+def is_enabled():
+    return _ENABLED
+
+
+def _hash_block(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def tensor_fingerprint(tensor):
+    """对张量的全部字节做哈希，连同形状、类型、设备一起返回"""
+    import torch
+
+    data = tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+    digest = hashlib.blake2b(digest_size=16)
+    if data.nbytes > HASH_BLOCK and (os.cpu_count() or 1) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        blocks = [data[start : start + HASH_BLOCK] for start in range(0, data.nbytes, HASH_BLOCK)]
+        with ThreadPoolExecutor(max_workers=min(len(blocks), os.cpu_count())) as pool:
+            for block_digest in pool.map(_hash_block, blocks):
+                digest.update(block_digest)
+    else:
+        digest.update(data)
+    return ("tensor", tuple(tensor.shape), str(tensor.dtype), str(tensor.device), digest.hexdigest())
+
+
+def _freeze(value):
+    """把节点参数转换为可哈希的结构，张量替换为指纹"""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return tensor_fingerprint(value)
+    if hasattr(value, "dtype") and hasattr(value, "tobytes"):  # numpy
+        digest = hashlib.blake2b(value.tobytes(), digest_size=16).hexdigest()
+        return ("ndarray", tuple(value.shape), str(value.dtype), digest)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    raise _Uncacheable(type(value).__name__)
+
+
+def make_key(node_name, args, kwargs):
+    frozen = (node_name, _freeze(list(args)), _freeze(kwargs))
+    return hashlib.blake2b(repr(frozen).encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _result_bytes(value):
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return value.element_size() * value.nelement()
+    if isinstance(value, dict):
+        return sum(_result_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_result_bytes(item) for item in value)
+    return 0
+
+
+def _is_plain(value):
+    """只含张量、基本类型和 list/tuple/dict 的结果才写入磁盘（weights_only 可以读回）"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+    if hasattr(value, "element_size") and hasattr(value, "clone"):
+        return type(value).__name__ == "Tensor"
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _is_plain(item) for key, item in value.items())
+    if type(value) in (list, tuple):
+        return all(_is_plain(item) for item in value)
+    return False
+
+
+def _copy_result(value):
+    """复制返回值中的张量，容器结构不变；其他对象原样保留"""
+    if hasattr(value, "element_size") and hasattr(value, "clone"):
+        return value.clone()
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy_result(item) for item in value)
+    return value
+
+
+class ResultCache:
+    """按字节预算淘汰的 LRU；可选把淘汰的条目写入磁盘。存取时都复制张量"""
+
+    def __init__(self, max_bytes=_MAX_BYTES, spill_dir=_SPILL_DIR, max_disk_bytes=_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = collections.OrderedDict()  # key -> (result, nbytes)
+        self._disk = collections.OrderedDict()  # key -> nbytes
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = collections.defaultdict(lambda: {"hits": 0, "disk_hits": 0, "misses": 0, "skipped": 0})
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.pt")
+
+    def _spill(self, key, result, nbytes):
+        import torch
+
+        if nbytes > self.max_disk_bytes or not _is_plain(result):
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            torch.save(result, self._spill_path(key))
+        except Exception as e:
+            log(f"Result cache spill failed: {e}", message_type="warning")
+            return
+        self._disk[key] = nbytes
+        self._disk_bytes += nbytes
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            old_key, old_bytes = self._disk.popitem(last=False)
+            self._disk_bytes -= old_bytes
+            self._remove_file(old_key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._spill_path(key))
+        except OSError:
+            pass
+
+    def _load_spilled(self, key):
+        import torch
+
+        nbytes = self._disk.pop(key)
+        self._disk_bytes -= nbytes
+        try:
+            result = torch.load(self._spill_path(key), weights_only=True)
+        except Exception:
+            result = None
+        self._remove_file(key)
+        return result
+
+    def get(self, node_name, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counters[node_name]["hits"] += 1
+                return True, _copy_result(entry[0])
+            if key in self._disk:
+                result = self._load_spilled(key)
+                if result is not None:
+                    self.counters[node_name]["disk_hits"] += 1
+                    self._insert(key, result, _result_bytes(result))
+                    return True, _copy_result(result)
+            self.counters[node_name]["misses"] += 1
+            return False, None
+
+    def put(self, key, result):
+        nbytes = _result_bytes(result)
+        if nbytes > self.max_bytes:
+            return False
+        result = _copy_result(result)
+        with self._lock:
+            self._insert(key, result, nbytes)
+        return True
+
+    def _insert(self, key, result, nbytes):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (result, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, (old_result, old_bytes) = self._entries.popitem(last=False)
+            self._bytes -= old_bytes
+            if self.spill_dir:
+                self._spill(old_key, old_result, old_bytes)
+
+    def count_skipped(self, node_name):
+        with self._lock:
+            self.counters[node_name]["skipped"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for key in list(self._disk):
+                self._remove_file(key)
+            self._disk.clear()
+            self._bytes = 0
+            self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "nodes": {name: dict(counter) for name, counter in self.counters.items()},
+            }
+
+
+_cache = ResultCache()
+_routes_registered = False
+
+
+def get_cache():
+    return _cache
+
+
+def clear():
+    """清空结果缓存（内存与磁盘），返回释放的内存字节数"""
+    freed = _cache.stats()["bytes"]
+    _cache.clear()
+    return freed
+
+
+def cache_node_class(node_name, node_class, cache=None):
+    """包装节点类的 FUNCTION 方法，按内容缓存返回值，重复调用是安全的"""
+    function_name = getattr(node_class, "FUNCTION", None)
+    function = getattr(node_class, function_name, None) if function_name else None
+    if function is None or getattr(function, "_utk_cached", False):
+        return node_class
+
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        target = cache if cache is not None else _cache
+        try:
+            key = make_key(node_name, args, kwargs)
+        except _Uncacheable:
+            target.count_skipped(node_name)
+            return function(self, *args, **kwargs)
+        found, result = target.get(node_name, key)
+        if found:
+            return result
+        result = function(self, *args, **kwargs)
+        target.put(key, result)
+        return result
+
+    wrapper._utk_cached = True
+    setattr(node_class, function_name, wrapper)
+    return node_class
+
+
+def install_result_cache(node_class_mappings, node_names=None):
+    """为可缓存节点安装结果缓存并注册 HTTP 路由"""
+    names = [name for name in (node_names or CACHEABLE_NODES) if name in node_class_mappings]
+    for node_name in names:
+        cache_node_class(node_name, node_class_mappings[node_name])
+    _register_routes()
+    log(
+        f"UniversalToolkit result cache enabled for {len(names)} nodes "
+        f"({_MAX_BYTES / 1073741824:.1f} GB"
+        + (f", spill to {_SPILL_DIR}" if _SPILL_DIR else "")
+        + ").",
+        message_type="finish",
+    )
+
+
+def _register_routes():
+    global _routes_registered
+    if _routes_registered:
+        return
+    try:
+        import server
+        from aiohttp import web
+    except ImportError:
+        return
+
+    routes = server.PromptServer.instance.routes
+
+    @routes.get("/cache_utk")
+    async def get_cache_stats(request):
+        return web.json_response(_cache.stats())
+
+    @routes.post("/cache_utk/clear")
+    async def post_cache_clear(request):
+        return web.json_response({"cleared": True, "freed_bytes": clear()})
+
+    _routes_registered = True
@@ -0,0 +1,131 @@
+"""
+Save Video Stream Node
+~~~~~~~~~~~~~~~~~~~~~~
+
+Encodes IMAGE batches to MP4 / MKV with a background encoder thread. In the
+append modes the file stays open between executions and every run adds its
+batch to the end, so long renders are saved chunk by chunk.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import os
+
+import folder_paths
+
+from ..video_writer import CODECS, CONTAINERS, VideoStreamWriter, close_stream, get_stream, start_stream
+from .logging_utils import log
+from .profiling import span
+
+WRITE_MODES = ("single", "append", "append_and_close")
+
+
+def _next_output_path(filename_prefix: str, extension: str) -> str:
+    """在 ComfyUI 输出目录下为 filename_prefix 分配下一个未使用的编号文件名"""
+    output_dir = os.path.abspath(folder_paths.get_output_directory())
+    base = os.path.abspath(os.path.join(output_dir, os.path.normpath(filename_prefix)))
+    if os.path.commonpath([output_dir, base]) != output_dir:
+        raise ValueError(f"SaveVideoStream_UTK: 不允许保存到输出目录之外: {filename_prefix}")
+    directory, name = os.path.split(base)
+    os.makedirs(directory, exist_ok=True)
+    existing = set(os.listdir(directory))
+    counter = 1
+    while f"{name}_{counter:05}.{extension}" in existing:
+        counter += 1
+    return os.path.join(directory, f"{name}_{counter:05}.{extension}")
+
+
+class SaveVideoStream_UTK:
+    CATEGORY = "UniversalToolkit/Tools"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "images": ("IMAGE",),
+                "filename_prefix": ("STRING", {
+                    "default": "UTK_video",
+                    "tooltip": "相对 ComfyUI 输出目录的文件名前缀，可包含子目录；文件名自动加编号"
+                }),
+                "fps": ("FLOAT", {"default": 24.0, "min": 0.01, "max": 1000.0, "step": 0.01}),
+                "container": (list(CONTAINERS), {"default": "mp4"}),
+                "codec": (list(CODECS), {
+                    "default": "mp4v",
+                    "tooltip": "OpenCV 编码器 FourCC；avc1 需要 OpenCV 带 H.264 编码支持，FFV1 为无损编码（建议用 mkv）"
+                }),
+                "write_mode": (list(WRITE_MODES), {
+                    "default": "single",
+                    "tooltip": "single：每次执行写一个完整文件；append：保持文件打开，之后的执行继续追加；append_and_close：追加本批后关闭文件"
+                }),
+                "queue_frames": ("INT", {
+                    "default": 16,
+                    "min": 1,
+                    "max": 1024,
+                    "step": 1,
+                    "tooltip": "等待编码的已转换帧数上限，决定写入时的额外内存"
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("STRING", "INT")
+    RETURN_NAMES = ("video_path", "frames_written")
+    FUNCTION = "save_video"
+    OUTPUT_NODE = True
+
+    @classmethod
+    def IS_CHANGED(cls, write_mode="single", **kwargs):
+        # 追加模式的结果取决于已打开的文件，每次都要执行
+        return float("nan") if write_mode != "single" else ""
+
+    def save_video(self, images, filename_prefix, fps, container, codec, write_mode, queue_frames):
+        key = f"{filename_prefix}.{container}"
+        stream = get_stream(key) if write_mode != "single" else None
+        if stream is not None and (stream.fps != float(fps) or stream.codec != codec):
+            log(
+                f"SaveVideoStream_UTK: {stream.path} is already open at {stream.fps} fps / {stream.codec}, "
+                "fps and codec changes are ignored until it is closed",
+                message_type="warning",
+            )
+        if stream is None:
+            path = _next_output_path(filename_prefix, container)
+            if write_mode == "single":
+                stream = VideoStreamWriter(path, fps, codec, queue_frames)
+            else:
+                stream = start_stream(key, path, fps, codec, queue_frames)
+
+        try:
+            with span("encode"):
+                # 转换在当前线程进行，编码在后台线程进行；append 模式下本次执行不等待编码完成
+                stream.write(images)
+        except BaseException:
+            # 写入失败时关闭写入器；追加模式下同时注销，下一次执行重新开始一个文件
+            try:
+                if write_mode == "single":
+                    stream.close()
+                else:
+                    close_stream(key)
+            except Exception as e:
+                log(
+                    f"SaveVideoStream_UTK: failed to close {stream.path} after a write error: {e}",
+                    message_type="warning",
+                )
+            raise
+        path = stream.path
+        if write_mode == "append":
+            frames = stream.frames_queued
+            log(f"SaveVideoStream_UTK: appended {images.shape[0]} frames to {path} ({frames} total)")
+        else:
+            with span("encode"):
+                frames = stream.close() if write_mode == "single" else close_stream(key)
+            log(f"SaveVideoStream_UTK: wrote {frames} frames to {path}", message_type="finish")
+        return (path, frames)
+
+
+NODE_CLASS_MAPPINGS = {
+    "SaveVideoStream_UTK": SaveVideoStream_UTK,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "SaveVideoStream_UTK": "Save Video Stream (UTK)",
+}
@@ -9,7 +9,6 @@ A comprehensive text translation node supporting multiple free and paid translat
 """
 
 import json
-import requests
 import time
 from typing import Dict, List, Optional, Tuple
 import hashlib
@@ -40,6 +39,8 @@ class GLM4FlashProvider(TranslationProvider):
         self.base_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to GLM-4 Flash API...")
             
@@ -152,6 +153,8 @@ class SiliconFlowProvider(TranslationProvider):
         self.base_url = "https://api.siliconflow.cn/v1/chat/completions"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to Silicon Flow API...")
             
@@ -264,6 +267,8 @@ class BaiduTranslateProvider(TranslationProvider):
         self.base_url = "https://fanyi-api.baidu.com/api/trans/vip/translate"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to Baidu Translate API...")
             
@@ -294,10 +299,6 @@ class BaiduTranslateProvider(TranslationProvider):
                 return False, f"Baidu Translate requires API key. Get it at: {self.api_key_url}"
             
             # Generate salt and sign for Baidu API
-            import time
-            import hashlib
-            import random
-            
             # For demo purposes, use a simple approach
             # In real usage, user should provide both appid and secret_key
             appid = api_key
@@ -344,6 +345,8 @@ class YoudaoTranslateProvider(TranslationProvider):
         self.base_url = "https://openapi.youdao.com/api"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to Youdao Translate API...")
             
@@ -374,10 +377,6 @@ class YoudaoTranslateProvider(TranslationProvider):
                 return False, f"Youdao Translate requires API key. Get it at: {self.api_key_url}"
             
             # Generate salt and sign for Youdao API
-            import time
-            import hashlib
-            import random
-            
             # For demo purposes, use a simple approach
             # In real usage, user should provide both app_key and app_secret
             app_key = api_key
@@ -425,6 +424,8 @@ class MicrosoftTranslateProvider(TranslationProvider):
         self.base_url = "https://api.cognitive.microsofttranslator.com/translate"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to Microsoft Translator API...")
             
@@ -497,6 +498,8 @@ class GoogleTranslateProvider(TranslationProvider):
         self.backup_url = "https://clients5.google.com/translate_a/single"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to Google Translate API...")
             params = {
@@ -559,6 +562,8 @@ class BingTranslateProvider(TranslationProvider):
         self.base_url = "https://api.cognitive.microsofttranslator.com/translate"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         try:
             print(f"    🔗 Connecting to Bing Translator API...")
             
@@ -617,6 +622,8 @@ class DeepLProvider(TranslationProvider):
         self.base_url = "https://api-free.deepl.com/v2/translate"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         if not api_key:
             print(f"    ❌ DeepL requires API key but none provided")
             return False, f"DeepL requires API key. Get it at: {self.api_key_url}"
@@ -659,6 +666,8 @@ class AzureTranslatorProvider(TranslationProvider):
         self.base_url = "https://api.cognitive.microsofttranslator.com/translate"
     
     def translate(self, text: str, target_lang: str, source_lang: str = "auto", api_key: str = None) -> Tuple[bool, str]:
+        import requests
+
         if not api_key:
             print(f"    ❌ Azure Translator requires API key but none provided")
             return False, f"Azure Translator requires API key. Get it at: {self.api_key_url}"
@@ -0,0 +1,1316 @@
+"""
+Video Decoding for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Frame-accurate decoding of a sparse set of frame indices with OpenCV.
+
+Seeking with ``CAP_PROP_POS_FRAMES`` jumps to the previous keyframe and
+decodes forward to the target, so on long-GOP H.264/H.265 a seek per sampled
+frame costs up to a whole GOP each time. ``read_frames`` instead walks the
+sorted indices once: small gaps are skipped with ``grab()`` (demux + decode,
+no colour conversion) and ``retrieve()`` is only called for wanted frames.
+A seek is issued only when the gap is large enough that decoding through it
+would cost more than a seek; both costs are measured while decoding, so the
+decision adapts to the codec and GOP length of the clip. When the keyframe
+positions are known from the video index, a seek is never issued unless a
+keyframe lies between the current position and the target, since the decoder
+would otherwise restart from a keyframe behind the current position.
+
+OpenCV turns ``CAP_PROP_POS_FRAMES`` into a timestamp using the container's
+average frame rate, which only matches the frame count on constant-frame-rate
+streams whose reported rate is exact. The index therefore keeps the measured
+frame timing (and, for variable-frame-rate streams, the presentation
+timestamp of every frame); ``read_frames`` seeks by time, reads back the
+timestamp of the frame it landed on and grabs forward by count, retrying from
+the indexed keyframe before the target if the seek overshot.
+
+``get_video_index`` records the true frame count, fps, resolution, keyframe
+positions and frame timing of a file with one demux-only pass (no decoding)
+and persists them as a small JSON sidecar keyed by path, size and mtime, so repeated
+extractions from the same clips skip the metadata probe entirely.
+
+``FrameCache`` optionally keeps decoded frames on disk per (video fingerprint,
+resolution): a raw uint8 file that only grows by the frames actually decoded,
+plus a slot table mapping frame index to position in that file. Later runs
+with other sampling settings gather cached frames straight from the mapped
+file; entries are evicted oldest-first by the bytes they hold.
+
+``FrameTransform`` crops and downscales each frame in uint8 right after
+decode (``INTER_AREA``), so a 4K clip sampled for a 720p model never exists
+at 4K in float32.
+
+``decode_frames`` dispatches to a decoder backend: OpenCV ``VideoCapture``,
+PyAV with the codec's own frame/slice threading, or an ``ffmpeg`` subprocess
+that selects the target frames and pipes them as ``bgr24`` rawvideo. ``auto``
+times each installed backend once per (container, codec, constant or
+variable frame rate) on a small sample of the clip itself, rejects a backend
+whose frames differ from single-stream OpenCV, remembers the winner next to
+the video index and falls back to OpenCV when a backend is missing or fails.
+PyAV and ffmpeg position themselves with the same indexed frame timing as
+OpenCV.
+
+``plan_content_aware_indices`` spends the frame budget where the picture
+changes: a thumbnail pre-pass yields a frame-difference signal (pixel and
+histogram distance) that is sampled like a density, and near-duplicates of the
+previously kept frame are dropped.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+# 尚未测量时，假设一次跳转相当于顺序解码这么多帧
+INITIAL_SEEK_COST_FRAMES = 32.0
+
+# 已知关键帧时，关键帧至少比当前位置靠后这么多帧才考虑跳转
+KEYFRAME_SEEK_MARGIN = 8
+
+# 按时间跳转落点不对时，最多重试的次数（之后从头顺序解码）
+_SEEK_ATTEMPTS = 4
+
+# 指数滑动平均的权重
+_EMA = 0.3
+
+INDEX_VERSION = 3
+_INDEX_DIR = os.environ.get(
+    "UTK_VIDEO_INDEX_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "comfyui-universaltoolkit", "video_index"),
+)
+_index_memo = {}
+_index_lock = threading.Lock()
+
+_FRAME_CACHE_DIR = os.environ.get(
+    "UTK_FRAME_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "comfyui-universaltoolkit", "frames"),
+)
+_FRAME_CACHE_BYTES = int(os.environ.get("UTK_FRAME_CACHE_BYTES", str(50 << 30)))
+_frame_cache_lock = threading.Lock()
+
+
+# 抽取模式：每段的 (起点, 终点) 取 总帧数 * 分子 // 分母，以及该段帧数占目标帧数的比例；
+# 最后一段取剩余的帧数
+SAMPLING_MODES = {
+    "average": (((0, 1), (1, 1), 1.0),),
+    "front_heavy": (((0, 1), (1, 2), 0.6), ((1, 2), (1, 1), None)),
+    "back_heavy": (((0, 1), (1, 2), 0.4), ((1, 2), (1, 1), None)),
+    "middle_heavy": (((0, 1), (1, 4), 0.2), ((1, 4), (3, 4), 0.6), ((3, 4), (1, 1), None)),
+    "ends_heavy": (((0, 1), (1, 3), 0.4), ((1, 3), (2, 3), 0.2), ((2, 3), (1, 1), None)),
+}
+
+
+def plan_frame_indices(total_frames: int, target_frames: int, mode: str = "average"):
+    """
+    按抽取模式一次性计算 target_frames 个升序且不重复的帧索引（numpy int64 数组）。
+
+    每种模式是分段常数的采样密度，索引由其分段线性的逆累积分布在等间隔分位点上取整得到，
+    与逐段 int(i * step) 的结果一致。取整后发生重复时按名次去重：第 i 个索引至少比前一个大 1，
+    且不超过 total_frames - target_frames + i，因此无需补帧循环，耗时与帧数成线性。
+    """
+    import numpy as np
+
+    if total_frames <= 0 or target_frames <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if target_frames >= total_frames:
+        return np.arange(total_frames, dtype=np.int64)
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"未知的抽取模式: {mode}")
+
+    starts, steps, counts = [], [], []
+    remaining = target_frames
+    for (start_num, start_den), (end_num, end_den), share in SAMPLING_MODES[mode]:
+        count = remaining if share is None else int(target_frames * share)
+        remaining -= count
+        start = total_frames * start_num // start_den
+        end = total_frames * end_num // end_den
+        if count > 0:
+            starts.append(start)
+            steps.append((end - start) / count)
+            counts.append(count)
+    counts = np.asarray(counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    rank_in_segment = np.arange(target_frames) - first
+    positions = np.repeat(starts, counts) + (rank_in_segment * np.repeat(steps, counts)).astype(np.int64)
+
+    rank = np.arange(target_frames)
+    indices = np.maximum.accumulate(positions - rank) + rank
+    return np.minimum(indices, total_frames - target_frames + rank).astype(np.int64)
+
+
+def normalize_video_path(video_path: str) -> str:
+    """去掉首尾空白和引号，统一路径分隔符"""
+    return video_path.strip().strip('"').strip("'").replace("\\", "/")
+
+
+def open_video(video_path: str):
+    import cv2
+
+    if not os.path.isfile(video_path):
+        raise FileNotFoundError(f"视频文件不存在: {video_path}")
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"无法打开视频文件: {video_path}")
+    return cap
+
+
+class VideoIndex:
+    """
+    视频的真实帧数、帧率、分辨率与关键帧位置（显示顺序的帧号）。
+
+    容器提供时间戳时记录第一帧的显示时间 start_time（秒，相对视频流起点）；恒定帧率的 fps 为实测值，
+    可变帧率的视频另外记录每一帧的显示时间戳（升序）。没有时间戳时 start_time 为 None。
+    """
+
+    __slots__ = (
+        "path", "size", "mtime_ns", "frame_count", "fps", "width", "height", "keyframes", "codec", "start_time",
+        "timestamps",
+    )
+
+    def __init__(
+        self, path, size, mtime_ns, frame_count, fps, width, height, keyframes, codec="", start_time=None, timestamps=()
+    ):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.frame_count = frame_count
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.keyframes = keyframes
+        self.codec = codec
+        self.start_time = start_time
+        self.timestamps = list(timestamps)
+
+    @property
+    def timed(self) -> bool:
+        """是否记录了帧时间，可以按时间跳转并由时间戳确定帧号"""
+        return self.start_time is not None and bool(self.timestamps or self.fps)
+
+    @property
+    def vfr(self) -> bool:
+        return bool(self.timestamps)
+
+    def time_of(self, index: int) -> float:
+        """第 index 帧的显示时间（秒）"""
+        if self.timestamps:
+            return self.timestamps[min(max(index, 0), len(self.timestamps) - 1)]
+        return (self.start_time or 0.0) + (index / self.fps if self.fps else 0.0)
+
+    def seek_time(self, index: int) -> float:
+        """第 index 帧与前一帧之间的中点，按时间跳转时不会因取整落到相邻帧"""
+        if index <= 0:
+            return 0.0
+        return 0.5 * (self.time_of(index - 1) + self.time_of(index))
+
+    def frame_at(self, seconds: float) -> int:
+        """显示时间最接近 seconds 的帧号（时间戳重复时取第一帧）"""
+        if not self.timestamps:
+            return int(round((seconds - (self.start_time or 0.0)) * self.fps))
+        slot = bisect.bisect_left(self.timestamps, seconds - 1e-6)
+        if slot == len(self.timestamps) or (
+            slot > 0 and seconds - self.timestamps[slot - 1] < self.timestamps[slot] - seconds
+        ):
+            slot -= 1
+        return slot
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["version"] = INDEX_VERSION
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data[name] for name in cls.__slots__))
+
+
+def _index_path(path: str) -> str:
+    digest = hashlib.blake2b(path.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(_INDEX_DIR, f"{digest}.json")
+
+
+def _frame_timing(packet_times, packet_keys):
+    """
+    由解码顺序的数据包时间戳换算显示顺序，返回 (关键帧的显示帧号, 第一帧时间, 实测帧率, 可变帧率时的时间戳)。
+    没有时间戳时关键帧保持解码顺序，第一帧时间和帧率为 None；时间戳重复的流按可变帧率处理。
+    """
+    import numpy as np
+
+    count = len(packet_times)
+    if count < 2 or len(set(packet_times)) < 2:
+        return [i for i, key in enumerate(packet_keys) if key], None, None, []
+    times = np.asarray(packet_times)
+    order = np.argsort(times, kind="stable")
+    rank = np.empty(count, dtype=np.int64)
+    rank[order] = np.arange(count)
+    keyframes = sorted(int(rank[i]) for i, key in enumerate(packet_keys) if key)
+    shown = times[order]
+    durations = np.diff(shown)
+    typical = float(np.median(durations))
+    start_time = round(float(shown[0]), 6)
+    # 任一帧间隔偏离中位数超过半帧即为可变帧率（包括掉帧和重复的时间戳）
+    if typical > 0 and np.abs(durations - typical).max() <= 0.5 * typical:
+        return keyframes, start_time, (count - 1) / float(shown[-1] - shown[0]), []
+    return keyframes, start_time, None, np.round(shown, 6).tolist()
+
+
+def scan_video_index(path: str, size: int, mtime_ns: int) -> VideoIndex:
+    """只解复用不解码地顺序扫描一遍，统计帧数、关键帧位置和帧时间戳"""
+    import cv2
+
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        raise RuntimeError(f"无法打开视频文件: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    codec = "".join(chr((fourcc >> shift) & 0xFF) for shift in (0, 8, 16, 24)).strip("\x00 ").lower()
+    has_key_flag = hasattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME")
+    packet_times = []
+    packet_keys = []
+    # 原始流模式下 POS_MSEC 是当前数据包的显示时间戳；数据包按解码顺序到达，有 B 帧时需要排序
+    while cap.grab():
+        packet_keys.append(bool(has_key_flag and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+        packet_times.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+    cap.release()
+    count = len(packet_times)
+    keyframes, start_time, measured_fps, timestamps = _frame_timing(packet_times, packet_keys)
+    if measured_fps:
+        # 容器报告的平均帧率可能有舍入误差，恒定帧率时以时间戳实测为准
+        fps = measured_fps
+    if count == 0:
+        # 原始流模式不可用时退回为容器报告的帧数
+        cap = open_video(path)
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+    return VideoIndex(path, size, mtime_ns, count, fps, width, height, keyframes, codec, start_time, timestamps)
+
+
+def get_video_index(video_path: str) -> VideoIndex:
+    """读取（必要时建立并保存）视频索引；路径、大小或修改时间变化后自动重建"""
+    path = os.path.abspath(video_path)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"视频文件不存在: {video_path}")
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _index_lock:
+        index = _index_memo.get(key)
+    if index is not None:
+        return index
+
+    sidecar = _index_path(path)
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == INDEX_VERSION and (data["path"], data["size"], data["mtime_ns"]) == key:
+            index = VideoIndex.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        index = None
+
+    if index is None:
+        index = scan_video_index(path, stat.st_size, stat.st_mtime_ns)
+        try:
+            os.makedirs(_INDEX_DIR, exist_ok=True)
+            tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index.to_dict(), f)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            print(f"警告: 无法保存视频索引 {sidecar}: {e}")
+    with _index_lock:
+        _index_memo[key] = index
+    return index
+
+
+class DecodePlanner:
+    """
+    根据测得的顺序解码耗时与跳转耗时，决定到达下一目标帧时是顺序 grab 还是跳转。
+    提供关键帧位置时，当前位置与目标之间没有关键帧则一定顺序解码。
+    """
+
+    def __init__(self, seek_cost_frames: float = INITIAL_SEEK_COST_FRAMES, keyframes: Optional[List[int]] = None):
+        self.grab_seconds = None
+        self.seek_seconds = None
+        self.seek_cost_frames = seek_cost_frames
+        self.keyframes = sorted(keyframes) if keyframes else None
+        self.seeks = 0
+        self.grabs = 0
+
+    def keyframe_before(self, target: int) -> int:
+        """target 及之前最近的关键帧；没有关键帧信息时返回 target"""
+        if not self.keyframes:
+            return target
+        slot = bisect.bisect_right(self.keyframes, target) - 1
+        return self.keyframes[slot] if slot >= 0 else 0
+
+    def should_seek(self, position: int, target: int) -> bool:
+        """position 为下一次 grab 将得到的帧，target 为目标帧"""
+        gap = target - position
+        if gap <= 1:
+            return False
+        if self.keyframes:
+            # 跳转会从 target 之前最近的关键帧开始解码；该关键帧不在前方时跳转只会重复解码
+            if self.keyframe_before(target) - position <= KEYFRAME_SEEK_MARGIN:
+                return False
+        if self.grab_seconds is None or self.seek_seconds is None:
+            return gap > self.seek_cost_frames
+        return gap * self.grab_seconds > self.seek_seconds
+
+    def record_grab(self, seconds: float):
+        self.grabs += 1
+        self.grab_seconds = seconds if self.grab_seconds is None else (
+            (1 - _EMA) * self.grab_seconds + _EMA * seconds
+        )
+
+    def record_seek(self, seconds: float):
+        self.seeks += 1
+        self.seek_seconds = seconds if self.seek_seconds is None else (
+            (1 - _EMA) * self.seek_seconds + _EMA * seconds
+        )
+
+
+def _seek_by_time(cap, target: int, planner: DecodePlanner, video_index: VideoIndex) -> int:
+    """
+    按时间跳到 target（OpenCV 从之前的关键帧解码过去），grab 一帧后由它的时间戳确定实际帧号并返回。
+    落在 target 之后或越过文件末尾（OpenCV 用平均帧率换算位置）时改跳更早的关键帧，
+    几次仍不成功则退回开头（返回 -1）。
+    """
+    import cv2
+
+    position = target
+    for _ in range(_SEEK_ATTEMPTS):
+        if position <= 0:
+            break
+        cap.set(cv2.CAP_PROP_POS_MSEC, video_index.seek_time(position) * 1000.0)
+        if cap.grab():
+            current = video_index.frame_at(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+            if current <= target:
+                return current
+            # 按落点超出的帧数再往前退
+            position -= current - target
+        position = planner.keyframe_before(position - 1)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return -1
+
+
+def read_frames(
+    cap,
+    indices: Iterable[int],
+    on_frame: Callable,
+    planner: DecodePlanner = None,
+    video_index: Optional[VideoIndex] = None,
+) -> DecodePlanner:
+    """
+    按升序解码 indices 中的帧，每解出一帧调用 on_frame(index, bgr_frame)。
+
+    video_index 记录了帧时间时按时间跳转并由时间戳校正位置，否则用 CAP_PROP_POS_FRAMES 跳转。
+    读取失败（容器帧数不准、文件截断）的帧会被跳过。返回使用的 planner，可读取跳转/顺序解码次数。
+    """
+    import cv2
+
+    planner = planner or DecodePlanner()
+    by_time = video_index is not None and video_index.timed
+    targets = sorted(set(int(i) for i in indices if i >= 0))
+    # 最近一次 grab 得到的帧
+    current = -1
+    for target in targets:
+        if planner.should_seek(current + 1, target):
+            start = time.perf_counter()
+            if by_time:
+                current = _seek_by_time(cap, target, planner, video_index)
+            else:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                current = target - 1
+            planner.record_seek(time.perf_counter() - start)
+        ok = True
+        while current < target:
+            start = time.perf_counter()
+            ok = cap.grab()
+            if not ok:
+                break
+            current += 1
+            if current < target:
+                planner.record_grab(time.perf_counter() - start)
+        if not ok:
+            break
+        ok, frame = cap.retrieve()
+        if not ok:
+            print(f"警告: 无法读取第 {target} 帧")
+            continue
+        on_frame(target, frame)
+    return planner
+
+
+def split_segments(indices: Iterable[int], workers: int, keyframes: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    把升序去重后的帧索引切成至多 workers 段连续区间。顺序解码的耗时与跨过的帧数成正比，
+    因此按帧跨度而不是索引个数均分。提供关键帧位置时分界移到之前最近的关键帧，
+    每段都从自己的关键帧开始解码，相邻两段不会重复解码同一个 GOP。
+    """
+    targets = sorted(set(int(i) for i in indices if i >= 0))
+    workers = max(1, min(workers, len(targets)))
+    if workers == 1:
+        return [targets] if targets else []
+    first, last = targets[0], targets[-1]
+    bounds = [first + (last - first + 1) * k / workers for k in range(1, workers)]
+    if keyframes:
+        keyframes = sorted(keyframes)
+        bounds = [keyframes[max(bisect.bisect_right(keyframes, bound) - 1, 0)] for bound in bounds]
+    segments = []
+    start = 0
+    for bound in bounds:
+        end = bisect.bisect_left(targets, bound, lo=start)
+        if end > start:
+            segments.append(targets[start:end])
+            start = end
+    segments.append(targets[start:])
+    return [segment for segment in segments if segment]
+
+
+def read_frames_parallel(
+    video_path: str,
+    indices: Iterable[int],
+    on_frame: Callable,
+    workers: int = 1,
+    keyframes: Optional[List[int]] = None,
+) -> List[DecodePlanner]:
+    """
+    每段帧索引由独立的 VideoCapture 在线程中解码（OpenCV 解码时释放 GIL）。
+    on_frame 会被多个线程调用，必须只写入互不重叠的位置，例如 FrameBatch。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    segments = split_segments(indices, workers, keyframes)
+    video_index = get_video_index(video_path)
+
+    def _decode(segment):
+        cap = open_video(video_path)
+        try:
+            return read_frames(cap, segment, on_frame, DecodePlanner(keyframes=keyframes), video_index)
+        finally:
+            cap.release()
+
+    if len(segments) <= 1:
+        return [_decode(segment) for segment in segments]
+    with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="utk-decode") as pool:
+        return list(pool.map(_decode, segments))
+
+
+class DecoderBackend:
+    """
+    解码后端：read() 按升序解码 indices 中的帧，每解出一帧调用 on_frame(index, bgr_frame)，
+    返回各解码流使用的 DecodePlanner（用于统计跳转/顺序解码次数）。on_frame 必须可重复调用同一帧。
+    """
+
+    name = ""
+
+    def available(self) -> bool:
+        return True
+
+    def read(
+        self,
+        video_path: str,
+        indices: Iterable[int],
+        on_frame: Callable,
+        workers: int = 1,
+        keyframes: Optional[List[int]] = None,
+    ) -> List[DecodePlanner]:
+        raise NotImplementedError
+
+
+class OpenCVBackend(DecoderBackend):
+    """OpenCV VideoCapture；多线程时每个线程打开独立句柄解码一段区间"""
+
+    name = "cv2"
+
+    def read(self, video_path, indices, on_frame, workers=1, keyframes=None):
+        return read_frames_parallel(video_path, indices, on_frame, workers, keyframes)
+
+
+class PyAVBackend(DecoderBackend):
+    """
+    PyAV（libav）解码，编解码器内部多线程（帧级 + 片级）解码。帧号按解码输出顺序计数，
+    与 OpenCV 逐帧 grab 一致；跳转后的第一帧由视频索引记录的帧时间确定位置。
+    """
+
+    name = "pyav"
+
+    def available(self) -> bool:
+        try:
+            import av  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def read(self, video_path, indices, on_frame, workers=1, keyframes=None):
+        import av
+
+        targets = sorted(set(int(i) for i in indices if i >= 0))
+        planner = DecodePlanner(keyframes=keyframes)
+        if not targets:
+            return [planner]
+        video_index = get_video_index(video_path)
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            # PyAV 在同一个解码器内多线程，不按 workers 分段；workers <= 1（节点默认值）时用 0，
+            # 由 FFmpeg 按 CPU 核心数自动决定线程数，而不是退化成单线程解码
+            stream.thread_count = int(workers) if workers > 1 else 0
+            rate = stream.average_rate or stream.guessed_rate
+            if not video_index.timed and not rate:
+                raise RuntimeError(f"无法确定视频帧率: {video_path}")
+            time_base = stream.time_base
+            start_pts = stream.start_time or 0
+
+            def _frame_index(frame, fallback):
+                if frame.pts is None:
+                    return fallback
+                seconds = float((frame.pts - start_pts) * time_base)
+                if video_index.timed:
+                    return video_index.frame_at(seconds)
+                return int(round(seconds * rate))
+
+            def _seek(position):
+                seconds = video_index.seek_time(position) if video_index.timed else (position - 0.5) / rate
+                offset = start_pts + int(max(seconds, 0.0) / time_base) if position > 0 else start_pts
+                container.seek(offset, stream=stream, backward=True)
+                return container.decode(stream)
+
+            frames = container.decode(stream)
+            slot = 0
+            # 最近解码的帧；anchor 为跳转目标，跳转后的第一帧确定位置前不为 None
+            index = -1
+            anchor = None
+            seeking = False
+            start = time.perf_counter()
+            while slot < len(targets):
+                target = targets[slot]
+                if not seeking and planner.should_seek(index + 1, target):
+                    start = time.perf_counter()
+                    frames = _seek(target)
+                    anchor = target
+                    seeking = True
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                if anchor is None:
+                    index += 1
+                else:
+                    index = _frame_index(frame, anchor)
+                    if index > anchor and anchor > 0:
+                        # 落在目标之后：改从更早的关键帧开始
+                        anchor = max(planner.keyframe_before(min(anchor, index) - 1), 0)
+                        frames = _seek(anchor)
+                        continue
+                    anchor = None
+                now = time.perf_counter()
+                if seeking:
+                    # 跳转的耗时包含从关键帧解码到目标帧的全部时间
+                    if index >= target:
+                        planner.record_seek(now - start)
+                        seeking = False
+                elif index < target:
+                    planner.record_grab(now - start)
+                start = now
+                while slot < len(targets) and targets[slot] < index:
+                    print(f"警告: 无法读取第 {targets[slot]} 帧")
+                    slot += 1
+                if slot < len(targets) and targets[slot] == index:
+                    on_frame(index, frame.to_ndarray(format="bgr24"))
+                    slot += 1
+                    start = time.perf_counter()
+        return [planner]
+
+
+def find_ffmpeg() -> Optional[str]:
+    """ffmpeg 可执行文件：UTK_FFMPEG 环境变量、PATH，最后是 imageio-ffmpeg 自带的二进制"""
+    import shutil
+
+    candidate = os.environ.get("UTK_FFMPEG") or shutil.which("ffmpeg")
+    if candidate:
+        return candidate
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        return None
+    try:
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except RuntimeError:
+        return None
+
+
+# ffmpeg 管道后端：一个子进程的 select 表达式最多包含这么多个区间
+_FFMPEG_MAX_RUNS = 256
+
+
+class FFmpegPipeBackend(DecoderBackend):
+    """
+    ffmpeg 子进程用 select 滤镜挑出目标帧，以 bgr24 rawvideo 写到管道。相距较远的目标帧分组，
+    每组用一个带精确 -ss 的子进程；多线程时各段的子进程并行运行。
+    """
+
+    name = "ffmpeg"
+
+    def available(self) -> bool:
+        return find_ffmpeg() is not None
+
+    def _groups(self, targets, keyframes):
+        planner = DecodePlanner(keyframes=keyframes)
+        groups = [[targets[0]]]
+        runs = 1
+        for previous, target in zip(targets, targets[1:]):
+            if target != previous + 1:
+                runs += 1
+            if runs > _FFMPEG_MAX_RUNS or planner.should_seek(previous + 1, target):
+                groups.append([])
+                runs = 1
+            groups[-1].append(target)
+        return groups
+
+    def _read_group(self, executable, video_path, group, on_frame, video_index):
+        import subprocess
+
+        import numpy as np
+
+        first = group[0]
+        runs = []
+        for index in group:
+            if runs and index == runs[-1][1] + 1:
+                runs[-1][1] = index
+            else:
+                runs.append([index, index])
+        expression = "+".join(
+            f"eq(n\\,{a - first})" if a == b else f"between(n\\,{a - first}\\,{b - first})" for a, b in runs
+        )
+        command = [executable, "-nostdin", "-v", "error"]
+        if first > 0:
+            # 精确跳转到第 first 帧（按索引记录的帧时间）之前一点，输出从第 first 帧开始，select 中的 n 相对于 first。
+            # 不取两帧的中点：时间基很粗（如 AVI 的 1/fps）时，ffmpeg 把偏移换算到时间基后会保留前一帧
+            seconds = video_index.time_of(first)
+            seconds -= min(0.001, 0.25 * (seconds - video_index.time_of(first - 1)))
+            command += ["-ss", f"{max(seconds, 0.0):.6f}"]
+        command += [
+            "-i", video_path, "-map", "0:v:0", "-vf", f"select={expression}", "-vsync", "0",
+            "-frames:v", str(len(group)), "-f", "rawvideo", "-pix_fmt", "bgr24", "-",
+        ]
+        frame_size = video_index.width * video_index.height * 3
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for index in group:
+                data = process.stdout.read(frame_size)
+                if len(data) < frame_size:
+                    print(f"警告: 无法读取第 {index} 帧")
+                    break
+                frame = np.frombuffer(data, dtype=np.uint8).reshape(video_index.height, video_index.width, 3)
+                on_frame(index, frame)
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            if process.wait() != 0 and stderr:
+                raise RuntimeError(f"ffmpeg 解码失败: {stderr.decode('utf-8', 'replace').strip()}")
+
+    def read(self, video_path, indices, on_frame, workers=1, keyframes=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        executable = find_ffmpeg()
+        if executable is None:
+            raise RuntimeError("未找到 ffmpeg")
+        video_index = get_video_index(video_path)
+        if not (video_index.timed or video_index.fps):
+            raise RuntimeError(f"无法确定视频帧率: {video_path}")
+
+        def _decode(segment):
+            planner = DecodePlanner(keyframes=keyframes)
+            for group in self._groups(segment, keyframes):
+                self._read_group(executable, video_path, group, on_frame, video_index)
+                planner.seeks += 1
+            return planner
+
+        segments = split_segments(indices, workers, keyframes)
+        if len(segments) <= 1:
+            return [_decode(segment) for segment in segments]
+        with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="utk-ffmpeg") as pool:
+            return list(pool.map(_decode, segments))
+
+
+DECODER_BACKENDS = {backend.name: backend for backend in (OpenCVBackend(), PyAVBackend(), FFmpegPipeBackend())}
+DECODERS = ("auto",) + tuple(DECODER_BACKENDS)
+
+# 自动选择后端时的微基准：整段等间隔抽取的帧数（走跳转路径）和开头连续解码的帧数
+_BENCHMARK_SPARSE = 8
+_BENCHMARK_DENSE = 24
+# 比较画面时先把长边缩小到该值；与参考帧的平均差超过该灰度级即视为解出了错误的帧
+_BENCHMARK_COMPARE_SIDE = 256
+_BENCHMARK_TOLERANCE = 1.0
+_decoder_choices = {}
+_decoder_lock = threading.Lock()
+
+
+def _decoder_choice_path() -> str:
+    return os.path.join(_INDEX_DIR, "decoders.json")
+
+
+def benchmark_decoders(video_path: str, video_index: VideoIndex, names: Iterable[str], workers: int = 1) -> dict:
+    """
+    在视频本身上测量各后端解码一小组帧（稀疏 + 连续）的耗时（秒）。每帧与单线程 OpenCV 解出的帧
+    （缩小后）逐一比较，出错、缺帧、尺寸不对或画面不一致的后端记为 None。
+    """
+    import cv2
+    import numpy as np
+
+    total = video_index.frame_count
+    sample = np.union1d(
+        plan_frame_indices(total, _BENCHMARK_SPARSE), np.arange(min(total, _BENCHMARK_DENSE))
+    ).tolist()
+    expected = (video_index.height, video_index.width)
+    shrink = FrameTransform(long_side=_BENCHMARK_COMPARE_SIDE)
+
+    def _collect(name, backend_workers):
+        frames = {}
+        shapes = set()
+
+        def _on_frame(index, frame):
+            shapes.add(frame.shape[:2])
+            # 后端可能复用帧缓冲区
+            frames[index] = shrink(frame).copy()
+
+        DECODER_BACKENDS[name].read(video_path, sample, _on_frame, backend_workers, video_index.keyframes)
+        return frames, shapes
+
+    try:
+        reference, _ = _collect("cv2", 1)
+    except Exception as e:
+        print(f"警告: 解码后端 cv2 不可用: {e}")
+        reference = {}
+
+    timings = {}
+    for name in names:
+        start = time.perf_counter()
+        try:
+            frames, shapes = _collect(name, workers)
+        except Exception as e:
+            print(f"警告: 解码后端 {name} 不可用: {e}")
+            timings[name] = None
+            continue
+        elapsed = time.perf_counter() - start
+        if len(frames) != len(sample) or not shapes <= {expected}:
+            timings[name] = None
+            continue
+        wrong = [
+            index
+            for index, frame in sorted(frames.items())
+            if index in reference and cv2.absdiff(frame, reference[index]).mean() > _BENCHMARK_TOLERANCE
+        ]
+        if wrong:
+            print(f"警告: 解码后端 {name} 解出的帧与 cv2 不一致: {wrong[:8]}")
+            timings[name] = None
+            continue
+        timings[name] = elapsed
+    return timings
+
+
+def select_decoder(video_path: str, video_index: VideoIndex, workers: int = 1) -> str:
+    """
+    按 (容器扩展名, 编码, 恒定/可变帧率, 可用后端) 选择最快的解码后端。首次遇到时在该视频上运行微基准，
+    结果保存在视频索引目录的 decoders.json 中。
+    """
+    available = [name for name, backend in DECODER_BACKENDS.items() if backend.available()]
+    if len(available) == 1:
+        return available[0]
+    extension = os.path.splitext(video_path)[1].lower().lstrip(".")
+    timing = "vfr" if video_index.vfr else "cfr"
+    key = f"{extension}|{video_index.codec}|{timing}|{'+'.join(available)}"
+    with _decoder_lock:
+        if not _decoder_choices:
+            try:
+                with open(_decoder_choice_path(), "r", encoding="utf-8") as f:
+                    _decoder_choices.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        choice = _decoder_choices.get(key)
+    if choice in available:
+        return choice
+
+    timings = benchmark_decoders(video_path, video_index, available, workers)
+    measured = {name: seconds for name, seconds in timings.items() if seconds is not None}
+    choice = min(measured, key=measured.get) if measured else "cv2"
+    print(
+        f"⏱️ 解码后端基准 ({extension}/{video_index.codec or '?'}): "
+        + ", ".join(f"{name}={'失败' if s is None else f'{s * 1000:.0f}ms'}" for name, s in timings.items())
+        + f" -> {choice}"
+    )
+    with _decoder_lock:
+        _decoder_choices[key] = choice
+        try:
+            os.makedirs(_INDEX_DIR, exist_ok=True)
+            path = _decoder_choice_path()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(_decoder_choices, f, indent=1)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"警告: 无法保存解码后端选择 {path}: {e}")
+    return choice
+
+
+def decode_frames(
+    video_path: str,
+    indices: Iterable[int],
+    on_frame: Callable,
+    workers: int = 1,
+    keyframes: Optional[List[int]] = None,
+    decoder: str = "cv2",
+):
+    """
+    用指定后端解码 indices 中的帧，返回 (实际使用的后端名, planners)。
+    "auto" 按微基准选择；后端未安装或解码出错时退回 OpenCV（已写入的帧会被覆盖，结果不变）。
+    """
+    indices = list(indices)
+    name = decoder
+    if name == "auto":
+        name = select_decoder(video_path, get_video_index(video_path), workers)
+    backend = DECODER_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"未知的解码后端: {decoder}")
+    if name != "cv2":
+        if not backend.available():
+            print(f"警告: 解码后端 {name} 未安装，改用 cv2")
+        else:
+            try:
+                return name, backend.read(video_path, indices, on_frame, workers, keyframes)
+            except Exception as e:
+                print(f"警告: 解码后端 {name} 出错，改用 cv2: {e}")
+    return "cv2", DECODER_BACKENDS["cv2"].read(video_path, indices, on_frame, workers, keyframes)
+
+
+class FrameTransform:
+    """
+    解码后立即在 uint8 上逐帧执行的裁剪与缩放：先按 crop 矩形裁剪（源坐标），
+    再缩放到指定尺寸或把长边缩小到 long_side。缩小用 INTER_AREA，放大用 INTER_CUBIC。
+    """
+
+    def __init__(self, width: int = 0, height: int = 0, long_side: int = 0, crop=None):
+        self.width = max(int(width), 0)
+        self.height = max(int(height), 0)
+        self.long_side = max(int(long_side), 0)
+        self.crop = tuple(int(v) for v in crop) if crop and crop[2] > 0 and crop[3] > 0 else None
+
+    @property
+    def is_identity(self) -> bool:
+        return not (self.width or self.height or self.long_side or self.crop)
+
+    def crop_rect(self, width: int, height: int):
+        """把裁剪矩形限制在帧内，返回 (x, y, w, h)"""
+        if self.crop is None:
+            return 0, 0, width, height
+        x, y, crop_width, crop_height = self.crop
+        x = min(max(x, 0), width - 1)
+        y = min(max(y, 0), height - 1)
+        return x, y, min(crop_width, width - x), min(crop_height, height - y)
+
+    def output_size(self, width: int, height: int):
+        """输入帧尺寸为 width x height 时的输出 (宽, 高)"""
+        _, _, width, height = self.crop_rect(width, height)
+        if self.width and self.height:
+            return self.width, self.height
+        if self.width:
+            return self.width, max(1, round(height * self.width / width))
+        if self.height:
+            return max(1, round(width * self.height / height)), self.height
+        if self.long_side and max(width, height) > self.long_side:
+            scale = self.long_side / max(width, height)
+            return max(1, round(width * scale)), max(1, round(height * scale))
+        return width, height
+
+    def key(self) -> str:
+        """用于区分帧缓存条目的标识（尺寸之外的部分）"""
+        return "" if self.crop is None else "_crop{}-{}-{}-{}".format(*self.crop)
+
+    def __call__(self, frame):
+        import cv2
+
+        height, width = frame.shape[:2]
+        x, y, crop_width, crop_height = self.crop_rect(width, height)
+        if (crop_width, crop_height) != (width, height):
+            frame = frame[y : y + crop_height, x : x + crop_width]
+        out_width, out_height = self.output_size(width, height)
+        if (out_width, out_height) != (crop_width, crop_height):
+            shrink = out_width * out_height < crop_width * crop_height
+            frame = cv2.resize(
+                frame, (out_width, out_height), interpolation=cv2.INTER_AREA if shrink else cv2.INTER_CUBIC
+            )
+        return frame
+
+
+def transformed(on_frame: Callable, transform: Optional[FrameTransform]) -> Callable:
+    """在 on_frame 之前插入逐帧裁剪/缩放"""
+    if transform is None or transform.is_identity:
+        return on_frame
+
+    def _on_frame(index, frame):
+        on_frame(index, transform(frame))
+
+    return _on_frame
+
+
+def bgr_to_rgb(frame, dst):
+    """把 OpenCV 解出的 BGR / BGRA / 灰度帧原地转换到 dst（RGB uint8）"""
+    import cv2
+
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB, dst=dst)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB, dst=dst)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=dst)
+
+
+class FrameBatch:
+    """
+    把解出的 BGR 帧直接写入预先分配的 [N,H,W,3] 输出，作为 read_frames 的 on_frame 回调。
+
+    输出按 indices 的顺序排列（重复索引会写入多个位置）。float32 输出时每帧先在一个
+    uint8 暂存缓冲区中原地转换颜色，再缩放写入对应位置；uint8 输出时直接转换进输出。
+    多个解码线程可以同时写入（各自的帧位置互不重叠）。
+    """
+
+    def __init__(self, indices, uint8: bool = False):
+        self.indices = [int(i) for i in indices]
+        self.uint8 = uint8
+        self.slots = {}
+        for position, index in enumerate(self.indices):
+            self.slots.setdefault(index, []).append(position)
+        self.output = None
+        self.filled = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _allocate(self, height: int, width: int):
+        import numpy as np
+        import torch
+
+        with self._lock:
+            if self.output is not None:
+                return
+            dtype = torch.uint8 if self.uint8 else torch.float32
+            self.filled = np.zeros(len(self.indices), dtype=bool)
+            self.output = torch.empty((len(self.indices), height, width, 3), dtype=dtype)
+
+    def _stage_buffer(self, height: int, width: int):
+        # 每个解码线程使用自己的暂存缓冲区
+        import numpy as np
+
+        stage = getattr(self._local, "stage", None)
+        if stage is None or stage.shape[:2] != (height, width):
+            stage = self._local.stage = np.empty((height, width, 3), dtype=np.uint8)
+        return stage
+
+    def __call__(self, index: int, frame):
+        if index not in self.slots:
+            return
+        stage = self._stage_buffer(frame.shape[0], frame.shape[1])
+        self.put_rgb(index, bgr_to_rgb(frame, stage))
+
+    def put_rgb(self, index: int, rgb):
+        """写入一帧已经是 RGB uint8 的数据（例如从帧缓存读出的）"""
+        import torch
+
+        positions = self.slots.get(index)
+        if not positions:
+            return
+        if self.output is None:
+            self._allocate(rgb.shape[0], rgb.shape[1])
+        if rgb.shape[:2] != tuple(self.output.shape[1:3]):
+            raise RuntimeError(
+                f"第 {index} 帧尺寸 {rgb.shape[1]}x{rgb.shape[0]} 与前面的帧不一致"
+            )
+        stage = torch.from_numpy(rgb)
+        for position in positions:
+            if self.uint8:
+                self.output[position].copy_(stage)
+            else:
+                torch.div(stage, 255.0, out=self.output[position])
+        self.filled[positions] = True
+
+    @property
+    def count(self) -> int:
+        return 0 if self.filled is None else int(self.filled.sum())
+
+    def result(self):
+        """返回输出张量；读取失败的帧会被去掉（仅此时产生一次拷贝）"""
+        import torch
+
+        if self.output is None:
+            return None
+        if self.filled.all():
+            return self.output
+        return self.output[torch.from_numpy(self.filled)]
+
+
+class FrameCache:
+    """
+    已解码帧的磁盘缓存：每个 (视频指纹, 分辨率[, 裁剪区域]) 对应一个只追加的 uint8 帧文件（.frames）
+    和一个槽位表（.slots.npy，帧索引 -> 帧文件中的位置，-1 表示未缓存）。
+    帧在第一次解码时追加写入，磁盘占用只随实际缓存的帧数增长；之后直接从映射文件按槽位读取。
+    """
+
+    def __init__(self, video_index: VideoIndex, width: int, height: int, cache_dir: str = None, variant: str = ""):
+        import numpy as np
+
+        self.cache_dir = cache_dir or _FRAME_CACHE_DIR
+        self.width = width
+        self.height = height
+        self.frame_bytes = width * height * 3
+        fingerprint = hashlib.blake2b(
+            f"{video_index.path}|{video_index.size}|{video_index.mtime_ns}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        stem = os.path.join(self.cache_dir, f"{fingerprint}_{width}x{height}{variant}")
+        self.frames_path = f"{stem}.frames"
+        self.slots_path = f"{stem}.slots.npy"
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with _frame_cache_lock:
+            self.slots = self._load_slots(video_index.frame_count)
+            # 以读写方式打开（不存在时创建），新帧写在最后一个完整帧之后
+            self._file = open(self.frames_path, "r+b" if os.path.exists(self.frames_path) else "w+b")
+            stored = os.fstat(self._file.fileno()).st_size // self.frame_bytes
+            self.slots[self.slots >= stored] = -1
+            self.frames = (
+                # "c"：可写的私有映射（torch.from_numpy 不接受只读数组），修改不会写回文件
+                np.memmap(self.frames_path, dtype=np.uint8, mode="c", shape=(stored, height, width, 3))
+                if stored and self.frame_bytes
+                else None
+            )
+        os.utime(self.frames_path)
+
+    def _load_slots(self, frame_count: int):
+        import numpy as np
+
+        try:
+            slots = np.load(self.slots_path)
+            if slots.shape == (frame_count,) and slots.dtype == np.int64:
+                return slots
+        except (OSError, ValueError):
+            pass
+        return np.full(frame_count, -1, dtype=np.int64)
+
+    def missing(self, indices: Iterable[int]) -> List[int]:
+        count = len(self.slots)
+        return sorted(set(i for i in indices if not (0 <= i < count and self.slots[i] >= 0)))
+
+    def gather(self, indices: Iterable[int], sink: "FrameBatch") -> int:
+        """把已缓存的帧直接写入 sink，返回命中的帧数"""
+        hits = 0
+        for index in sorted(set(indices)):
+            if 0 <= index < len(self.slots) and self.slots[index] >= 0:
+                sink.put_rgb(index, self.frames[self.slots[index]])
+                hits += 1
+        return hits
+
+    def store(self, index: int, frame, sink: "FrameBatch"):
+        """作为 read_frames 的 on_frame：转换后追加到帧文件，再交给 sink"""
+        if not 0 <= index < len(self.slots) or frame.shape[:2] != (self.height, self.width):
+            sink(index, frame)
+            return
+        rgb = bgr_to_rgb(frame, sink._stage_buffer(self.height, self.width))
+        if self.slots[index] < 0:
+            with _frame_cache_lock:
+                slot = os.fstat(self._file.fileno()).st_size // self.frame_bytes
+                self._file.seek(slot * self.frame_bytes)
+                self._file.write(rgb.data)
+                self.slots[index] = slot
+        sink.put_rgb(index, rgb)
+
+    def close(self):
+        import numpy as np
+
+        with _frame_cache_lock:
+            self._file.close()
+            self.frames = None
+            # 同一条目可能被其他实例同时写入：合并磁盘上的槽位表后再原子替换
+            stored = os.path.getsize(self.frames_path) // self.frame_bytes if self.frame_bytes else 0
+            on_disk = self._load_slots(len(self.slots))
+            merged = np.where(self.slots >= 0, self.slots, on_disk)
+            merged[merged >= stored] = -1
+            temp_path = f"{self.slots_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, merged)
+            os.replace(temp_path, self.slots_path)
+        evict_frame_cache(self.cache_dir, keep=(self.frames_path,))
+
+
+def evict_frame_cache(cache_dir: str = None, max_bytes: int = None, keep=()):
+    """按最近使用时间删除最旧的缓存条目，直到缓存帧与槽位表的总字节数不超过 max_bytes"""
+    cache_dir = cache_dir or _FRAME_CACHE_DIR
+    max_bytes = _FRAME_CACHE_BYTES if max_bytes is None else max_bytes
+    with _frame_cache_lock:
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(cache_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if not name.endswith(".frames"):
+                continue
+            path = os.path.join(cache_dir, name)
+            slots_path = path[: -len(".frames")] + ".slots.npy"
+            try:
+                # 帧文件只追加写入，文件大小就是已写入的字节数
+                stat = os.stat(path)
+                size = stat.st_size + (os.path.getsize(slots_path) if os.path.exists(slots_path) else 0)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, slots_path, size))
+            total += size
+        freed = 0
+        for _, path, slots_path, size in sorted(entries):
+            if total <= max_bytes:
+                break
+            if path in keep:
+                continue
+            for victim in (path, slots_path):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+            freed += size
+        return freed
+
+
+# 内容感知抽帧：缩略图长边、默认最多探测的帧数、每个目标帧至少对应的探测帧数、灰度直方图的分箱数
+THUMBNAIL_SIDE = 64
+MAX_PROBES = 2048
+PROBES_PER_TARGET = 4
+_HISTOGRAM_BINS = 32
+
+
+def content_aware_probe_count(total_frames: int, target_frames: int) -> int:
+    """探测帧数：至少 MAX_PROBES，且至少是 target_frames 的 PROBES_PER_TARGET 倍，不超过总帧数"""
+    return max(0, min(total_frames, max(MAX_PROBES, PROBES_PER_TARGET * target_frames)))
+
+
+def probe_thumbnails(
+    video_path: str,
+    total_frames: int,
+    max_probes: int = MAX_PROBES,
+    workers: int = 1,
+    keyframes: Optional[List[int]] = None,
+    crop=None,
+    decoder: str = "cv2",
+):
+    """
+    以等间隔探测至多 max_probes 帧，解码后立即（按 crop 裁剪并）缩成长边 THUMBNAIL_SIDE 的灰度缩略图。
+    返回 (帧索引数组, 缩略图 [P,h,w] uint8)。
+    """
+    import cv2
+    import numpy as np
+
+    stride = max(1, -(-total_frames // max_probes))
+    probes = range(0, total_frames, stride)
+    thumbs = {}
+
+    def _store(index, frame):
+        thumbs[index] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    decode_frames(
+        video_path,
+        probes,
+        transformed(_store, FrameTransform(long_side=THUMBNAIL_SIDE, crop=crop)),
+        workers,
+        keyframes,
+        decoder,
+    )
+    frames = np.asarray(sorted(thumbs), dtype=np.int64)
+    if len(frames) == 0:
+        return frames, np.zeros((0, 1, 1), dtype=np.uint8)
+    return frames, np.stack([thumbs[i] for i in frames.tolist()])
+
+
+def tensor_thumbnails(images, chunk: int = 64):
+    """IMAGE [B,H,W,C] 的灰度缩略图 [B,h,w] uint8"""
+    import numpy as np
+    import torch
+    import torch.nn.functional as F
+
+    height, width = images.shape[1:3]
+    scale = min(1.0, THUMBNAIL_SIDE / max(height, width))
+    size = (max(1, round(height * scale)), max(1, round(width * scale)))
+    thumbs = []
+    for start in range(0, images.shape[0], chunk):
+        gray = images[start : start + chunk, ..., :3].mean(dim=-1, keepdim=True).movedim(-1, 1)
+        small = F.interpolate(gray.float(), size=size, mode="area")[:, 0]
+        thumbs.append(torch.mul(small, 255.0).clamp_(0, 255).to(torch.uint8).numpy())
+    return np.concatenate(thumbs) if thumbs else np.zeros((0,) + size, dtype=np.uint8)
+
+
+def frame_difference_signal(thumbs):
+    """
+    相邻缩略图的变化量，取平均像素差与灰度直方图差（L1 的一半）的均值，范围 [0,1]。
+    第 i 项是第 i-1 帧到第 i 帧的变化，第 0 项为 0。
+    """
+    import numpy as np
+
+    count = len(thumbs)
+    if count < 2:
+        return np.zeros(count)
+    flat = thumbs.reshape(count, -1)
+    pixel = np.abs(np.diff(flat.astype(np.int16), axis=0)).mean(axis=1) / 255.0
+    bins = (flat >> 3).astype(np.int64) + (np.arange(count) * _HISTOGRAM_BINS)[:, None]
+    histogram = np.bincount(bins.ravel(), minlength=count * _HISTOGRAM_BINS).reshape(count, _HISTOGRAM_BINS)
+    histogram = histogram / flat.shape[1]
+    hist = 0.5 * np.abs(np.diff(histogram, axis=0)).sum(axis=1)
+    return np.concatenate([[0.0], 0.5 * (pixel + hist)])
+
+
+def plan_content_aware_indices(
+    probe_frames,
+    thumbs,
+    target_frames: int,
+    duplicate_threshold: float = 0.01,
+    static_weight: float = 0.1,
+    total_frames: Optional[int] = None,
+):
+    """
+    按画面变化量分配抽帧预算：变化量作为采样密度做逆累积分布采样（场景切换处的大变化
+    必然落到切换后的第一帧），静止片段只保留 static_weight 倍平均变化量的底数。
+    之后与上一保留帧的缩略图平均差小于 duplicate_threshold 的帧视为近似重复并丢弃，
+    因此返回的帧数可能少于 target_frames。
+    给出 total_frames 且探测帧不足以从中挑选 target_frames 帧时，改用均匀抽帧并打印警告。
+    """
+    import numpy as np
+
+    count = len(probe_frames)
+    if count == 0 or target_frames <= 0:
+        return []
+    if total_frames is not None and count < total_frames and target_frames >= count:
+        print(f"警告: 目标帧数 {target_frames} 不少于探测帧数 {count}，内容感知抽帧改为均匀抽帧")
+        return plan_frame_indices(total_frames, target_frames, "average").tolist()
+    signal = frame_difference_signal(thumbs)
+    if target_frames >= count:
+        picks = np.arange(count)
+    else:
+        mean = float(signal[1:].mean()) if count > 1 else 0.0
+        weights = signal + static_weight * mean + 1e-9
+        cdf = np.cumsum(weights)
+        quantiles = (np.arange(target_frames) + 0.5) / target_frames * cdf[-1]
+        positions = np.minimum(np.searchsorted(cdf, quantiles), count - 1)
+        rank = np.arange(target_frames)
+        picks = np.maximum.accumulate(positions - rank) + rank
+        picks = np.minimum(picks, count - target_frames + rank)
+
+    kept = [int(picks[0])]
+    if duplicate_threshold > 0:
+        flat = thumbs.reshape(count, -1).astype(np.int16)
+        for pick in picks[1:].tolist():
+            if np.abs(flat[pick] - flat[kept[-1]]).mean() / 255.0 >= duplicate_threshold:
+                kept.append(pick)
+    else:
+        kept = picks.tolist()
+    return probe_frames[np.asarray(kept, dtype=np.int64)].tolist()
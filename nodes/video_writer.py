@@ -0,0 +1,149 @@
+"""
+Streaming Video Encoding for UniversalToolkit
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Encodes IMAGE batches to MP4 / MKV with OpenCV's ``VideoWriter`` through a
+bounded producer/consumer queue: the calling thread quantizes each frame to
+uint8 BGR while a background thread encodes the previous ones, and at most
+``queue_frames`` converted frames are alive at once. A writer can stay open
+across node executions, so a long render is appended chunk by chunk instead
+of being collected in RAM first.
+
+:copyright: (c) 2024 by May
+:license: MIT, see LICENSE for more details.
+"""
+
+import atexit
+import queue
+import threading
+from typing import Optional
+
+from .image_convert import tensor2uint8
+
+CODECS = ("mp4v", "avc1", "MJPG", "FFV1", "XVID")
+CONTAINERS = ("mp4", "mkv")
+
+# 结束编码线程的哨兵
+_STOP = object()
+
+
+class VideoStreamWriter:
+    """
+    后台线程编码的视频写入器。write() 在调用线程中把帧转换为 uint8 BGR 并放入有界队列，
+    编码线程依次写入 cv2.VideoWriter；队列满时 write() 阻塞，内存占用与批次大小无关。
+    """
+
+    def __init__(self, path: str, fps: float, codec: str = "mp4v", queue_frames: int = 16):
+        self.path = path
+        self.fps = float(fps)
+        self.codec = codec
+        self.width = None
+        self.height = None
+        self.frames_queued = 0
+        self.frames_written = 0
+        self._writer = None
+        self._queue = queue.Queue(maxsize=max(int(queue_frames), 1))
+        self._thread = None
+        self._error: Optional[BaseException] = None
+
+    def _open(self, width: int, height: int):
+        import cv2
+
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.codec), self.fps, (width, height))
+        if not writer.isOpened():
+            raise RuntimeError(f"无法用编码器 {self.codec} 创建视频文件: {self.path}（当前 OpenCV 可能不支持该编码器，可改用 mp4v）")
+        self._writer = writer
+        self.width, self.height = width, height
+        self._thread = threading.Thread(target=self._encode, name="utk-encode", daemon=True)
+        self._thread.start()
+
+    def _encode(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _STOP:
+                return
+            if self._error is not None:
+                # 出错后只消费队列，避免 write() 永久阻塞
+                continue
+            try:
+                self._writer.write(frame)
+                self.frames_written += 1
+            except BaseException as e:
+                self._error = e
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError(f"视频编码失败: {self._error}")
+
+    def write(self, images) -> int:
+        """追加一批 IMAGE [B,H,W,C]（float [0,1] 或 uint8），返回本批排队的帧数"""
+        import cv2
+
+        self._check()
+        if images.dim() == 3:
+            images = images.unsqueeze(0)
+        height, width = images.shape[1:3]
+        if self._writer is None:
+            self._open(width, height)
+        elif (width, height) != (self.width, self.height):
+            raise ValueError(f"帧尺寸 {width}x{height} 与视频 {self.width}x{self.height} 不一致")
+        conversion = cv2.COLOR_RGBA2BGR if images.shape[-1] == 4 else cv2.COLOR_RGB2BGR
+        for frame in images:
+            rgb = tensor2uint8(frame).numpy()
+            if rgb.ndim == 2 or rgb.shape[-1] == 1:
+                bgr = cv2.cvtColor(rgb, cv2.COLOR_GRAY2BGR)
+            else:
+                bgr = cv2.cvtColor(rgb, conversion)
+            self._queue.put(bgr)
+            self.frames_queued += 1
+            self._check()
+        return images.shape[0]
+
+    def close(self) -> int:
+        """写完队列中的帧并关闭文件，返回写入的总帧数"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        self._check()
+        return self.frames_written
+
+
+# 跨执行保持打开的写入器：名称 -> VideoStreamWriter
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_stream(key: str) -> Optional[VideoStreamWriter]:
+    with _streams_lock:
+        return _streams.get(key)
+
+
+def start_stream(key: str, path: str, fps: float, codec: str, queue_frames: int = 16) -> VideoStreamWriter:
+    """新建写入器并以 key 登记，key 上已有的写入器会先被关闭"""
+    close_stream(key)
+    stream = VideoStreamWriter(path, fps, codec, queue_frames)
+    with _streams_lock:
+        _streams[key] = stream
+    return stream
+
+
+def close_stream(key: str) -> int:
+    """关闭 key 对应的写入器，返回写入的总帧数；没有打开的写入器时返回 0"""
+    with _streams_lock:
+        stream = _streams.pop(key, None)
+    return stream.close() if stream is not None else 0
+
+
+@atexit.register
+def _close_all_streams():
+    with _streams_lock:
+        keys = list(_streams)
+    for key in keys:
+        try:
+            close_stream(key)
+        except Exception as e:
+            print(f"警告: 关闭视频文件 {key} 失败: {e}")